@@ -1,10 +1,24 @@
 from django.contrib import admin
-from .models import Score, RewardAndDiscipline, Evaluation
+from django.db import transaction
+from .models import Score, ScoreHistory, ScoreRelease, RewardAndDiscipline, Evaluation, CommentPhrase, StudentAttendance, TermResult, AtRiskStudent
+from .score_history import record_score_changes, record_score_deletions
+from .comment_bank import invalidate_comment_bank
+
+class ScoreHistoryInline(admin.TabularInline):
+    model = ScoreHistory
+    extra = 0
+    can_delete = False
+    fields = ('changed_at', 'old_value', 'new_value', 'changed_by')
+    readonly_fields = fields # Lịch sử chỉ ghi thêm
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
 
 @admin.register(Score)
 class ScoreAdmin(admin.ModelAdmin):
-    list_display = ('student_name', 'subject_name', 'score_value', 'exam_type', 'exam_date', 'academic_period')
-    list_filter = ('exam_type', 'academic_period', 'subject', 'student__current_class')
+    list_display = ('student_name', 'subject_name', 'score_value', 'exam_type', 'exam_date', 'term', 'is_published')
+    list_filter = ('exam_type', 'term', 'is_published', 'subject', 'student__current_class')
     search_fields = (
         'student__user__username',
         'student__user__first_name',
@@ -15,6 +29,22 @@ class ScoreAdmin(admin.ModelAdmin):
     # Thay đổi ở đây:
     raw_id_fields = ('student',) # Sử dụng raw_id_fields cho student
     autocomplete_fields = ['subject'] # Giữ autocomplete cho subject nếu SubjectAdmin có search_fields
+    inlines = [ScoreHistoryInline]
+
+    def save_model(self, request, obj, form, change):
+        previous_value = Score.objects.filter(pk=obj.pk).values_list('score_value', flat=True).first() if change else None
+        super().save_model(request, obj, form, change)
+        record_score_changes([(obj, previous_value, obj.score_value)], changed_by=request.user)
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            record_score_deletions([obj], changed_by=request.user)
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            record_score_deletions(queryset, changed_by=request.user)
+            super().delete_queryset(request, queryset)
 
     def student_name(self, obj):
         return obj.student.user.get_full_name() if obj.student.user.get_full_name() else obj.student.user.username
@@ -27,10 +57,29 @@ class ScoreAdmin(admin.ModelAdmin):
     subject_name.admin_order_field = 'subject__name' # Cho phép sắp xếp theo tên môn học
 
 
+@admin.register(ScoreHistory)
+class ScoreHistoryAdmin(admin.ModelAdmin):
+    # Chỉ để tra cứu, kể cả lịch sử của điểm đã bị xóa (score để trống)
+    list_display = ('changed_at', 'student', 'subject', 'exam_type', 'exam_date', 'old_value', 'new_value', 'changed_by')
+    list_filter = ('exam_type', 'subject', 'changed_at')
+    search_fields = ('student__user__username', 'student__user__first_name', 'student__user__last_name')
+    list_select_related = ('student__user', 'subject', 'changed_by')
+    date_hierarchy = 'changed_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(RewardAndDiscipline)
 class RewardAndDisciplineAdmin(admin.ModelAdmin):
     list_display = ('student_name', 'record_type', 'reason_short', 'date_issued', 'issued_by_username')
-    list_filter = ('record_type', 'date_issued', 'student__current_class')
+    list_filter = ('record_type', 'term', 'date_issued', 'student__current_class')
     search_fields = (
         'student__user__username',
         'student__user__first_name',
@@ -42,6 +91,7 @@ class RewardAndDisciplineAdmin(admin.ModelAdmin):
     raw_id_fields = ('student',) # Sử dụng raw_id_fields cho student
     autocomplete_fields = ['issued_by'] # Giữ autocomplete cho issued_by
     date_hierarchy = 'date_issued'
+    readonly_fields = ('term',) # Tự xác định theo ngày quyết định
 
     def student_name(self, obj):
         # ... (phần còn lại của lớp giữ nguyên) ...
@@ -62,7 +112,7 @@ class RewardAndDisciplineAdmin(admin.ModelAdmin):
 @admin.register(Evaluation)
 class EvaluationAdmin(admin.ModelAdmin):
     list_display = ('student_name', 'evaluation_type', 'evaluator_username', 'subject_name_optional', 'evaluation_date')
-    list_filter = ('evaluation_type', 'evaluation_date', 'evaluator', 'subject', 'student__current_class')
+    list_filter = ('evaluation_type', 'term', 'evaluation_date', 'evaluator', 'subject', 'student__current_class')
     search_fields = (
         'student__user__username',
         'student__user__first_name',
@@ -75,6 +125,7 @@ class EvaluationAdmin(admin.ModelAdmin):
     raw_id_fields = ('student', 'subject') 
     autocomplete_fields = ['evaluator'] # Giữ autocomplete cho evaluator
     date_hierarchy = 'evaluation_date'
+    readonly_fields = ('term',) # Tự xác định theo ngày đánh giá
 
 
     def student_name(self, obj):
@@ -87,4 +138,72 @@ class EvaluationAdmin(admin.ModelAdmin):
 
     def subject_name_optional(self, obj):
         return obj.subject.name if obj.subject else '-'
-    subject_name_optional.short_description = 'Môn học (nếu có)'
\ No newline at end of file
+    subject_name_optional.short_description = 'Môn học (nếu có)'
+
+
+@admin.register(StudentAttendance)
+class StudentAttendanceAdmin(admin.ModelAdmin):
+    list_display = ('student', 'term')
+    list_filter = ('term', 'student__current_class')
+    search_fields = ('student__user__username', 'student__user__first_name', 'student__user__last_name')
+    raw_id_fields = ('student',)
+    exclude = ('absent_bits', 'excused_bits') # Bitmap được cập nhật qua trang điểm danh và duyệt đơn nghỉ học
+
+
+@admin.register(TermResult)
+class TermResultAdmin(admin.ModelAdmin):
+    list_display = ('student', 'school_class', 'term', 'overall_average', 'class_rank', 'class_size', 'computed_at')
+    list_filter = ('term', 'school_class')
+    search_fields = ('student__user__username', 'student__user__first_name', 'student__user__last_name')
+    raw_id_fields = ('student',)
+    # Kết quả được tính tự động từ điểm số (xem term_results.py)
+    readonly_fields = ('student', 'school_class', 'term', 'subject_averages', 'overall_average',
+                       'class_rank', 'class_size', 'computed_at')
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(AtRiskStudent)
+class AtRiskStudentAdmin(admin.ModelAdmin):
+    list_display = ('student', 'school_class', 'term', 'overall_average', 'trend_slope', 'computed_at')
+    list_filter = ('term', 'school_class')
+    search_fields = ('student__user__username', 'student__user__first_name', 'student__user__last_name')
+    raw_id_fields = ('student',)
+    # Danh sách do lệnh detect_at_risk_students tính (xem at_risk.py)
+    readonly_fields = ('student', 'school_class', 'term', 'overall_average', 'trend_slope',
+                       'low_subjects', 'reasons', 'computed_at')
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ScoreRelease)
+class ScoreReleaseAdmin(admin.ModelAdmin):
+    list_display = ('school_class', 'subject', 'exam_type', 'exam_date', 'release_at', 'released_at', 'released_count', 'scheduled_by')
+    list_filter = ('exam_type', 'school_class', 'subject')
+    date_hierarchy = 'release_at'
+    # Đợt công bố do lệnh release_scores thực hiện (xem score_release.py)
+    readonly_fields = ('released_at', 'released_count')
+
+
+@admin.register(CommentPhrase)
+class CommentPhraseAdmin(admin.ModelAdmin):
+    list_display = ('text', 'teacher', 'use_count', 'last_used_at')
+    list_filter = ('teacher',)
+    search_fields = ('text', 'normalized_text', 'teacher__username')
+    # Ngân hàng được cập nhật khi lưu đánh giá (xem comment_bank.py); xóa câu không muốn gợi ý nữa tại đây
+    readonly_fields = ('normalized_text', 'use_count', 'last_used_at')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        invalidate_comment_bank([obj.teacher_id])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_comment_bank([obj.teacher_id])
+
+    def delete_queryset(self, request, queryset):
+        teacher_ids = set(queryset.values_list('teacher_id', flat=True))
+        super().delete_queryset(request, queryset)
+        invalidate_comment_bank(teacher_ids)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AcademicRecordsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'academic_records'
+
+    def ready(self):
+        from . import signals  # noqa: F401 - đăng ký các receiver
+        from . import checks  # noqa: F401 - đăng ký system check
@@ -0,0 +1,128 @@
+"""
+Phát hiện học sinh có nguy cơ học yếu theo học kỳ.
+
+Điểm của cả trường trong học kỳ được đọc bằng MỘT truy vấn values_list(...).iterator()
+sắp theo học sinh; mỗi học sinh được xử lý trên các mảng (ngày thi, điểm) của mình:
+ĐTB có trọng số từng môn (cùng hệ số với kết quả học kỳ) và độ dốc xu hướng điểm
+theo thời gian (hồi quy tuyến tính trên độ lệch so với điểm TB của từng môn, để việc
+xen kẽ môn mạnh/môn yếu không bị tính là xu hướng). Kết quả ghi vào AtRiskStudent
+để trang GVCN và phụ huynh chỉ đọc lại.
+"""
+import statistics
+from collections import defaultdict
+from decimal import Decimal
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import transaction
+from django.utils import timezone
+
+from school_data.models import Subject as SchoolSubject
+from .models import Score, AtRiskStudent
+from .term_results import EXAM_TYPE_WEIGHTS, _round
+
+
+AVERAGE_THRESHOLD = Decimal('5.0')  # ĐTB chung dưới ngưỡng này là học lực yếu
+SUBJECT_THRESHOLD = Decimal('5.0')  # Môn có ĐTB dưới ngưỡng này được liệt kê
+DECLINE_THRESHOLD = -1.0  # Điểm giảm từ 1 điểm mỗi 30 ngày trở lên
+MIN_TREND_POINTS = 4  # Cần ít nhất chừng này bài (ở ít nhất 2 ngày khác nhau) để tính xu hướng
+SLOPE_PERIOD_DAYS = 30
+ITERATOR_CHUNK_SIZE = 5000
+
+
+def trend_slope(days, values):
+    """Độ dốc hồi quy tuyến tính của values theo days, tính bằng điểm / SLOPE_PERIOD_DAYS; None nếu không đủ dữ liệu."""
+    if len(days) < MIN_TREND_POINTS or len(set(days)) < 2:
+        return None
+    return statistics.linear_regression(days, values).slope * SLOPE_PERIOD_DAYS
+
+
+def assess_student(rows, subject_names):
+    """
+    Đánh giá một học sinh từ các dòng (subject_id, exam_type, exam_date, score_value).
+    Trả về dict các trường của AtRiskStudent nếu học sinh cần lưu ý, ngược lại None.
+    """
+    sums = defaultdict(lambda: [Decimal(0), 0])
+    by_subject = defaultdict(list)
+    for subject_id, exam_type, exam_date, score_value in rows:
+        weight = EXAM_TYPE_WEIGHTS[exam_type]
+        sums[subject_id][0] += score_value * weight
+        sums[subject_id][1] += weight
+        by_subject[subject_id].append((exam_date.toordinal(), float(score_value)))
+
+    subject_averages = {subject_id: _round(total / weight) for subject_id, (total, weight) in sums.items()}
+    overall = _round(sum(subject_averages.values()) / len(subject_averages))
+
+    days, residuals = [], []
+    for points in by_subject.values():
+        mean = statistics.fmean(value for _, value in points)
+        for day, value in points:
+            days.append(day)
+            residuals.append(value - mean)
+    slope = trend_slope(days, residuals)
+
+    low_subjects = sorted(
+        ({'subject': subject_names.get(subject_id, '?'), 'average': str(average)}
+         for subject_id, average in subject_averages.items() if average < SUBJECT_THRESHOLD),
+        key=itemgetter('subject'),
+    )
+    reasons = []
+    if overall < AVERAGE_THRESHOLD:
+        reasons.append(f"ĐTB chung {overall} dưới {AVERAGE_THRESHOLD}")
+    if low_subjects:
+        reasons.append(f"{len(low_subjects)} môn dưới {SUBJECT_THRESHOLD}")
+    if slope is not None and slope <= DECLINE_THRESHOLD:
+        reasons.append(f"Điểm giảm {abs(slope):.1f} điểm/{SLOPE_PERIOD_DAYS} ngày")
+    if not reasons:
+        return None
+    return {
+        'overall_average': overall,
+        'trend_slope': Decimal(f"{slope:.2f}") if slope is not None else None,
+        'low_subjects': low_subjects,
+        'reasons': reasons,
+    }
+
+
+def detect_at_risk_students(term):
+    """
+    Tính lại danh sách AtRiskStudent của toàn trường cho một học kỳ (thay thế danh sách cũ).
+    Trả về danh sách AtRiskStudent đã lưu.
+    """
+    term_id = getattr(term, 'pk', term)
+    subject_names = dict(SchoolSubject.objects.values_list('pk', 'name'))
+    rows = (Score.objects
+            .filter(term_id=term_id, student__current_class__isnull=False, is_published=True,
+                    exam_type__in=list(EXAM_TYPE_WEIGHTS))
+            .order_by('student_id')
+            .values_list('student_id', 'student__current_class_id', 'subject_id', 'exam_type', 'exam_date', 'score_value')
+            .iterator(chunk_size=ITERATOR_CHUNK_SIZE))
+
+    now = timezone.now()
+    flagged = []
+    for student_id, student_rows in groupby(rows, key=itemgetter(0)):
+        student_rows = list(student_rows)
+        assessment = assess_student([row[2:] for row in student_rows], subject_names)
+        if assessment is not None:
+            flagged.append(AtRiskStudent(student_id=student_id, term_id=term_id,
+                                         school_class_id=student_rows[0][1], computed_at=now, **assessment))
+
+    with transaction.atomic():
+        AtRiskStudent.objects.filter(term_id=term_id).delete()
+        AtRiskStudent.objects.bulk_create(flagged, batch_size=1000)
+    return flagged
+
+
+def latest_at_risk(students=None, school_class=None):
+    """
+    Danh sách AtRiskStudent của học kỳ gần nhất đã tính, lọc theo lớp hoặc theo các học sinh.
+    Trả về (học kỳ, [AtRiskStudent]) hoặc (None, []).
+    """
+    flags = AtRiskStudent.objects.select_related('student__user', 'term')
+    if school_class is not None:
+        flags = flags.filter(school_class=school_class)
+    if students is not None:
+        flags = flags.filter(student__in=students)
+    latest = flags.order_by('-term__start_date').first()
+    if latest is None:
+        return None, []
+    return latest.term, list(flags.filter(term_id=latest.term_id).order_by('overall_average', 'student__user__last_name'))
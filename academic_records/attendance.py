@@ -0,0 +1,119 @@
+from django.db import transaction
+
+from accounts.models import StudentProfile
+from school_data.models import AcademicTerm
+from .models import StudentAttendance
+
+
+def _to_int(bits):
+    return int.from_bytes(bytes(bits or b''), 'little')
+
+
+def _to_bytes(value):
+    return value.to_bytes((value.bit_length() + 7) // 8, 'little')
+
+
+def _range_mask(first_index, last_index):
+    # Các bit từ first_index tới last_index (bao gồm cả hai đầu) được bật
+    return ((1 << (last_index - first_index + 1)) - 1) << first_index
+
+
+def mark_excused(student, start_date, end_date):
+    """
+    Đánh dấu học sinh nghỉ có phép trong khoảng ngày (dùng khi duyệt đơn xin nghỉ học).
+    Chỉ các ngày đi học được đánh dấu (bỏ cuối tuần và ngày nghỉ lễ, xem AcademicTerm.school_day_mask).
+    Khoảng ngày có thể trải qua nhiều học kỳ; mỗi học kỳ chỉ cập nhật một dòng.
+    """
+    terms = AcademicTerm.objects.filter(start_date__lte=end_date, end_date__gte=start_date)
+    with transaction.atomic():
+        for term in terms:
+            first_index = term.day_index(max(start_date, term.start_date))
+            last_index = term.day_index(min(end_date, term.end_date))
+            mask = _range_mask(first_index, last_index) & term.school_day_mask()
+            if not mask:
+                continue
+            record, _ = StudentAttendance.objects.select_for_update().get_or_create(student=student, term=term)
+            record.absent_bits = _to_bytes(_to_int(record.absent_bits) | mask)
+            record.excused_bits = _to_bytes(_to_int(record.excused_bits) | mask)
+            record.save(update_fields=['absent_bits', 'excused_bits'])
+
+
+def unmark_excused(student, start_date, end_date, keep_ranges=()):
+    """
+    Hủy nghỉ có phép của một đơn xin nghỉ đã bị hủy duyệt: xóa bit vắng và bit có phép của
+    các ngày trong khoảng (giáo viên điểm danh lại nếu học sinh thực sự vắng). Các ngày thuộc
+    keep_ranges (các đơn xin nghỉ khác vẫn được duyệt) được giữ nguyên.
+    """
+    terms = AcademicTerm.objects.filter(start_date__lte=end_date, end_date__gte=start_date)
+    with transaction.atomic():
+        for term in terms:
+            mask = _range_mask(term.day_index(max(start_date, term.start_date)),
+                               term.day_index(min(end_date, term.end_date)))
+            for keep_start, keep_end in keep_ranges:
+                if keep_start <= term.end_date and keep_end >= term.start_date:
+                    mask &= ~_range_mask(term.day_index(max(keep_start, term.start_date)),
+                                         term.day_index(min(keep_end, term.end_date)))
+            record = StudentAttendance.objects.select_for_update().filter(student=student, term=term).first()
+            if record is None:
+                continue
+            record.absent_bits = _to_bytes(_to_int(record.absent_bits) & ~mask)
+            record.excused_bits = _to_bytes(_to_int(record.excused_bits) & ~mask)
+            record.save(update_fields=['absent_bits', 'excused_bits'])
+
+
+def set_class_absences(school_class, day, absent_student_pks):
+    """
+    Lưu điểm danh một ngày cho cả lớp: học sinh trong absent_student_pks bị đánh dấu vắng,
+    các học sinh khác được xóa bit vắng (trừ những ngày đã được duyệt nghỉ có phép).
+    """
+    term = AcademicTerm.for_date(day)
+    if term is None or not term.is_school_day(day):
+        return None
+    bit = 1 << term.day_index(day)
+    absent_student_pks = set(absent_student_pks)
+    student_pks = list(StudentProfile.objects.filter(current_class=school_class).values_list('pk', flat=True))
+    with transaction.atomic():
+        existing = {
+            record.student_id: record
+            for record in StudentAttendance.objects.select_for_update().filter(term=term, student_id__in=student_pks)
+        }
+        to_create, to_update = [], []
+        for student_pk in student_pks:
+            record = existing.get(student_pk)
+            is_absent = student_pk in absent_student_pks
+            if record is None:
+                if is_absent:
+                    to_create.append(StudentAttendance(student_id=student_pk, term=term, absent_bits=_to_bytes(bit), excused_bits=b''))
+                continue
+            absent, excused = _to_int(record.absent_bits), _to_int(record.excused_bits)
+            new_absent = absent | bit if is_absent else (absent & ~bit) | (excused & bit)
+            if new_absent != absent:
+                record.absent_bits = _to_bytes(new_absent)
+                to_update.append(record)
+        StudentAttendance.objects.bulk_create(to_create)
+        StudentAttendance.objects.bulk_update(to_update, ['absent_bits'])
+    return term
+
+
+def class_attendance_summary(school_class, term, day=None):
+    """
+    Tổng hợp điểm danh của một lớp trong học kỳ từ một truy vấn duy nhất. Chỉ đếm các ngày đi học
+    (bit của cuối tuần/ngày nghỉ lễ, kể cả dữ liệu cũ hoặc ngày lễ khai báo sau, bị bỏ qua).
+    Trả về {student_pk: {'absent': n, 'excused': n, 'unexcused': n, 'absent_on_day': bool}}.
+    """
+    school_days = term.school_day_mask()
+    day_bit = 1 << term.day_index(day) if day and term.contains(day) else 0
+    summary = {}
+    rows = StudentAttendance.objects.filter(
+        term=term, student__current_class=school_class
+    ).values_list('student_id', 'absent_bits', 'excused_bits')
+    for student_pk, absent_bits, excused_bits in rows:
+        absent, excused = _to_int(absent_bits) & school_days, _to_int(excused_bits) & school_days
+        summary[student_pk] = {
+            'absent': absent.bit_count(),
+            'excused': excused.bit_count(),
+            'unexcused': (absent & ~excused).bit_count(),
+            'absent_on_day': bool(absent & day_bit),
+        }
+    return summary
+
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+@register()
+def shared_cache_check(app_configs, **kwargs):
+    # Snapshot bảng điểm, thống kê điểm và ngân hàng nhận xét được xóa/đổi phiên bản khi dữ liệu đổi;
+    # cache riêng từng tiến trình làm các worker khác (và lệnh cron) đọc dữ liệu cũ.
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if backend.endswith('LocMemCache'):
+        return [Warning(
+            "Cache mặc định là LocMemCache (riêng từng tiến trình): trang điểm có thể hiển thị dữ liệu cũ "
+            "khi chạy nhiều worker hoặc khi điểm được ghi bởi lệnh quản trị.",
+            hint="Dùng cache dùng chung (DatabaseCache hoặc Redis) trong CACHES, xem README.",
+            id='academic_records.W001',
+        )]
+    return []
@@ -0,0 +1,246 @@
+"""
+Ngân hàng nhận xét: gợi ý câu khi giáo viên gõ Evaluation.content.
+
+Mỗi nội dung đánh giá được tách thành các câu; mỗi câu là một CommentPhrase của giáo viên
+đã viết, kèm số lần dùng. Ngân hàng chung của trường gộp các câu được dùng từ
+SCHOOL_MIN_USES lần trở lên (câu viết riêng cho một học sinh không lọt vào).
+
+Khi gõ, gợi ý không truy vấn bảng CommentPhrase: mỗi ngân hàng (của giáo viên / của trường)
+được dựng thành một PhraseIndex — danh sách khóa đã sắp xếp, mỗi khóa là câu chuẩn hóa (chữ
+thường, bỏ dấu) bắt đầu từ một từ — và lưu trong cache (và bộ nhớ tiến trình) theo "phiên bản"
+(giống score_stats.py). Mỗi lần gõ chỉ đọc phiên bản của cả hai ngân hàng từ cache dùng chung
+(CACHES) bằng một lần get_many — với DatabaseCache đã cấu hình là một truy vấn nhỏ vào bảng
+cache; nhờ vậy câu mới lưu ở một worker hay lệnh build_comment_bank có hiệu lực ngay ở mọi
+worker. Bộ nhớ tiến trình chỉ giữ chỉ mục theo khóa có phiên bản nên không trả về ngân hàng cũ.
+Tìm gợi ý là một lần bisect trên danh sách khóa, nên gõ "cham chi" khớp cả
+"Em học tập chăm chỉ".
+"""
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from .models import CommentPhrase
+
+
+MIN_PHRASE_LENGTH = 4
+MAX_PHRASE_LENGTH = 255
+MAX_WORD_STARTS = 12  # Chỉ lập chỉ mục từ 12 từ đầu tiên của mỗi câu
+SCHOOL_MIN_USES = 3
+SCHOOL_BANK_SIZE = 5000
+MIN_QUERY_LENGTH = 2
+MAX_SCAN = 2000  # Số khóa tối đa duyệt cho một tiền tố quá ngắn/quá phổ biến
+INDEX_CACHE_TIMEOUT = 60 * 60 * 24  # Đã có phiên bản trong khóa nên có thể giữ lâu
+LOCAL_INDEX_LIMIT = 64  # Số chỉ mục giữ trong bộ nhớ mỗi tiến trình (giáo viên đang gõ gần đây)
+
+_SENTENCE_SPLIT = re.compile(r'[.!?;\n]+')
+_SPACES = re.compile(r'\s+')
+_local_indexes = OrderedDict()  # {khóa cache: PhraseIndex}, cũ nhất trước
+_local_lock = threading.Lock()
+
+
+def normalize(text):
+    """Chữ thường, bỏ dấu tiếng Việt, gộp khoảng trắng: 'Chăm  chỉ' -> 'cham chi'."""
+    text = unicodedata.normalize('NFD', text.lower().replace('đ', 'd').replace('Đ', 'd'))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return _SPACES.sub(' ', text).strip()
+
+
+def split_phrases(content):
+    """{câu chuẩn hóa: câu gốc} của một nội dung đánh giá."""
+    phrases = {}
+    for sentence in _SENTENCE_SPLIT.split(content or ''):
+        sentence = _SPACES.sub(' ', sentence).strip(' ,:-')
+        if MIN_PHRASE_LENGTH <= len(sentence) <= MAX_PHRASE_LENGTH:
+            phrases.setdefault(normalize(sentence), sentence)
+    return phrases
+
+
+class PhraseIndex:
+    """Chỉ mục tiền tố theo đầu từ của một ngân hàng câu (lưu trong cache)."""
+    __slots__ = ('texts', 'normalized', 'counts', 'keys', 'positions')
+
+    def __init__(self, phrases):
+        # phrases: [(câu gốc, câu chuẩn hóa, số lần dùng)]
+        self.texts = [text for text, _, _ in phrases]
+        self.normalized = [norm for _, norm, _ in phrases]
+        self.counts = array('l', (count for _, _, count in phrases))
+        entries = []
+        for i, norm in enumerate(self.normalized):
+            start = 0
+            for _ in range(MAX_WORD_STARTS):
+                entries.append((norm[start:], i))
+                start = norm.find(' ', start) + 1
+                if start == 0:
+                    break
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.positions = array('l', (i for _, i in entries))
+
+    def search(self, query, limit):
+        """[(câu gốc, câu chuẩn hóa, số lần dùng)] có một từ bắt đầu bằng query, dùng nhiều nhất trước."""
+        found = set()
+        i = bisect_left(self.keys, query)
+        end = min(len(self.keys), i + MAX_SCAN)
+        while i < end and self.keys[i].startswith(query):
+            found.add(self.positions[i])
+            i += 1
+        best = sorted(found, key=lambda j: (-self.counts[j], self.texts[j]))[:limit]
+        return [(self.texts[j], self.normalized[j], self.counts[j]) for j in best]
+
+
+def _version_key(scope):
+    return f'comment_bank:version:{scope}'
+
+
+def invalidate_comment_bank(teacher_ids):
+    """Dựng lại chỉ mục của các giáo viên và của trường sau khi transaction hiện tại commit."""
+    scopes = set(teacher_ids) | {'school'}
+
+    def bump():
+        stamp = time.time_ns()
+        cache.set_many({_version_key(scope): stamp for scope in scopes}, None)
+
+    transaction.on_commit(bump)
+
+
+def _versions(scopes):
+    """
+    {scope: phiên bản} đọc bằng một lần get_many; chỉ khi thiếu mới ghi phiên bản mới (add).
+    Không giữ phiên bản trong bộ nhớ tiến trình: worker khác có thể vừa đổi phiên bản.
+    """
+    keys = {_version_key(scope): scope for scope in scopes}
+    versions = {keys[key]: stamp for key, stamp in cache.get_many(list(keys)).items()}
+    for key, scope in keys.items():
+        if scope not in versions:
+            stamp = time.time_ns()
+            # Worker khác có thể vừa ghi phiên bản: add không ghi đè, đọc lại giá trị thắng
+            versions[scope] = stamp if cache.add(key, stamp, None) else cache.get(key, stamp)
+    return versions
+
+
+def _teacher_phrases(teacher_id):
+    return list(CommentPhrase.objects.filter(teacher_id=teacher_id)
+                .values_list('text', 'normalized_text', 'use_count'))
+
+
+def _school_phrases():
+    # Một câu có thể do nhiều giáo viên viết (khác chữ hoa/dấu câu): lấy một cách viết đại diện
+    rows = (CommentPhrase.objects.values('normalized_text')
+            .annotate(total=Sum('use_count'), text=Max('text'))
+            .filter(total__gte=SCHOOL_MIN_USES)
+            .order_by('-total')[:SCHOOL_BANK_SIZE])
+    return [(row['text'], row['normalized_text'], row['total']) for row in rows]
+
+
+def phrase_index(scope, version=None):
+    """
+    PhraseIndex của ngân hàng 'school' hoặc của một giáo viên (scope = teacher_id) ở phiên
+    bản đã đọc (None thì đọc phiên bản từ cache). Chỉ mục của phiên bản hiện tại được giữ sẵn
+    trong bộ nhớ tiến trình (giải nén từ cache chung mất vài chục ms với ngân hàng lớn).
+    """
+    if version is None:
+        version = _versions([scope])[scope]
+    key = f'comment_bank:index:{scope}:{version}'
+    with _local_lock:
+        index = _local_indexes.get(key)
+        if index is not None:
+            _local_indexes.move_to_end(key)
+            return index
+    index = cache.get(key)
+    if index is None:
+        index = PhraseIndex(_school_phrases() if scope == 'school' else _teacher_phrases(scope))
+        cache.set(key, index, INDEX_CACHE_TIMEOUT)
+    with _local_lock:
+        _local_indexes[key] = index
+        while len(_local_indexes) > LOCAL_INDEX_LIMIT:
+            _local_indexes.popitem(last=False)
+    return index
+
+
+def suggest(teacher, query, limit=8):
+    """
+    Gợi ý cho đoạn đang gõ: câu của chính giáo viên trước, sau đó câu của ngân hàng chung.
+    Trả về [{'text', 'uses', 'mine'}].
+    """
+    query = normalize(query)
+    if len(query) < MIN_QUERY_LENGTH:
+        return []
+    suggestions, seen = [], set()
+    versions = _versions([teacher.pk, 'school'])
+    for scope, mine in ((teacher.pk, True), ('school', False)):
+        for text, norm, count in phrase_index(scope, versions[scope]).search(query, limit):
+            if norm not in seen and len(suggestions) < limit:
+                seen.add(norm)
+                suggestions.append({'text': text, 'uses': count, 'mine': mine})
+    return suggestions
+
+
+def record_phrases(teacher_id, contents, previous_contents=()):
+    """
+    Cộng số lần dùng cho các câu trong contents của một giáo viên. Câu đã có trong
+    nội dung cũ tương ứng (previous_contents, khi sửa đánh giá) không được đếm lại.
+    """
+    if not teacher_id:
+        return
+    previous_contents = list(previous_contents) or [''] * len(contents)
+    uses = {}
+    for content, previous in zip(contents, previous_contents):
+        old = split_phrases(previous)
+        for norm, text in split_phrases(content).items():
+            if norm not in old:
+                count = uses.get(norm, (text, 0))[1]
+                uses[norm] = (text, count + 1)
+    if not uses:
+        return
+
+    now = timezone.now()
+    with transaction.atomic():
+        existing = {phrase.normalized_text: phrase for phrase in
+                    CommentPhrase.objects.select_for_update()
+                    .filter(teacher_id=teacher_id, normalized_text__in=list(uses))}
+        to_create = []
+        for norm, (text, count) in uses.items():
+            phrase = existing.get(norm)
+            if phrase is None:
+                to_create.append(CommentPhrase(teacher_id=teacher_id, text=text, normalized_text=norm,
+                                               use_count=count, last_used_at=now))
+            else:
+                phrase.text = text  # Giữ cách viết gần nhất
+                phrase.use_count += count
+                phrase.last_used_at = now
+        CommentPhrase.objects.bulk_create(to_create, batch_size=500)
+        CommentPhrase.objects.bulk_update(list(existing.values()), ['text', 'use_count', 'last_used_at'],
+                                          batch_size=500)
+    invalidate_comment_bank([teacher_id])
+
+
+def rebuild_comment_bank(evaluations):
+    """Dựng lại toàn bộ ngân hàng từ các đánh giá (evaluator_id, content). Trả về số câu."""
+    now = timezone.now()
+    counts = {}
+    for evaluator_id, content in evaluations:
+        if not evaluator_id:
+            continue
+        for norm, text in split_phrases(content).items():
+            _, count = counts.get((evaluator_id, norm), (text, 0))
+            counts[(evaluator_id, norm)] = (text, count + 1)
+    with transaction.atomic():
+        teacher_ids = set(CommentPhrase.objects.values_list('teacher_id', flat=True).distinct())
+        CommentPhrase.objects.all().delete()
+        CommentPhrase.objects.bulk_create(
+            [CommentPhrase(teacher_id=teacher_id, text=text, normalized_text=norm,
+                           use_count=count, last_used_at=now)
+             for (teacher_id, norm), (text, count) in counts.items()],
+            batch_size=1000,
+        )
+    invalidate_comment_bank(teacher_ids | {teacher_id for teacher_id, _ in counts})
+    return len(counts)
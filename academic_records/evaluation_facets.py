@@ -0,0 +1,92 @@
+"""
+Facet cho trang Tổng hợp Đánh giá toàn trường: lớp, môn học, người đánh giá, loại đánh giá.
+
+Số lượng của mọi facet lấy từ MỘT truy vấn GROUP BY (lớp, môn, người đánh giá, loại) trên các
+đánh giá trong khoảng ngày đã chọn. Mỗi facet được đếm trên các nhóm khớp với lựa chọn của
+các facet KHÁC (không tính lựa chọn của chính nó), nên người dùng thấy ngay có bao nhiêu
+đánh giá nếu đổi sang giá trị khác của cùng facet.
+"""
+from collections import Counter
+
+from django.db.models import Count
+
+from accounts.models import User
+from school_data.models import Class as SchoolClass, Subject as SchoolSubject
+from .models import Evaluation
+
+
+# (tên facet / tham số GET, cột nhóm, tiêu đề)
+EVALUATION_FACETS = [
+    ('evaluation_type', 'evaluation_type', 'Loại đánh giá'),
+    ('school_class', 'student__current_class_id', 'Lớp'),
+    ('subject', 'subject_id', 'Môn học'),
+    ('evaluator', 'evaluator_id', 'Người đánh giá'),
+]
+
+
+def filter_by_facets(queryset, selected):
+    """Lọc queryset theo các facet đã chọn ({tên facet: giá trị})."""
+    columns = {name: column for name, column, _ in EVALUATION_FACETS}
+    return queryset.filter(**{columns[name]: value for name, value in selected.items()})
+
+
+def _labels(name, values):
+    if name == 'evaluation_type':
+        return dict(Evaluation.EVALUATION_TYPE_CHOICES)
+    if name == 'school_class':
+        return dict(SchoolClass.objects.filter(pk__in=values).values_list('pk', 'name'))
+    if name == 'subject':
+        return dict(SchoolSubject.objects.filter(pk__in=values).values_list('pk', 'name'))
+    return {user.pk: user.get_full_name() or user.username
+            for user in User.objects.filter(pk__in=values).only('pk', 'username', 'first_name', 'last_name')}
+
+
+def evaluation_facets(queryset, selected):
+    """
+    Trả về (facets, tổng số đánh giá khớp mọi lựa chọn). facets là danh sách
+    {'name', 'title', 'selected', 'values': [{'value', 'label', 'count', 'active'}]},
+    mỗi facet sắp theo số lượng giảm dần. Giá trị rỗng (chưa xếp lớp, đánh giá chung) không
+    được liệt kê.
+    """
+    columns = [column for _, column, _ in EVALUATION_FACETS]
+    groups = list(queryset.order_by().values_list(*columns).annotate(n=Count('pk')))
+
+    counts = {name: Counter() for name, _, _ in EVALUATION_FACETS}
+    total = 0
+    for row in groups:
+        n = row[-1]
+        mismatched = [name for position, (name, _, _) in enumerate(EVALUATION_FACETS)
+                      if name in selected and row[position] != selected[name]]
+        if not mismatched:
+            total += n
+        for position, (name, _, _) in enumerate(EVALUATION_FACETS):
+            # Nhóm được tính cho facet này nếu nó chỉ lệch (nếu có) ở chính facet này
+            if row[position] is not None and (not mismatched or mismatched == [name]):
+                counts[name][row[position]] += n
+
+    facets = []
+    for name, _, title in EVALUATION_FACETS:
+        labels = _labels(name, list(counts[name]))
+        values = [{'value': value, 'label': labels.get(value, value), 'count': count,
+                   'active': selected.get(name) == value}
+                  for value, count in counts[name].most_common()]
+        facets.append({'name': name, 'title': title, 'selected': name in selected, 'values': values})
+    return facets, total
+
+
+def add_facet_links(facets, params):
+    """Gắn chuỗi truy vấn chọn/bỏ chọn cho từng giá trị facet (giữ các tham số khác, về trang 1)."""
+    for facet in facets:
+        for value in facet['values']:
+            query = params.copy()
+            query.pop('page', None)
+            if value['active']:
+                query.pop(facet['name'], None)
+            else:
+                query[facet['name']] = value['value']
+            value['query'] = query.urlencode()
+        query = params.copy()
+        query.pop('page', None)
+        query.pop(facet['name'], None)
+        facet['clear_query'] = query.urlencode()
+    return facets
@@ -0,0 +1,119 @@
+"""
+Nhập đánh giá hạnh kiểm/cuối kỳ cho cả lớp trên một bảng (mỗi học sinh một dòng).
+
+Các đánh giá của người nhập trong học kỳ hiện tại được nạp bằng một truy vấn để điền
+sẵn bảng; khi lưu, đánh giá mới được ghi bằng một lệnh bulk_create, đánh giá đã có bằng
+một lệnh bulk_update. Mỗi học sinh (cùng phụ huynh) nhận một thông báo chứa nội dung đánh
+giá của mình như khi nhập từng đánh giá; các thông báo được ghi bằng một lệnh bulk_create và
+liên kết người nhận bằng một lệnh bulk_create nữa, tất cả trong cùng một transaction.
+Bảng chỉ lưu khi hôm nay thuộc một học kỳ (đánh giá đã có được tìm theo học kỳ).
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import StudentProfile
+from communications.models import Notification
+from .models import Evaluation
+from .comment_bank import record_phrases
+
+
+SHEET_EVALUATION_TYPES = ['CONDUCT', 'TERM_REVIEW']
+
+
+def sheet_evaluations(student_ids, evaluation_type, evaluator, term):
+    """{student_id: Evaluation} mới nhất của người nhập trong học kỳ (None nếu chưa có học kỳ)."""
+    if term is None:
+        return {}
+    existing = {}
+    for evaluation in (Evaluation.objects
+                       .filter(student_id__in=student_ids, evaluation_type=evaluation_type,
+                               evaluator=evaluator, term=term)
+                       .order_by('-evaluation_date', '-pk')):
+        existing.setdefault(evaluation.student_id, evaluation)
+    return existing
+
+
+def _create_notifications(notifications):
+    """bulk_create các thông báo và trả về chúng kèm khóa chính."""
+    Notification.objects.bulk_create(notifications, batch_size=500)
+    if notifications and notifications[0].pk is None:
+        # CSDL không trả về khóa chính sau bulk insert (MySQL): đọc lại bằng một truy vấn.
+        # Các thông báo cùng tiêu đề và nội dung thì giống hệt nhau nên gán theo thứ tự là đủ.
+        pending = defaultdict(list)
+        for notification in notifications:
+            pending[(notification.title, notification.content)].append(notification)
+        refetch = (Notification.objects
+                   .filter(sent_by=notifications[0].sent_by, publish_time=notifications[0].publish_time,
+                           title__in={n.title for n in notifications})
+                   .order_by('pk').values_list('pk', 'title', 'content'))
+        for pk, title, content in refetch:
+            waiting = pending.get((title, content))
+            if waiting:
+                waiting.pop(0).pk = pk
+    return notifications
+
+
+def save_class_evaluations(school_class, evaluation_type, contents, evaluator, term):
+    """
+    Lưu đánh giá của cả lớp trong học kỳ term (bắt buộc). contents: {student_id: nội dung};
+    nội dung rỗng bị bỏ qua, đánh giá đã có trong học kỳ (của cùng người nhập) được cập nhật
+    thay vì tạo thêm. Trả về (số đánh giá mới, số đánh giá cập nhật).
+    """
+    if term is None:
+        raise ValueError("Cần có học kỳ để lưu bảng đánh giá.")
+    today = timezone.localdate()
+    label = dict(Evaluation.EVALUATION_TYPE_CHOICES).get(evaluation_type, evaluation_type)
+
+    with transaction.atomic():
+        existing = sheet_evaluations(list(contents), evaluation_type, evaluator, term)
+        to_create, to_update, previous_contents = [], [], []
+        for student_id, content in contents.items():
+            content = (content or '').strip()
+            if not content:
+                continue
+            evaluation = existing.get(student_id)
+            if evaluation is None:
+                to_create.append(Evaluation(
+                    student_id=student_id, evaluator=evaluator, evaluation_type=evaluation_type,
+                    evaluation_date=today, content=content, term=term,
+                ))
+            elif evaluation.content != content:
+                previous_contents.append(evaluation.content)
+                evaluation.content = content
+                evaluation.evaluation_date = today
+                to_update.append(evaluation)
+        Evaluation.objects.bulk_create(to_create, batch_size=500)
+        Evaluation.objects.bulk_update(to_update, ['content', 'evaluation_date'], batch_size=500)
+        # bulk_create/bulk_update không phát tín hiệu: tự cập nhật ngân hàng nhận xét
+        record_phrases(evaluator.pk, [e.content for e in to_create] + [e.content for e in to_update],
+                       [''] * len(to_create) + previous_contents)
+
+        changed = to_create + to_update
+        if changed:
+            # StudentProfile/ParentProfile dùng user làm khóa chính
+            students = StudentProfile.objects.select_related('user').in_bulk([e.student_id for e in changed])
+            now = timezone.now()
+            notifications, recipients = [], []
+            for evaluation in changed:
+                student = students[evaluation.student_id]
+                student_name = student.user.get_full_name() or student.user.username
+                notifications.append(Notification(
+                    title=f"{label} cho học sinh {student_name}",
+                    content=(f"Nhà trường xin thông báo về {label.lower()} {term.name} của học sinh "
+                             f"{student_name} (lớp {school_class.name}): {evaluation.content}"),
+                    sent_by=evaluator,
+                    status='SENT',
+                    is_published=True,
+                    publish_time=now,
+                ))
+                recipients.append([student.pk] + ([student.parent_id] if student.parent_id else []))
+            _create_notifications(notifications)
+            through_model = Notification.target_users.through
+            through_model.objects.bulk_create(
+                [through_model(notification_id=notification.pk, user_id=user_id)
+                 for notification, user_ids in zip(notifications, recipients) for user_id in user_ids],
+                batch_size=1000,
+            )
+    return len(to_create), len(to_update)
@@ -95,6 +95,36 @@ class ScoreEntryForm(forms.ModelForm):
             self.fields['student_name'].initial = self.instance.student.user.get_full_name() or self.instance.student.user.username
             self.fields['student_id'].initial = self.instance.student.pk
 
+class ScoreImportForm(forms.Form):
+    """
+    Form tải lên file điểm (CSV/XLSX) để nhập hàng loạt, xem score_import.py.
+    """
+    file = forms.FileField(
+        label="File điểm (.csv hoặc .xlsx)",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'}),
+        help_text="Dòng đầu là tiêu đề cột: student, subject, exam_type, exam_date, score (bắt buộc); notes, term (tên học kỳ, tùy chọn)."
+    )
+
+    def clean_file(self):
+        uploaded = self.cleaned_data['file']
+        if not uploaded.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError("Chỉ hỗ trợ file .csv hoặc .xlsx.")
+        return uploaded
+
+
+class ScoreReleaseForm(ScoreContextForm):
+    """
+    Hẹn giờ công bố điểm một bài kiểm tra (lớp × môn × loại điểm × ngày thi), xem score_release.py.
+    Để trống thời điểm (hoặc chọn thời điểm đã qua) thì điểm được công bố ngay.
+    """
+    release_at = forms.DateTimeField(
+        label="Thời điểm công bố",
+        required=False,
+        input_formats=['%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M'],
+        widget=forms.DateTimeInput(attrs={'type': 'datetime-local', 'class': 'form-control'}, format='%Y-%m-%dT%H:%M'),
+        help_text="Để trống để công bố ngay."
+    )
+
 from django import forms
 from .models import Score, RewardAndDiscipline, Evaluation # Thêm RewardAndDiscipline
 from accounts.models import StudentProfile, User 
@@ -265,3 +295,65 @@ class EvaluationSubjectReviewForm(forms.ModelForm):
         self.fields['student'].label_from_instance = lambda obj: obj.user.get_full_name() or obj.user.username
         self.fields['subject'].label_from_instance = lambda obj: obj.name
         self.fields['subject'].required = True
+
+
+class ClassEvaluationRowForm(forms.Form):
+    """
+    Một dòng (một học sinh) của bảng nhập đánh giá cả lớp, dùng trong formset_factory.
+    """
+    student_id = forms.IntegerField(widget=forms.HiddenInput())
+    content = forms.CharField(
+        label="Nội dung đánh giá",
+        required=False,  # Để trống thì bỏ qua học sinh này
+        widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 2, 'placeholder': 'Nhập đánh giá...'}),
+    )
+
+
+class EvaluationFacetForm(forms.Form):
+    """
+    Bộ lọc (GET) cho trang Tổng hợp Đánh giá toàn trường. Các facet (lớp, môn, người đánh giá,
+    loại) được chọn qua liên kết nên là trường ẩn; khoảng ngày nhập trên form.
+    """
+    school_class = forms.IntegerField(required=False, min_value=1, label="Lớp", widget=forms.HiddenInput())
+    subject = forms.IntegerField(required=False, min_value=1, label="Môn học", widget=forms.HiddenInput())
+    evaluator = forms.IntegerField(required=False, min_value=1, label="Người đánh giá", widget=forms.HiddenInput())
+    evaluation_type = forms.ChoiceField(
+        choices=[('', '')] + Evaluation.EVALUATION_TYPE_CHOICES,
+        required=False,
+        label="Loại đánh giá",
+        widget=forms.HiddenInput()
+    )
+    date_from = forms.DateField(
+        required=False,
+        label="Từ ngày",
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'})
+    )
+    date_to = forms.DateField(
+        required=False,
+        label="Đến ngày",
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'})
+    )
+
+    def valid_data(self):
+        """
+        Giá trị của các trường hợp lệ. Lỗi ở một trường (VD: ngày sai định dạng) chỉ bỏ trường đó
+        và được hiển thị trên form; các lựa chọn khác vẫn được giữ.
+        """
+        if not self.is_bound:
+            return {}
+        self.is_valid()
+        return self.cleaned_data
+
+    def selected_facets(self):
+        """{tên facet: giá trị đã chọn} (bỏ qua các facet không chọn hoặc không hợp lệ)."""
+        data = self.valid_data()
+        return {name: data[name] for name in ('school_class', 'subject', 'evaluator', 'evaluation_type')
+                if data.get(name)}
+
+    def filter_dates(self, queryset):
+        data = self.valid_data()
+        if data.get('date_from'):
+            queryset = queryset.filter(evaluation_date__gte=data['date_from'])
+        if data.get('date_to'):
+            queryset = queryset.filter(evaluation_date__lte=data['date_to'])
+        return queryset
@@ -0,0 +1,338 @@
+"""
+Bảng điểm (gradebook) dùng chung cho các trang xem điểm.
+
+Điểm của mỗi lớp được "vật chất hóa" thành một snapshot gọn (các mảng song song,
+xem ClassSnapshot) lưu trong cache dùng chung của mọi tiến trình (settings.CACHES; việc
+xóa snapshot khi điểm đổi phải được mọi worker và lệnh quản trị nhìn thấy). Các trang xem điểm đọc snapshot thay vì truy vấn Score; lớp
+chưa có snapshot được dựng lại bằng MỘT truy vấn chung. Snapshot bị xóa chính
+xác theo lớp khi điểm thay đổi (post_save/post_delete của Score, các đường ghi
+hàng loạt) hoặc khi học sinh chuyển lớp, xem signals.py.
+
+Trong bộ nhớ, điểm được xoay (pivot) thành cấu trúc học sinh × môn × loại
+điểm mà template duyệt trực tiếp. Mỗi ô chỉ giữ vị trí các điểm trong snapshot
+(ScoreCell); đối tượng ScoreRow (__slots__) được dựng khi template duyệt ô rồi bỏ đi,
+học sinh là bảng tra StudentRow đọc bằng values_list, nên một trang tổng hợp không
+phải giữ hàng chục nghìn đối tượng Score/StudentProfile/User cùng lúc.
+"""
+from array import array
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+
+from accounts.models import StudentProfile
+from .models import Score
+
+
+EXAM_TYPE_LABELS = dict(Score.EXAM_TYPE_CHOICES)
+
+# Thứ tự hiển thị các loại điểm trong một ô của bảng điểm (sắp trong bộ nhớ trên snapshot,
+# xem fetch_score_grid/class_score_matrix; report_cards.py dùng cùng thứ tự).
+EXAM_TYPE_ORDER = [
+    'ORAL_TEST', '15_MIN_TEST', '45_MIN_TEST',
+    'MID_TERM_1', 'END_TERM_1',
+    'MID_TERM_2', 'END_TERM_2',
+    'FINAL_EXAM',
+]
+
+SNAPSHOT_TIMEOUT = 60 * 60 * 24  # Snapshot bị xóa khi dữ liệu đổi; thời hạn chỉ để dọn cache
+SNAPSHOT_FORMAT = 5  # Tăng khi đổi cấu trúc snapshot để không đọc nhầm snapshot cũ còn trong cache
+
+EXAM_TYPE_CODES = [key for key, _ in Score.EXAM_TYPE_CHOICES]
+EXAM_TYPE_CODE_INDEX = {key: i for i, key in enumerate(EXAM_TYPE_CODES)}
+# Chỉ số dành cho mã loại điểm ngoài EXAM_TYPE_CHOICES (dữ liệu cũ, ghi bằng SQL/bulk_create):
+# mã gốc được giữ riêng để vẫn hiển thị, thay vì làm hỏng snapshot của cả lớp
+OTHER_EXAM_TYPE = len(EXAM_TYPE_CODES)
+CENTS = Decimal('0.01')
+
+
+def _snapshot_key(class_id):
+    return f'gradebook:v{SNAPSHOT_FORMAT}:class:{class_id}'
+
+
+class ClassSnapshot:
+    """
+    Điểm của một lớp dạng các mảng song song (array): mỗi điểm là một vị trí i trong
+    các mảng. Loại điểm lưu theo chỉ số trong EXAM_TYPE_CODES (mã lạ là OTHER_EXAM_TYPE, mã gốc
+    trong other_exam_types), ngày thi theo ordinal, điểm số theo phần trăm điểm (7.25 → 725),
+    học kỳ rỗng là 0.
+    """
+    __slots__ = ('pk', 'student_id', 'subject_id', 'exam_type', 'other_exam_types', 'exam_date', 'score_value',
+                 'notes', 'term_id', 'is_published')
+
+    def __init__(self):
+        self.pk = array('q')
+        self.student_id = array('q')
+        self.subject_id = array('q')
+        self.exam_type = array('B')
+        self.other_exam_types = {}  # {vị trí: mã loại điểm gốc} cho các mã ngoài EXAM_TYPE_CODES
+        self.exam_date = array('l')
+        self.score_value = array('h')  # Có dấu: dữ liệu cũ có thể có điểm âm (DecimalField(4, 2) nên |điểm| ≤ 99.99)
+        self.notes = []  # Phần lớn là None/chuỗi rỗng dùng chung
+        self.term_id = array('q')
+        self.is_published = array('b')
+
+    def __len__(self):
+        return len(self.pk)
+
+    def append(self, pk, student_id, subject_id, exam_type, exam_date, score_value, notes, term_id, is_published):
+        self.pk.append(pk)
+        self.student_id.append(student_id)
+        self.subject_id.append(subject_id)
+        type_index = EXAM_TYPE_CODE_INDEX.get(exam_type, OTHER_EXAM_TYPE)
+        if type_index == OTHER_EXAM_TYPE:
+            self.other_exam_types[len(self.pk) - 1] = exam_type
+        self.exam_type.append(type_index)
+        self.exam_date.append(exam_date.toordinal())
+        self.score_value.append(int(score_value * 100))
+        self.notes.append(notes or None)
+        self.term_id.append(term_id or 0)
+        self.is_published.append(is_published)
+
+    def exam_type_code(self, i):
+        type_index = self.exam_type[i]
+        if type_index == OTHER_EXAM_TYPE:
+            return self.other_exam_types[i]
+        return EXAM_TYPE_CODES[type_index]
+
+    def value(self, i):
+        return Decimal(self.score_value[i]).scaleb(-2)
+
+    def score(self, i):
+        """Score (chỉ để đọc, không lưu) của vị trí i."""
+        return Score(pk=self.pk[i], student_id=self.student_id[i], subject_id=self.subject_id[i],
+                     exam_type=self.exam_type_code(i), exam_date=date.fromordinal(self.exam_date[i]),
+                     score_value=self.value(i), notes=self.notes[i],
+                     term_id=self.term_id[i] or None, is_published=bool(self.is_published[i]))
+
+
+def class_snapshots(class_ids):
+    """
+    {class_id: ClassSnapshot} đọc từ cache bằng một lần get_many; các lớp chưa có
+    snapshot được dựng bằng một truy vấn chung rồi ghi lại vào cache.
+    """
+    keys = {_snapshot_key(class_id): class_id for class_id in set(class_ids)}
+    snapshots = {keys[key]: snapshot for key, snapshot in cache.get_many(keys).items()}
+    missing = [class_id for class_id in keys.values() if class_id not in snapshots]
+    if missing:
+        built = {class_id: ClassSnapshot() for class_id in missing}
+        rows = (Score.objects.filter(student__current_class_id__in=missing)
+                .order_by('pk')
+                .values_list('student__current_class_id', 'pk', 'student_id', 'subject_id', 'exam_type',
+                             'exam_date', 'score_value', 'notes', 'term_id', 'is_published'))
+        for class_id, *row in rows:
+            built[class_id].append(*row)
+        cache.set_many({_snapshot_key(class_id): snapshot for class_id, snapshot in built.items()}, SNAPSHOT_TIMEOUT)
+        snapshots.update(built)
+    return snapshots
+
+
+def class_scores(class_ids, subject_ids=None):
+    """Các Score (dựng từ snapshot, chỉ để đọc) của các lớp, lọc theo môn nếu có."""
+    subject_ids = set(subject_ids) if subject_ids is not None else None
+    scores = []
+    for snapshot in class_snapshots(class_ids).values():
+        for i, subject_id in enumerate(snapshot.subject_id):
+            if subject_ids is None or subject_id in subject_ids:
+                scores.append(snapshot.score(i))
+    return scores
+
+
+def scores_for_students(students, published_only=False):
+    """
+    Các Score của các học sinh: từ snapshot của lớp; học sinh chưa có lớp thì truy vấn trực tiếp.
+
+    published_only=True (trang của học sinh/phụ huynh) luôn đọc các điểm đã công bố từ CSDL
+    qua index (student, is_published), không qua snapshot: ngay khi lệnh release_scores báo
+    điểm đã có, trang điểm phải hiển thị đúng dù snapshot trong cache chưa kịp bị xóa.
+    """
+    if published_only:
+        return list(Score.objects.filter(student_id__in=[student.pk for student in students], is_published=True))
+    by_class = defaultdict(set)
+    without_class = []
+    for student in students:
+        if student.current_class_id:
+            by_class[student.current_class_id].add(student.pk)
+        else:
+            without_class.append(student.pk)
+    scores = []
+    for class_id, snapshot in class_snapshots(by_class).items():
+        wanted = by_class[class_id]
+        scores.extend(snapshot.score(i) for i, student_id in enumerate(snapshot.student_id) if student_id in wanted)
+    if without_class:
+        scores.extend(Score.objects.filter(student_id__in=without_class))
+    return scores
+
+
+class ScoreRow:
+    """Một điểm chỉ để hiển thị (thay cho Score), dựng khi duyệt một ô của bảng điểm."""
+    __slots__ = ('pk', 'exam_type', 'exam_type_order', 'exam_date', 'score_value', 'notes', 'is_published')
+
+    def __init__(self, snapshot, i, exam_type_order):
+        self.pk = snapshot.pk[i]
+        self.exam_type = snapshot.exam_type_code(i)
+        self.exam_type_order = exam_type_order
+        self.exam_date = date.fromordinal(snapshot.exam_date[i])
+        self.score_value = snapshot.value(i)
+        self.notes = snapshot.notes[i]
+        self.is_published = bool(snapshot.is_published[i])
+
+    def get_exam_type_display(self):
+        return EXAM_TYPE_LABELS.get(self.exam_type, self.exam_type)
+
+    @property
+    def exam_type_display(self):
+        return self.get_exam_type_display()
+
+
+class ScoreCell:
+    """
+    Các điểm của một ô (học sinh × môn): chỉ giữ snapshot và mảng vị trí đã sắp xếp;
+    các ScoreRow được dựng khi duyệt (template, thống kê) rồi bỏ đi ngay.
+    """
+    __slots__ = ('snapshot', 'indexes', 'orders')
+
+    def __init__(self, snapshot, indexes, orders):
+        self.snapshot = snapshot
+        self.indexes = indexes
+        self.orders = orders
+
+    def __len__(self):
+        return len(self.indexes)
+
+    def __iter__(self):
+        for i, order in zip(self.indexes, self.orders):
+            yield ScoreRow(self.snapshot, i, order)
+
+
+class StudentRow:
+    """Một học sinh chỉ để hiển thị (thay cho StudentProfile kèm User)."""
+    __slots__ = ('pk', 'full_name', 'date_of_birth')
+
+    def __init__(self, pk, full_name, date_of_birth):
+        self.pk = pk
+        self.full_name = full_name
+        self.date_of_birth = date_of_birth
+
+
+def student_rows_by_class(class_ids):
+    """{class_id: [StudentRow, ...]} theo thứ tự họ tên, đọc bằng một truy vấn values_list."""
+    students = defaultdict(list)
+    rows = (StudentProfile.objects.filter(current_class_id__in=class_ids)
+            .order_by('user__last_name', 'user__first_name')
+            .values_list('pk', 'current_class_id', 'user__username', 'user__first_name', 'user__last_name',
+                         'date_of_birth'))
+    for pk, class_id, username, first_name, last_name, date_of_birth in rows:
+        full_name = f"{first_name} {last_name}".strip() or username  # Như User.get_full_name()
+        students[class_id].append(StudentRow(pk, full_name, date_of_birth))
+    return students
+
+
+def _type_orders():
+    """Vị trí trong EXAM_TYPE_ORDER theo chỉ số loại điểm của snapshot (mã lạ xếp cuối)."""
+    type_index = {key: i for i, key in enumerate(EXAM_TYPE_ORDER)}
+    return [type_index.get(code, len(EXAM_TYPE_ORDER)) for code in EXAM_TYPE_CODES] + [len(EXAM_TYPE_ORDER)]
+
+
+def invalidate_class_snapshots(class_ids):
+    """Xóa snapshot của các lớp sau khi transaction hiện tại commit."""
+    keys = [_snapshot_key(class_id) for class_id in set(class_ids) if class_id]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_snapshots_for_students(student_ids):
+    class_ids = (StudentProfile.objects.filter(pk__in=set(student_ids), current_class__isnull=False)
+                 .values_list('current_class_id', flat=True).distinct())
+    invalidate_class_snapshots(list(class_ids))
+
+
+def fetch_score_grid(classes, subjects):
+    """
+    Điểm của mọi học sinh thuộc `classes` ở các môn `subjects`, đọc từ snapshot của lớp.
+
+    Trả về {student_id: {subject_id: ScoreCell}}; các điểm trong mỗi ô được sắp theo
+    ngày thi rồi theo thứ tự loại điểm (exam_type_order).
+    """
+    class_ids = [getattr(c, 'pk', c) for c in classes]
+    subject_ids = {getattr(s, 'pk', s) for s in subjects}
+    grid = defaultdict(dict)
+    if not class_ids or not subject_ids:
+        return grid
+
+    orders = _type_orders()
+    for snapshot in class_snapshots(class_ids).values():
+        positions = defaultdict(list)
+        for i, (student_id, subject_id) in enumerate(zip(snapshot.student_id, snapshot.subject_id)):
+            if subject_id in subject_ids:
+                positions[student_id, subject_id].append(i)
+        for (student_id, subject_id), indexes in positions.items():
+            indexes.sort(key=lambda i: (snapshot.exam_date[i], orders[snapshot.exam_type[i]], snapshot.exam_type_code(i)))
+            grid[student_id][subject_id] = ScoreCell(snapshot, array('l', indexes),
+                                                     bytes(orders[snapshot.exam_type[i]] for i in indexes))
+    return grid
+
+
+def subject_tables(students, subjects, grid):
+    """
+    Dựng {subject: [(student, ScoreCell), ...]} từ lưới điểm, giữ nguyên thứ tự của
+    `students` và `subjects`; ô trống dùng chung một tuple rỗng.
+    """
+    empty = ()
+    return {
+        subject: [(student, grid.get(student.pk, {}).get(subject.pk, empty)) for student in students]
+        for subject in subjects
+    }
+
+
+def class_score_matrix(school_class, students, subjects):
+    """
+    Nạp toàn bộ điểm của một lớp (từ snapshot) vào ma trận môn × học sinh ×
+    loại điểm (danh sách lồng nhau các vị trí trong snapshot, truy cập theo chỉ số).
+
+    Trả về {subject: {'rows': [...], 'average': ..., 'fill_rate': ..., 'score_count': ...}}:
+    mỗi phần tử của 'rows' là {'student': ..., 'scores': ScoreCell}, điểm đã xếp theo
+    loại điểm rồi ngày thi. Điểm trung bình và tỉ lệ học sinh đã có điểm của
+    từng môn được tính trên cùng ma trận đó, không cần thêm truy vấn.
+    """
+    student_index = {student.pk: i for i, student in enumerate(students)}
+    subject_index = {subject.pk: j for j, subject in enumerate(subjects)}
+    orders = _type_orders()
+    n_types = len(EXAM_TYPE_ORDER) + 1  # ô cuối cho loại điểm ngoài EXAM_TYPE_ORDER
+
+    matrix = [[[[] for _ in range(n_types)] for _ in students] for _ in subjects]
+    totals = [0] * len(subjects)  # Tổng theo phần trăm điểm (số nguyên)
+    counts = [0] * len(subjects)
+
+    class_id = getattr(school_class, 'pk', school_class)
+    snapshot = class_snapshots([class_id])[class_id]
+    for position, (student_id, subject_id) in enumerate(zip(snapshot.student_id, snapshot.subject_id)):
+        j = subject_index.get(subject_id)
+        i = student_index.get(student_id)
+        if j is None or i is None:
+            continue
+        matrix[j][i][orders[snapshot.exam_type[position]]].append(position)
+        totals[j] += snapshot.score_value[position]
+        counts[j] += 1
+
+    result = {}
+    for j, subject in enumerate(subjects):
+        filled = 0
+        subject_rows = []
+        for i, student in enumerate(students):
+            indexes = []
+            for by_type in matrix[j][i]:
+                by_type.sort(key=lambda position: snapshot.exam_date[position])
+                indexes.extend(by_type)
+            filled += bool(indexes)
+            cell = ScoreCell(snapshot, array('l', indexes), bytes(orders[snapshot.exam_type[k]] for k in indexes))
+            subject_rows.append({'student': student, 'scores': cell})
+        result[subject] = {
+            'rows': subject_rows,
+            'average': (Decimal(totals[j]) / counts[j] * CENTS).quantize(CENTS) if counts[j] else None,
+            'fill_rate': round(100 * filled / len(students)) if students else 0,
+            'score_count': counts[j],
+        }
+    return result
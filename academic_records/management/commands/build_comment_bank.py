@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from academic_records.comment_bank import rebuild_comment_bank
+from academic_records.models import Evaluation
+
+
+class Command(BaseCommand):
+    help = (
+        "Dựng lại ngân hàng nhận xét (gợi ý khi gõ đánh giá) từ toàn bộ các đánh giá đã có. "
+        "Bình thường ngân hàng được cập nhật tự động khi lưu đánh giá; lệnh này dùng để khởi tạo "
+        "hoặc đồng bộ lại dữ liệu."
+    )
+
+    def handle(self, *args, **options):
+        evaluations = Evaluation.objects.values_list('evaluator_id', 'content').iterator(chunk_size=2000)
+        phrase_count = rebuild_comment_bank(evaluations)
+        self.stdout.write(self.style.SUCCESS(f"Đã dựng lại ngân hàng nhận xét: {phrase_count} câu."))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from academic_records.models import Score
+from academic_records.term_results import compute_term_results
+from school_data.models import AcademicTerm, Class as SchoolClass
+
+
+class Command(BaseCommand):
+    help = (
+        "Tính lại toàn bộ kết quả học kỳ (điểm TB có trọng số, ĐTB chung, xếp hạng trong lớp). "
+        "Bình thường kết quả được tính lại tự động khi điểm thay đổi; lệnh này dùng để khởi tạo "
+        "hoặc đồng bộ lại dữ liệu."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--term', help="Chỉ tính cho học kỳ này (tên hoặc id Học kỳ).")
+        parser.add_argument('--class-id', type=int, help="Chỉ tính cho lớp có id này.")
+
+    def handle(self, *args, **options):
+        if options['term']:
+            lookup = {'pk': options['term']} if options['term'].isdigit() else {'name': options['term']}
+            terms = list(AcademicTerm.objects.filter(**lookup))
+            if not terms:
+                raise CommandError(f"Không tìm thấy học kỳ '{options['term']}'.")
+        else:
+            terms = list(AcademicTerm.objects.filter(pk__in=Score.objects.values('term_id')).order_by('start_date'))
+
+        classes = SchoolClass.objects.order_by('name')
+        if options['class_id']:
+            classes = classes.filter(pk=options['class_id'])
+
+        for school_class in classes:
+            for term in terms:
+                results = compute_term_results(school_class, term)
+                if results:
+                    self.stdout.write(f"{school_class.name} - {term.name}: {len(results)} học sinh.")
+        self.stdout.write(self.style.SUCCESS("Đã tính xong kết quả học kỳ."))
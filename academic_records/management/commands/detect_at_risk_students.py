@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from academic_records.at_risk import detect_at_risk_students
+from school_data.models import AcademicTerm
+
+
+class Command(BaseCommand):
+    help = (
+        "Lập danh sách học sinh có nguy cơ học yếu (ĐTB/môn dưới ngưỡng hoặc điểm giảm dần) cho toàn "
+        "trường trong một học kỳ. Chạy định kỳ (ví dụ: cron mỗi đêm); trang GVCN và phụ huynh đọc kết quả đã lưu."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--term', help="Học kỳ cần tính (tên hoặc id); mặc định là học kỳ hiện tại.")
+
+    def handle(self, *args, **options):
+        if options['term']:
+            lookup = {'pk': options['term']} if options['term'].isdigit() else {'name': options['term']}
+            term = AcademicTerm.objects.filter(**lookup).first()
+            if term is None:
+                raise CommandError(f"Không tìm thấy học kỳ '{options['term']}'.")
+        else:
+            term = AcademicTerm.for_date(timezone.localdate())
+            if term is None:
+                self.stdout.write("Hôm nay không thuộc học kỳ nào; không có gì để tính.")
+                return
+
+        flagged = detect_at_risk_students(term)
+        self.stdout.write(self.style.SUCCESS(f"{term.name}: {len(flagged)} học sinh cần lưu ý."))
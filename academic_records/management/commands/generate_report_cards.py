@@ -0,0 +1,91 @@
+import importlib.util
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from academic_records.report_cards import collect_class_report_data, render_report_card, init_worker
+from school_data.models import AcademicTerm, Class as SchoolClass
+
+
+class Command(BaseCommand):
+    help = (
+        "Tạo phiếu báo điểm cho từng học sinh (HTML, và PDF nếu có WeasyPrint): điểm số, kết quả học kỳ, "
+        "hạnh kiểm/đánh giá cuối kỳ, khen thưởng/kỷ luật. Dữ liệu được nạp theo lớp, việc render "
+        "được chia cho nhiều tiến trình."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--term', help="Học kỳ cần in (tên hoặc id); mặc định in toàn bộ dữ liệu.")
+        parser.add_argument('--class-id', type=int, action='append', help="Chỉ tạo cho lớp này (có thể lặp lại).")
+        parser.add_argument('--output-dir', default='report_cards', help="Thư mục ghi phiếu báo điểm.")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Số tiến trình render; 1 để render ngay trong tiến trình hiện tại.")
+        parser.add_argument('--pdf', action='store_true', help="Tạo thêm file PDF (cần WeasyPrint).")
+
+    def handle(self, *args, **options):
+        term = None
+        if options['term']:
+            lookup = {'pk': options['term']} if options['term'].isdigit() else {'name': options['term']}
+            term = AcademicTerm.objects.filter(**lookup).first()
+            if term is None:
+                raise CommandError(f"Không tìm thấy học kỳ '{options['term']}'.")
+        want_pdf = options['pdf']
+        if want_pdf and importlib.util.find_spec('weasyprint') is None:
+            self.stderr.write(self.style.WARNING("Chưa cài WeasyPrint: chỉ tạo file HTML."))
+            want_pdf = False
+
+        classes = SchoolClass.objects.order_by('name')
+        if options['class_id']:
+            classes = classes.filter(pk__in=options['class_id'])
+            if not classes.exists():
+                raise CommandError("Không tìm thấy lớp nào với id đã cho.")
+        output_dir = options['output_dir']
+        os.makedirs(output_dir, exist_ok=True)
+        workers = max(1, options['workers'])
+
+        done = 0
+        failures = []
+
+        def report(username, error=None):
+            nonlocal done
+            done += 1
+            if error is not None:
+                failures.append((username, error))
+                self.stderr.write(self.style.ERROR(f"Lỗi khi tạo phiếu của {username}: {error}"))
+            if done % 100 == 0:
+                self.stdout.write(f"Đã xử lý {done} học sinh...")
+
+        if workers == 1:
+            for school_class in classes:
+                for context in collect_class_report_data(school_class, term):
+                    try:
+                        render_report_card(context, output_dir, want_pdf)
+                    except Exception as exc:
+                        report(context['student']['username'], exc)
+                    else:
+                        report(context['student']['username'])
+        else:
+            # Các tiến trình con chỉ render, không dùng kết nối CSDL kế thừa từ tiến trình cha
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+                futures = {}
+                for school_class in classes:
+                    class_data = collect_class_report_data(school_class, term)
+                    for context in class_data:
+                        futures[pool.submit(render_report_card, context, output_dir, want_pdf)] = context['student']['username']
+                    self.stdout.write(f"Lớp {school_class.name}: đã nạp dữ liệu {len(class_data)} học sinh.")
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except Exception as exc:
+                        report(futures[future], exc)
+                    else:
+                        report(futures[future])
+
+        summary = f"Đã tạo {done - len(failures)}/{done} phiếu báo điểm trong '{output_dir}'."
+        if failures:
+            self.stderr.write(self.style.ERROR(f"{summary} {len(failures)} phiếu bị lỗi."))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
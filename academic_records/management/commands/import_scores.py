@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from academic_records.score_import import ScoreImporter, ScoreImportError, MAX_REPORTED_ERRORS, CHUNK_SIZE
+from accounts.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Nhập điểm hàng loạt từ file CSV/XLSX (đọc tuần tự, ghi theo lô). "
+        "Cột bắt buộc: student, subject, exam_type, exam_date, score; tùy chọn: notes, term (tên học kỳ)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Đường dẫn file .csv hoặc .xlsx.")
+        parser.add_argument('--changed-by', help="Tên đăng nhập được ghi vào lịch sử điểm.")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Số dòng ghi trong một transaction.")
+
+    def handle(self, *args, **options):
+        changed_by = None
+        if options['changed_by']:
+            changed_by = User.objects.filter(username=options['changed_by']).first()
+            if changed_by is None:
+                raise CommandError(f"Không tìm thấy người dùng '{options['changed_by']}'.")
+
+        importer = ScoreImporter(changed_by=changed_by, chunk_size=max(1, options['chunk_size']))
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                importer.run(fileobj, options['path'],
+                             progress=lambda rows: self.stdout.write(f"Đã xử lý {rows} dòng..."))
+        except OSError as exc:
+            raise CommandError(f"Không mở được file: {exc}")
+        except ScoreImportError as exc:
+            raise CommandError(str(exc))
+
+        for line_number, message in importer.errors:
+            self.stderr.write(f"Dòng {line_number}: {message}")
+        if importer.error_count > len(importer.errors):
+            self.stderr.write(f"... và {importer.error_count - MAX_REPORTED_ERRORS} dòng lỗi khác.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Đã đọc {importer.row_count} dòng: lưu {importer.saved_count} điểm mới, "
+            f"cập nhật {importer.updated_count} điểm, {importer.error_count} dòng lỗi."
+        ))
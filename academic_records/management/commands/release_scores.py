@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from academic_records.score_release import release_due_scores
+
+
+class Command(BaseCommand):
+    help = (
+        "Công bố điểm của các đợt công bố đã đến hạn: bật hiển thị điểm cho học sinh/phụ huynh và gửi "
+        "mỗi người một thông báo gộp. Chạy định kỳ (ví dụ: cron mỗi 5 phút)."
+    )
+
+    def handle(self, *args, **options):
+        released, score_count, recipient_count = release_due_scores()
+        if not released:
+            self.stdout.write("Không có đợt công bố điểm nào đến hạn.")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Đã công bố {len(released)} đợt ({score_count} điểm) và gửi thông báo tới {recipient_count} người."
+        ))
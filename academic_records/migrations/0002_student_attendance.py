@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic_records', '0001_initial'),
+        ('accounts', '0006_user_department'),
+        ('school_data', '0003_academic_term'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentAttendance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('absent_bits', models.BinaryField(default=b'', verbose_name='Các ngày vắng mặt')),
+                ('excused_bits', models.BinaryField(default=b'', verbose_name='Các ngày nghỉ có phép')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_records', to='accounts.studentprofile', verbose_name='Học sinh')),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_records', to='school_data.academicterm', verbose_name='Học kỳ')),
+            ],
+            options={
+                'verbose_name': 'Điểm danh',
+                'verbose_name_plural': 'Dữ liệu Điểm danh',
+                'unique_together': {('student', 'term')},
+            },
+        ),
+    ]
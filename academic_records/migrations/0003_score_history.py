@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic_records', '0002_student_attendance'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('old_value', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True, verbose_name='Điểm cũ')),
+                ('new_value', models.DecimalField(decimal_places=2, max_digits=4, verbose_name='Điểm mới')),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Thời gian thay đổi')),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='score_changes', to=settings.AUTH_USER_MODEL, verbose_name='Người thay đổi')),
+                ('score', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='history', to='academic_records.score', verbose_name='Điểm số')),
+            ],
+            options={
+                'verbose_name': 'Lịch sử Điểm số',
+                'verbose_name_plural': 'Lịch sử Điểm số',
+                'ordering': ['-changed_at'],
+                'indexes': [models.Index(fields=['score', 'changed_at'], name='scorehistory_score_time_idx')],
+            },
+        ),
+    ]
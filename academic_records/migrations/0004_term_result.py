@@ -0,0 +1,38 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:16
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic_records', '0003_score_history'),
+        ('accounts', '0006_user_department'),
+        ('school_data', '0003_academic_term'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TermResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_period', models.CharField(max_length=50, verbose_name='Kỳ học/Năm học')),
+                ('subject_averages', models.JSONField(default=dict, verbose_name='Điểm TB các môn')),
+                ('overall_average', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True, verbose_name='Điểm TB chung')),
+                ('class_rank', models.PositiveIntegerField(blank=True, null=True, verbose_name='Xếp hạng trong lớp')),
+                ('class_size', models.PositiveIntegerField(default=0, verbose_name='Sĩ số được xếp hạng')),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Thời điểm tính')),
+                ('school_class', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='term_results', to='school_data.class', verbose_name='Lớp')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='term_results', to='accounts.studentprofile', verbose_name='Học sinh')),
+            ],
+            options={
+                'verbose_name': 'Kết quả Học kỳ',
+                'verbose_name_plural': 'Kết quả Học kỳ',
+                'ordering': ['academic_period', 'class_rank'],
+                'indexes': [models.Index(fields=['school_class', 'academic_period', 'class_rank'], name='termresult_class_rank_idx')],
+                'unique_together': {('student', 'academic_period')},
+            },
+        ),
+    ]
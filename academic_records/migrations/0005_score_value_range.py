@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:19
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic_records', '0004_term_result'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='score',
+            name='score_value',
+            field=models.DecimalField(decimal_places=2, max_digits=4, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(10)], verbose_name='Điểm số'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-19 14:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic_records', '0005_score_value_range'),
+        ('school_data', '0003_academic_term'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='score',
+            name='term',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='scores', to='school_data.academicterm', verbose_name='Học kỳ'),
+        ),
+        migrations.AddField(
+            model_name='evaluation',
+            name='term',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='evaluations', to='school_data.academicterm', verbose_name='Học kỳ'),
+        ),
+        migrations.AddField(
+            model_name='rewardanddiscipline',
+            name='term',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reward_discipline_records', to='school_data.academicterm', verbose_name='Học kỳ'),
+        ),
+        migrations.AddField(
+            model_name='termresult',
+            name='term',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='term_results', to='school_data.academicterm', verbose_name='Học kỳ'),
+        ),
+    ]
@@ -0,0 +1,129 @@
+"""
+Chuyển chuỗi academic_period (VD: "HK1 2024-2025", "Học kỳ 2 - 2024/2025", "HK1")
+sang khóa ngoại tới AcademicTerm.
+
+- Chuỗi trùng tên một Học kỳ đã có thì dùng Học kỳ đó.
+- Chuỗi có số học kỳ thì tạo (nếu chưa có) Học kỳ "HK<n> <năm>-<năm+1>"; năm học lấy
+  từ chuỗi, nếu không có thì suy từ ngày thi (tháng 8 trở đi thuộc năm học mới).
+- Các dòng còn lại (chuỗi trống/không đọc được, đánh giá, khen thưởng/kỷ luật) được
+  gán theo khoảng ngày của Học kỳ.
+- Điểm trùng (học sinh, môn, loại điểm, ngày thi) chỉ khác kỳ học được gộp lại, giữ
+  dòng mới nhất; lịch sử thay đổi và đơn phúc khảo của các dòng bị gộp được chuyển sang
+  dòng giữ lại.
+- Kết quả học kỳ (dữ liệu tính sẵn) lấy Học kỳ của các điểm cùng chuỗi; dòng không
+  xác định được bị xóa và có thể tính lại bằng lệnh compute_term_results.
+"""
+import re
+from collections import Counter, defaultdict
+from datetime import date
+
+from django.db import migrations
+from django.db.models import Count, Max
+
+
+SEMESTER_RE = re.compile(r'(?:HK|H[ỌO]C\s*K[ỲY])\s*([12])', re.IGNORECASE)
+YEAR_RE = re.compile(r'(\d{4})\s*[-–/]\s*\d{4}')
+
+
+def semester_dates(semester, first_year):
+    if semester == 1:
+        return date(first_year, 9, 1), date(first_year + 1, 1, 15)
+    return date(first_year + 1, 1, 16), date(first_year + 1, 5, 31)
+
+
+def forwards(apps, schema_editor):
+    AcademicTerm = apps.get_model('school_data', 'AcademicTerm')
+    Score = apps.get_model('academic_records', 'Score')
+    ScoreHistory = apps.get_model('academic_records', 'ScoreHistory')
+    Evaluation = apps.get_model('academic_records', 'Evaluation')
+    RewardAndDiscipline = apps.get_model('academic_records', 'RewardAndDiscipline')
+    TermResult = apps.get_model('academic_records', 'TermResult')
+    RequestForm = apps.get_model('communications', 'RequestForm')
+
+    terms_by_name = {term.name.lower(): term for term in AcademicTerm.objects.all()}
+
+    def resolve(period, day):
+        text = (period or '').strip()
+        if not text:
+            return None
+        if text.lower() in terms_by_name:
+            return terms_by_name[text.lower()]
+        semester = SEMESTER_RE.search(text)
+        if not semester:
+            return None
+        year = YEAR_RE.search(text)
+        if year:
+            first_year = int(year.group(1))
+        elif day is not None:
+            first_year = day.year if day.month >= 8 else day.year - 1
+        else:
+            return None
+        name = f"HK{semester.group(1)} {first_year}-{first_year + 1}"
+        if name.lower() not in terms_by_name:
+            start_date, end_date = semester_dates(int(semester.group(1)), first_year)
+            terms_by_name[name.lower()] = AcademicTerm.objects.create(name=name, start_date=start_date, end_date=end_date)
+        return terms_by_name[name.lower()]
+
+    # 1. Điểm có chuỗi kỳ học: mỗi cặp (chuỗi, ngày thi) một lệnh UPDATE
+    terms_by_period = defaultdict(Counter)
+    pairs = (Score.objects.exclude(academic_period__isnull=True).exclude(academic_period='')
+             .values_list('academic_period', 'exam_date').distinct())
+    for period, exam_date in pairs:
+        term = resolve(period, exam_date)
+        if term is not None:
+            updated = Score.objects.filter(academic_period=period, exam_date=exam_date).update(term=term)
+            terms_by_period[period][term.pk] += updated
+
+    # 2. Các dòng còn lại: theo khoảng ngày của Học kỳ
+    for term in AcademicTerm.objects.order_by('start_date'):
+        span = (term.start_date, term.end_date)
+        Score.objects.filter(term__isnull=True, exam_date__range=span).update(term=term)
+        Evaluation.objects.filter(term__isnull=True, evaluation_date__range=span).update(term=term)
+        RewardAndDiscipline.objects.filter(term__isnull=True, date_issued__range=span).update(term=term)
+
+    # 3. Gộp điểm trùng trước khi unique_together bỏ academic_period
+    duplicates = (Score.objects.values('student_id', 'subject_id', 'exam_type', 'exam_date')
+                  .annotate(n=Count('pk'), keep=Max('pk')).filter(n__gt=1))
+    for group in duplicates:
+        extra = list(Score.objects.filter(student_id=group['student_id'], subject_id=group['subject_id'],
+                                          exam_type=group['exam_type'], exam_date=group['exam_date'])
+                     .exclude(pk=group['keep']).values_list('pk', flat=True))
+        ScoreHistory.objects.filter(score_id__in=extra).update(score_id=group['keep'])
+        # disputed_score là SET_NULL: không chuyển thì đơn phúc khảo bị mất liên kết khi xóa dòng trùng
+        RequestForm.objects.filter(disputed_score_id__in=extra).update(disputed_score_id=group['keep'])
+        Score.objects.filter(pk__in=extra).delete()
+
+    # 4. Kết quả học kỳ
+    for period in TermResult.objects.values_list('academic_period', flat=True).distinct():
+        counts = terms_by_period.get(period)
+        term_id = counts.most_common(1)[0][0] if counts else getattr(resolve(period, None), 'pk', None)
+        results = TermResult.objects.filter(academic_period=period)
+        if term_id is None:
+            results.delete()
+            continue
+        # Hai chuỗi khác nhau cùng trỏ tới một Học kỳ: giữ kết quả đã gán trước
+        taken = TermResult.objects.filter(term_id=term_id).values_list('student_id', flat=True)
+        results.filter(student_id__in=list(taken)).delete()
+        results.update(term_id=term_id)
+
+
+def backwards(apps, schema_editor):
+    Score = apps.get_model('academic_records', 'Score')
+    TermResult = apps.get_model('academic_records', 'TermResult')
+    AcademicTerm = apps.get_model('school_data', 'AcademicTerm')
+    for term in AcademicTerm.objects.all():
+        Score.objects.filter(term=term).update(academic_period=term.name)
+        TermResult.objects.filter(term=term).update(academic_period=term.name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic_records', '0006_term_fk'),
+        ('school_data', '0003_academic_term'),
+        ('communications', '0010_requestform_disputed_score'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
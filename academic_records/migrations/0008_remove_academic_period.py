@@ -0,0 +1,55 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic_records', '0007_academic_period_to_term'),
+        ('accounts', '0006_user_department'),
+        ('school_data', '0003_academic_term'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='termresult',
+            options={'ordering': ['-term__start_date', 'class_rank'], 'verbose_name': 'Kết quả Học kỳ', 'verbose_name_plural': 'Kết quả Học kỳ'},
+        ),
+        migrations.RemoveIndex(
+            model_name='termresult',
+            name='termresult_class_rank_idx',
+        ),
+        migrations.AlterUniqueTogether(
+            name='score',
+            unique_together={('student', 'subject', 'exam_type', 'exam_date')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='termresult',
+            unique_together={('student', 'term')},
+        ),
+        migrations.AlterField(
+            model_name='termresult',
+            name='term',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='term_results', to='school_data.academicterm', verbose_name='Học kỳ'),
+        ),
+        migrations.AddIndex(
+            model_name='termresult',
+            index=models.Index(fields=['school_class', 'term', 'class_rank'], name='termresult_class_rank_idx'),
+        ),
+        # Cho cột có giá trị mặc định để có thể đảo ngược migration (cột được tạo lại rồi điền từ Học kỳ)
+        migrations.AlterField(
+            model_name='termresult',
+            name='academic_period',
+            field=models.CharField(default='', max_length=50, verbose_name='Kỳ học/Năm học'),
+        ),
+        migrations.RemoveField(
+            model_name='score',
+            name='academic_period',
+        ),
+        migrations.RemoveField(
+            model_name='termresult',
+            name='academic_period',
+        ),
+    ]
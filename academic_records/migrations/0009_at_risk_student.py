@@ -0,0 +1,38 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:32
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic_records', '0008_remove_academic_period'),
+        ('accounts', '0006_user_department'),
+        ('school_data', '0003_academic_term'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AtRiskStudent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('overall_average', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True, verbose_name='Điểm TB chung')),
+                ('trend_slope', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True, verbose_name='Xu hướng điểm (điểm/30 ngày)')),
+                ('low_subjects', models.JSONField(default=list, verbose_name='Các môn dưới ngưỡng')),
+                ('reasons', models.JSONField(default=list, verbose_name='Lý do cảnh báo')),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Thời điểm tính')),
+                ('school_class', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='at_risk_students', to='school_data.class', verbose_name='Lớp')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='at_risk_flags', to='accounts.studentprofile', verbose_name='Học sinh')),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='at_risk_students', to='school_data.academicterm', verbose_name='Học kỳ')),
+            ],
+            options={
+                'verbose_name': 'Học sinh cần lưu ý',
+                'verbose_name_plural': 'Danh sách Học sinh cần lưu ý',
+                'ordering': ['overall_average'],
+                'indexes': [models.Index(fields=['school_class', 'term'], name='atrisk_class_term_idx')],
+                'unique_together': {('student', 'term')},
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic_records', '0009_at_risk_student'),
+        ('accounts', '0006_user_department'),
+        ('school_data', '0003_academic_term'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreRelease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('exam_type', models.CharField(choices=[('MID_TERM_1', 'Giữa Học kỳ 1'), ('END_TERM_1', 'Cuối Học kỳ 1'), ('MID_TERM_2', 'Giữa Học kỳ 2'), ('END_TERM_2', 'Cuối Học kỳ 2'), ('FINAL_EXAM', 'Thi Tốt nghiệp (Nếu có)'), ('ORAL_TEST', 'Kiểm tra miệng'), ('15_MIN_TEST', 'Kiểm tra 15 phút'), ('45_MIN_TEST', 'Kiểm tra 1 tiết (45 phút)')], max_length=20, verbose_name='Loại kỳ thi/kiểm tra')),
+                ('exam_date', models.DateField(verbose_name='Ngày thi/kiểm tra')),
+                ('release_at', models.DateTimeField(verbose_name='Thời điểm công bố')),
+                ('released_at', models.DateTimeField(blank=True, null=True, verbose_name='Đã công bố lúc')),
+                ('released_count', models.PositiveIntegerField(default=0, verbose_name='Số điểm đã công bố')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Thời gian tạo')),
+            ],
+            options={
+                'verbose_name': 'Đợt công bố điểm',
+                'verbose_name_plural': 'Các Đợt công bố điểm',
+                'ordering': ['-release_at'],
+            },
+        ),
+        # Điểm đã có trước khi có đợt công bố vẫn hiển thị như cũ; điểm nhập sau đó mặc định bị ẩn
+        migrations.AddField(
+            model_name='score',
+            name='is_published',
+            field=models.BooleanField(default=True, verbose_name='Đã công bố'),
+        ),
+        migrations.AlterField(
+            model_name='score',
+            name='is_published',
+            field=models.BooleanField(default=False, verbose_name='Đã công bố'),
+        ),
+        migrations.AddIndex(
+            model_name='score',
+            index=models.Index(fields=['student', 'is_published'], name='score_student_published_idx'),
+        ),
+        migrations.AddField(
+            model_name='scorerelease',
+            name='scheduled_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='scheduled_score_releases', to=settings.AUTH_USER_MODEL, verbose_name='Người hẹn công bố'),
+        ),
+        migrations.AddField(
+            model_name='scorerelease',
+            name='school_class',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_releases', to='school_data.class', verbose_name='Lớp'),
+        ),
+        migrations.AddField(
+            model_name='scorerelease',
+            name='subject',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_releases', to='school_data.subject', verbose_name='Môn học'),
+        ),
+        migrations.AddIndex(
+            model_name='scorerelease',
+            index=models.Index(fields=['released_at', 'release_at'], name='scorerelease_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scorerelease',
+            index=models.Index(fields=['school_class', 'subject', 'exam_type', 'exam_date'], name='scorerelease_exam_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic_records', '0010_score_release'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentPhrase',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.CharField(max_length=255, verbose_name='Câu nhận xét')),
+                ('normalized_text', models.CharField(max_length=255, verbose_name='Câu đã chuẩn hóa')),
+                ('use_count', models.PositiveIntegerField(default=1, verbose_name='Số lần dùng')),
+                ('last_used_at', models.DateTimeField(verbose_name='Dùng lần cuối')),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comment_phrases', to=settings.AUTH_USER_MODEL, verbose_name='Giáo viên')),
+            ],
+            options={
+                'verbose_name': 'Câu nhận xét mẫu',
+                'verbose_name_plural': 'Ngân hàng Nhận xét',
+                'ordering': ['-use_count'],
+                'indexes': [models.Index(fields=['normalized_text'], name='commentphrase_text_idx')],
+                'constraints': [models.UniqueConstraint(fields=('teacher', 'normalized_text'), name='commentphrase_unique_teacher_text')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic_records', '0011_comment_phrase'),
+        ('accounts', '0006_user_department'),
+        ('school_data', '0003_academic_term'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='evaluation',
+            index=models.Index(fields=['evaluation_date'], name='evaluation_date_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_score_fields(apps, schema_editor):
+    # Chép học sinh/môn/bài kiểm tra của điểm sang các dòng lịch sử đã có
+    Score = apps.get_model('academic_records', 'Score')
+    ScoreHistory = apps.get_model('academic_records', 'ScoreHistory')
+    score = Score.objects.filter(pk=OuterRef('score_id'))
+    ScoreHistory.objects.update(**{
+        field: Subquery(score.values(field)[:1])
+        for field in ('student_id', 'subject_id', 'exam_type', 'exam_date')
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic_records', '0012_evaluation_date_index'),
+        ('accounts', '0006_user_department'),
+        ('school_data', '0004_holiday_term_checks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scorehistory',
+            name='exam_date',
+            field=models.DateField(blank=True, null=True, verbose_name='Ngày thi/kiểm tra'),
+        ),
+        migrations.AddField(
+            model_name='scorehistory',
+            name='exam_type',
+            field=models.CharField(blank=True, choices=[('MID_TERM_1', 'Giữa Học kỳ 1'), ('END_TERM_1', 'Cuối Học kỳ 1'), ('MID_TERM_2', 'Giữa Học kỳ 2'), ('END_TERM_2', 'Cuối Học kỳ 2'), ('FINAL_EXAM', 'Thi Tốt nghiệp (Nếu có)'), ('ORAL_TEST', 'Kiểm tra miệng'), ('15_MIN_TEST', 'Kiểm tra 15 phút'), ('45_MIN_TEST', 'Kiểm tra 1 tiết (45 phút)')], max_length=20, verbose_name='Loại kỳ thi/kiểm tra'),
+        ),
+        migrations.AddField(
+            model_name='scorehistory',
+            name='student',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='score_history', to='accounts.studentprofile', verbose_name='Học sinh'),
+        ),
+        migrations.AddField(
+            model_name='scorehistory',
+            name='subject',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='score_history', to='school_data.subject', verbose_name='Môn học'),
+        ),
+        migrations.AlterField(
+            model_name='scorehistory',
+            name='new_value',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True, verbose_name='Điểm mới'),
+        ),
+        migrations.AlterField(
+            model_name='scorehistory',
+            name='score',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='history', to='academic_records.score', verbose_name='Điểm số'),
+        ),
+        migrations.RunPython(copy_score_fields, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,9 @@
 from django.db import models
 from django.conf import settings 
+from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+
+from school_data.models import AcademicTerm
 
 class Score(models.Model):
     # ERD: grade_id (PK), score, exam_type, exam_date
@@ -16,7 +20,11 @@ class Score(models.Model):
         related_name='scores',
         verbose_name="Môn học"
     )
-    score_value = models.DecimalField(max_digits=4, decimal_places=2, verbose_name="Điểm số") # Ví dụ: 9.75
+    score_value = models.DecimalField(
+        max_digits=4, decimal_places=2,
+        validators=[MinValueValidator(0), MaxValueValidator(10)], # Thang điểm 10
+        verbose_name="Điểm số"
+    ) # Ví dụ: 9.75
     EXAM_TYPE_CHOICES = [
         ('MID_TERM_1', 'Giữa Học kỳ 1'),
         ('END_TERM_1', 'Cuối Học kỳ 1'),
@@ -30,8 +38,34 @@ class Score(models.Model):
     ]
     exam_type = models.CharField(max_length=20, choices=EXAM_TYPE_CHOICES, verbose_name="Loại kỳ thi/kiểm tra")
     exam_date = models.DateField(verbose_name="Ngày thi/kiểm tra")
-    academic_period = models.CharField(max_length=50, blank=True, null=True, verbose_name="Kỳ học/Năm học (VD: HK1 2024-2025)")
+    term = models.ForeignKey(
+        'school_data.AcademicTerm',
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True, # Để trống thì tự xác định theo ngày thi
+        related_name='scores',
+        verbose_name="Học kỳ"
+    )
     notes = models.TextField(blank=True, null=True, verbose_name="Ghi chú (nếu có)")
+    # Điểm mới nhập bị ẩn với học sinh/phụ huynh cho tới đợt công bố của bài kiểm tra (xem ScoreRelease)
+    is_published = models.BooleanField(default=False, verbose_name="Đã công bố")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Ghi nhớ ngày thi/học kỳ đã lưu để biết khi nào phải xác định lại học kỳ
+        instance._loaded_exam_date = instance.__dict__.get('exam_date')
+        instance._loaded_term_id = instance.__dict__.get('term_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Học kỳ theo ngày thi: xác định khi để trống hoặc khi ngày thi bị sửa (có thể sang học kỳ khác);
+        # học kỳ chọn riêng (VD: khi nhập từ file) được giữ nếu ngày thi không đổi
+        exam_date_changed = getattr(self, '_loaded_exam_date', None) not in (None, self.exam_date)
+        if self.exam_date and (self.term_id is None or exam_date_changed):
+            self.term = AcademicTerm.for_date(self.exam_date)
+        super().save(*args, **kwargs)
+        self._loaded_exam_date, self._loaded_term_id = self.exam_date, self.term_id
 
     def __str__(self):
         return f"{self.student.user.username} - {self.subject.name}: {self.score_value} ({self.get_exam_type_display()})"
@@ -39,8 +73,108 @@ class Score(models.Model):
     class Meta:
         verbose_name = "Điểm số"
         verbose_name_plural = "Các Điểm số"
-        unique_together = ('student', 'subject', 'exam_type', 'exam_date', 'academic_period') # Đảm bảo không nhập trùng điểm
+        unique_together = ('student', 'subject', 'exam_type', 'exam_date') # Đảm bảo không nhập trùng điểm (ngày thi đã xác định học kỳ)
         ordering = ['-exam_date', 'subject']
+        indexes = [
+            models.Index(fields=['student', 'is_published'], name='score_student_published_idx'),
+        ]
+
+
+class ScoreRelease(models.Model):
+    # Đợt công bố điểm của một bài kiểm tra (lớp × môn × loại điểm × ngày thi).
+    # Lệnh release_scores công bố các đợt đến hạn: một lệnh UPDATE bật is_published và
+    # một thông báo gộp cho mỗi học sinh/phụ huynh có điểm được công bố (xem score_release.py).
+    school_class = models.ForeignKey(
+        'school_data.Class',
+        on_delete=models.CASCADE,
+        related_name='score_releases',
+        verbose_name="Lớp"
+    )
+    subject = models.ForeignKey(
+        'school_data.Subject',
+        on_delete=models.CASCADE,
+        related_name='score_releases',
+        verbose_name="Môn học"
+    )
+    exam_type = models.CharField(max_length=20, choices=Score.EXAM_TYPE_CHOICES, verbose_name="Loại kỳ thi/kiểm tra")
+    exam_date = models.DateField(verbose_name="Ngày thi/kiểm tra")
+    release_at = models.DateTimeField(verbose_name="Thời điểm công bố")
+    released_at = models.DateTimeField(null=True, blank=True, verbose_name="Đã công bố lúc")
+    released_count = models.PositiveIntegerField(default=0, verbose_name="Số điểm đã công bố")
+    scheduled_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='scheduled_score_releases',
+        verbose_name="Người hẹn công bố"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Thời gian tạo")
+
+    def __str__(self):
+        return f"{self.school_class.name} - {self.subject.name} ({self.get_exam_type_display()}, {self.exam_date:%d/%m/%Y})"
+
+    class Meta:
+        verbose_name = "Đợt công bố điểm"
+        verbose_name_plural = "Các Đợt công bố điểm"
+        ordering = ['-release_at']
+        indexes = [
+            # Lệnh release_scores tìm các đợt chưa công bố đã đến hạn
+            models.Index(fields=['released_at', 'release_at'], name='scorerelease_due_idx'),
+            models.Index(fields=['school_class', 'subject', 'exam_type', 'exam_date'], name='scorerelease_exam_idx'),
+        ]
+
+class ScoreHistory(models.Model):
+    # Lịch sử thay đổi điểm (chỉ ghi thêm), phục vụ phúc khảo; chỉ đọc khi cần qua index (score, changed_at)
+    # Xóa điểm không xóa lịch sử: score về NULL, học sinh/môn/bài kiểm tra được lưu lại trên từng dòng
+    score = models.ForeignKey(
+        Score,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='history',
+        verbose_name="Điểm số"
+    )
+    student = models.ForeignKey(
+        'accounts.StudentProfile',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='score_history',
+        verbose_name="Học sinh"
+    )
+    subject = models.ForeignKey(
+        'school_data.Subject',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='score_history',
+        verbose_name="Môn học"
+    )
+    exam_type = models.CharField(max_length=20, choices=Score.EXAM_TYPE_CHOICES, blank=True, verbose_name="Loại kỳ thi/kiểm tra")
+    exam_date = models.DateField(null=True, blank=True, verbose_name="Ngày thi/kiểm tra")
+    old_value = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True, verbose_name="Điểm cũ") # NULL khi điểm mới được tạo
+    new_value = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True, verbose_name="Điểm mới") # NULL khi điểm bị xóa
+    changed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='score_changes',
+        verbose_name="Người thay đổi"
+    )
+    changed_at = models.DateTimeField(default=timezone.now, verbose_name="Thời gian thay đổi")
+
+    def __str__(self):
+        return f"Điểm #{self.score_id or '(đã xóa)'}: {self.old_value} → {self.new_value if self.new_value is not None else '(xóa)'}"
+
+    class Meta:
+        verbose_name = "Lịch sử Điểm số"
+        verbose_name_plural = "Lịch sử Điểm số"
+        ordering = ['-changed_at']
+        indexes = [
+            models.Index(fields=['score', 'changed_at'], name='scorehistory_score_time_idx'),
+        ]
 
 class RewardAndDiscipline(models.Model):
     # ERD: reward_id (PK), type (khen thưởng/kỷ luật), date, content
@@ -58,6 +192,14 @@ class RewardAndDiscipline(models.Model):
     record_type = models.CharField(max_length=10, choices=RECORD_TYPE_CHOICES, verbose_name="Loại (Khen thưởng/Kỷ luật)")
     date_issued = models.DateField(verbose_name="Ngày quyết định")
     reason = models.TextField(verbose_name="Nội dung/Lý do")
+    term = models.ForeignKey(
+        'school_data.AcademicTerm',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reward_discipline_records',
+        verbose_name="Học kỳ"
+    )
     issued_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
@@ -68,6 +210,11 @@ class RewardAndDiscipline(models.Model):
         verbose_name="Người ra quyết định"
     )
 
+    def save(self, *args, **kwargs):
+        if self.date_issued:
+            self.term = AcademicTerm.for_date(self.date_issued) # Học kỳ luôn theo ngày quyết định
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.get_record_type_display()} cho {self.student.user.username} - {self.reason[:50]}..."
 
@@ -112,6 +259,19 @@ class Evaluation(models.Model):
     evaluation_type = models.CharField(max_length=30, choices=EVALUATION_TYPE_CHOICES, verbose_name="Loại đánh giá")
     evaluation_date = models.DateField(verbose_name="Ngày đánh giá")
     content = models.TextField(verbose_name="Nội dung đánh giá/nhận xét")
+    term = models.ForeignKey(
+        'school_data.AcademicTerm',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='evaluations',
+        verbose_name="Học kỳ"
+    )
+
+    def save(self, *args, **kwargs):
+        if self.evaluation_date:
+            self.term = AcademicTerm.for_date(self.evaluation_date) # Học kỳ luôn theo ngày đánh giá
+        super().save(*args, **kwargs)
 
     def __str__(self):
         evaluator_name = self.evaluator.username if self.evaluator else "Hệ thống"
@@ -120,4 +280,145 @@ class Evaluation(models.Model):
     class Meta:
         verbose_name = "Đánh giá/Nhận xét"
         verbose_name_plural = "Các Đánh giá/Nhận xét"
-        ordering = ['-evaluation_date']
\ No newline at end of file
+        ordering = ['-evaluation_date']
+        indexes = [
+            # Trang tổng hợp toàn trường lọc theo khoảng ngày và phân trang theo ngày
+            models.Index(fields=['evaluation_date'], name='evaluation_date_idx'),
+        ]
+
+class CommentPhrase(models.Model):
+    # Ngân hàng nhận xét: các câu giáo viên đã viết trong Evaluation.content, đếm số lần dùng.
+    # Được cập nhật khi lưu đánh giá; gợi ý khi gõ đọc chỉ mục tiền tố trong cache (xem comment_bank.py).
+    teacher = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='comment_phrases',
+        verbose_name="Giáo viên"
+    )
+    text = models.CharField(max_length=255, verbose_name="Câu nhận xét")
+    normalized_text = models.CharField(max_length=255, verbose_name="Câu đã chuẩn hóa")  # chữ thường, bỏ dấu
+    use_count = models.PositiveIntegerField(default=1, verbose_name="Số lần dùng")
+    last_used_at = models.DateTimeField(verbose_name="Dùng lần cuối")
+
+    def __str__(self):
+        return f"{self.text} ({self.teacher.username}, {self.use_count} lần)"
+
+    class Meta:
+        verbose_name = "Câu nhận xét mẫu"
+        verbose_name_plural = "Ngân hàng Nhận xét"
+        ordering = ['-use_count']
+        constraints = [
+            models.UniqueConstraint(fields=['teacher', 'normalized_text'], name='commentphrase_unique_teacher_text'),
+        ]
+        indexes = [
+            # Ngân hàng chung của trường gom theo câu đã chuẩn hóa
+            models.Index(fields=['normalized_text'], name='commentphrase_text_idx'),
+        ]
+
+class StudentAttendance(models.Model):
+    # Điểm danh được lưu gọn dạng bitmap: mỗi học sinh một dòng cho mỗi học kỳ,
+    # bit thứ i ứng với ngày (start_date + i) của học kỳ.
+    student = models.ForeignKey(
+        'accounts.StudentProfile',
+        on_delete=models.CASCADE,
+        related_name='attendance_records',
+        verbose_name="Học sinh"
+    )
+    term = models.ForeignKey(
+        'school_data.AcademicTerm',
+        on_delete=models.CASCADE,
+        related_name='attendance_records',
+        verbose_name="Học kỳ"
+    )
+    absent_bits = models.BinaryField(default=b'', verbose_name="Các ngày vắng mặt")
+    excused_bits = models.BinaryField(default=b'', verbose_name="Các ngày nghỉ có phép")
+
+    def __str__(self):
+        return f"Điểm danh {self.student.user.username} - {self.term.name}"
+
+    class Meta:
+        verbose_name = "Điểm danh"
+        verbose_name_plural = "Dữ liệu Điểm danh"
+        unique_together = ('student', 'term')
+
+class TermResult(models.Model):
+    # Kết quả học kỳ đã tính sẵn (điểm TB có trọng số từng môn, ĐTB chung, xếp hạng trong lớp).
+    # Được tính lại theo từng (lớp, học kỳ) mỗi khi điểm thay đổi, xem term_results.py
+    student = models.ForeignKey(
+        'accounts.StudentProfile',
+        on_delete=models.CASCADE,
+        related_name='term_results',
+        verbose_name="Học sinh"
+    )
+    school_class = models.ForeignKey(
+        'school_data.Class',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='term_results',
+        verbose_name="Lớp"
+    )
+    term = models.ForeignKey(
+        'school_data.AcademicTerm',
+        on_delete=models.CASCADE,
+        related_name='term_results',
+        verbose_name="Học kỳ"
+    )
+    subject_averages = models.JSONField(default=dict, verbose_name="Điểm TB các môn") # {subject_id: "8.25"}
+    overall_average = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True, verbose_name="Điểm TB chung")
+    class_rank = models.PositiveIntegerField(null=True, blank=True, verbose_name="Xếp hạng trong lớp")
+    class_size = models.PositiveIntegerField(default=0, verbose_name="Sĩ số được xếp hạng")
+    computed_at = models.DateTimeField(default=timezone.now, verbose_name="Thời điểm tính")
+
+    def __str__(self):
+        return f"{self.student.user.username} - {self.term.name}: {self.overall_average} (hạng {self.class_rank})"
+
+    class Meta:
+        verbose_name = "Kết quả Học kỳ"
+        verbose_name_plural = "Kết quả Học kỳ"
+        unique_together = ('student', 'term')
+        ordering = ['-term__start_date', 'class_rank']
+        indexes = [
+            models.Index(fields=['school_class', 'term', 'class_rank'], name='termresult_class_rank_idx'),
+        ]
+
+class AtRiskStudent(models.Model):
+    # Học sinh có nguy cơ học yếu trong một học kỳ (ĐTB/môn dưới ngưỡng hoặc điểm giảm dần).
+    # Danh sách được lệnh detect_at_risk_students tính lại hằng đêm (xem at_risk.py); các trang chỉ đọc.
+    student = models.ForeignKey(
+        'accounts.StudentProfile',
+        on_delete=models.CASCADE,
+        related_name='at_risk_flags',
+        verbose_name="Học sinh"
+    )
+    term = models.ForeignKey(
+        'school_data.AcademicTerm',
+        on_delete=models.CASCADE,
+        related_name='at_risk_students',
+        verbose_name="Học kỳ"
+    )
+    school_class = models.ForeignKey(
+        'school_data.Class',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='at_risk_students',
+        verbose_name="Lớp"
+    )
+    overall_average = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True, verbose_name="Điểm TB chung")
+    trend_slope = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True, verbose_name="Xu hướng điểm (điểm/30 ngày)")
+    low_subjects = models.JSONField(default=list, verbose_name="Các môn dưới ngưỡng") # [{"subject": "Toán", "average": "4.25"}]
+    reasons = models.JSONField(default=list, verbose_name="Lý do cảnh báo")
+    computed_at = models.DateTimeField(default=timezone.now, verbose_name="Thời điểm tính")
+
+    def __str__(self):
+        return f"{self.student.user.username} - {self.term.name}: {'; '.join(self.reasons)}"
+
+    class Meta:
+        verbose_name = "Học sinh cần lưu ý"
+        verbose_name_plural = "Danh sách Học sinh cần lưu ý"
+        unique_together = ('student', 'term')
+        ordering = ['overall_average']
+        indexes = [
+            models.Index(fields=['school_class', 'term'], name='atrisk_class_term_idx'),
+        ]
@@ -0,0 +1,135 @@
+"""
+Phiếu báo điểm cuối kỳ cho từng học sinh: điểm số, kết quả học kỳ, hạnh kiểm/
+đánh giá cuối kỳ và khen thưởng/kỷ luật.
+
+Dữ liệu được nạp theo lớp bằng một vài truy vấn gộp (collect_class_report_data)
+và chuyển thành dict thuần để có thể gửi sang các tiến trình con; việc render
+HTML/PDF (render_report_card) không truy cập CSDL.
+"""
+import os
+from collections import defaultdict
+
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from accounts.models import StudentProfile
+from .gradebook import EXAM_TYPE_ORDER
+from .models import Score, Evaluation, RewardAndDiscipline, TermResult
+
+
+def collect_class_report_data(school_class, term=None):
+    """
+    Dữ liệu phiếu báo điểm của mọi học sinh trong lớp (mỗi loại dữ liệu một truy vấn).
+    term (AcademicTerm) lọc điểm, kết quả học kỳ, đánh giá và khen thưởng/kỷ luật;
+    None là toàn bộ.
+    """
+    students = list(StudentProfile.objects.filter(current_class=school_class)
+                    .select_related('user').order_by('user__last_name', 'user__first_name'))
+    if not students:
+        return []
+    student_ids = [sp.pk for sp in students]
+    exam_labels = dict(Score.EXAM_TYPE_CHOICES)
+    evaluation_labels = dict(Evaluation.EVALUATION_TYPE_CHOICES)
+    record_labels = dict(RewardAndDiscipline.RECORD_TYPE_CHOICES)
+    exam_order = {key: i for i, key in enumerate(EXAM_TYPE_ORDER)}
+
+    scores = Score.objects.filter(student_id__in=student_ids, is_published=True)
+    results = TermResult.objects.filter(student_id__in=student_ids)
+    evaluations = Evaluation.objects.filter(student_id__in=student_ids,
+                                            evaluation_type__in=['CONDUCT', 'TERM_REVIEW'])
+    records = RewardAndDiscipline.objects.filter(student_id__in=student_ids)
+    if term is not None:
+        scores = scores.filter(term=term)
+        results = results.filter(term=term)
+        evaluations = evaluations.filter(term=term)
+        records = records.filter(term=term)
+
+    scores_by_student = defaultdict(lambda: defaultdict(list))
+    for student_id, subject_name, exam_type, exam_date, score_value in (
+            scores.order_by('subject__name', 'exam_date')
+            .values_list('student_id', 'subject__name', 'exam_type', 'exam_date', 'score_value')):
+        scores_by_student[student_id][subject_name].append((exam_order.get(exam_type, len(exam_order)), {
+            'exam_type': exam_labels.get(exam_type, exam_type),
+            'exam_date': exam_date,
+            'score_value': score_value,
+        }))
+
+    results_by_student = defaultdict(list)
+    for student_id, term_name, overall, rank, size in (
+            results.order_by('term__start_date')
+            .values_list('student_id', 'term__name', 'overall_average', 'class_rank', 'class_size')):
+        results_by_student[student_id].append({
+            'term_name': term_name, 'overall_average': overall, 'class_rank': rank, 'class_size': size,
+        })
+
+    evaluations_by_student = defaultdict(list)
+    for student_id, evaluation_type, evaluation_date, content in (
+            evaluations.order_by('evaluation_date')
+            .values_list('student_id', 'evaluation_type', 'evaluation_date', 'content')):
+        evaluations_by_student[student_id].append({
+            'type': evaluation_labels.get(evaluation_type, evaluation_type),
+            'date': evaluation_date,
+            'content': content,
+        })
+    records_by_student = defaultdict(list)
+    for student_id, record_type, date_issued, reason in (
+            records.order_by('date_issued')
+            .values_list('student_id', 'record_type', 'date_issued', 'reason')):
+        records_by_student[student_id].append({
+            'record_type': record_type,
+            'type': record_labels.get(record_type, record_type),
+            'date': date_issued,
+            'reason': reason,
+        })
+
+    generated_at = timezone.now()
+    data = []
+    for sp in students:
+        subjects = [
+            {'name': name, 'scores': [entry for _, entry in sorted(items, key=lambda item: item[0])]}
+            for name, items in scores_by_student[sp.pk].items()
+        ]
+        data.append({
+            'student': {
+                'username': sp.user.username,
+                'full_name': sp.user.get_full_name() or sp.user.username,
+                'date_of_birth': sp.date_of_birth,
+            },
+            'class_name': school_class.name,
+            'academic_year': school_class.academic_year,
+            'term_name': term.name if term is not None else None,
+            'subjects': subjects,
+            'term_results': results_by_student[sp.pk],
+            'evaluations': evaluations_by_student[sp.pk],
+            'records': records_by_student[sp.pk],
+            'generated_at': generated_at,
+        })
+    return data
+
+
+def init_worker():
+    """Khởi tạo Django trong tiến trình con (cần khi tiến trình được spawn thay vì fork)."""
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def render_report_card(context, output_dir, want_pdf=False):
+    """
+    Render phiếu báo điểm của một học sinh ra output_dir/<lớp>/<tên đăng nhập>.html
+    (và .pdf nếu want_pdf và có WeasyPrint). Trả về danh sách file đã ghi.
+    """
+    class_dir = os.path.join(output_dir, context['class_name'].replace(os.sep, '_'))
+    os.makedirs(class_dir, exist_ok=True)
+    base_path = os.path.join(class_dir, context['student']['username'])
+
+    html = render_to_string('academic_records/report_card.html', context)
+    written = [base_path + '.html']
+    with open(written[0], 'w', encoding='utf-8') as f:
+        f.write(html)
+    if want_pdf:
+        from weasyprint import HTML
+        HTML(string=html).write_pdf(base_path + '.pdf')
+        written.append(base_path + '.pdf')
+    return written
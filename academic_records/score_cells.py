@@ -0,0 +1,106 @@
+"""
+Kiểm tra các ô điểm gửi lên từ chế độ sửa trực tiếp trên bảng điểm (JSON).
+
+Mỗi ô: {"student": id học sinh, "subject": id môn, "exam_type": mã loại điểm,
+"exam_date": "YYYY-MM-DD", "value": điểm, "notes": ghi chú (tùy chọn)}. Không gửi
+notes thì ghi chú hiện có được giữ nguyên. Giá trị được kiểm tra bằng chính các
+field của ScoreEntryForm và validator của model (như khi nhập từ file).
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+
+from accounts.models import StudentProfile
+from .forms import ScoreEntryForm
+from .models import Score
+
+
+MAX_SCORE_CELLS = 2000  # Số ô tối đa trong một lần lưu
+TWO_PLACES = Decimal('0.01')
+
+
+def _cell_id(value):
+    """Mã (id) trong ô gửi lên: số nguyên hoặc chuỗi chữ số; giá trị khác (list, dict, bool...) là None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return None
+
+
+def clean_score_cells(cells, subject_ids):
+    """
+    Trả về (entries, errors, class_by_student): entries theo định dạng của upsert_scores
+    (kèm 'index' là vị trí ô trong danh sách gửi lên), errors là [{'index', 'error'}].
+    subject_ids giới hạn các môn được phép sửa. Học sinh được kiểm tra bằng một truy vấn.
+    """
+    score_field = ScoreEntryForm.base_fields['score_value']
+    notes_field = ScoreEntryForm.base_fields['notes']
+    score_model_field = Score._meta.get_field('score_value')
+    exam_types = dict(Score.EXAM_TYPE_CHOICES)
+
+    # Dữ liệu JSON từ trình duyệt: mã học sinh/môn được chuyển về số trước mọi phép tra set/dict
+    student_ids = {_cell_id(cell.get('student')) for cell in cells if isinstance(cell, dict)}
+    class_by_student = dict(StudentProfile.objects.filter(pk__in=[s for s in student_ids if s is not None])
+                            .values_list('pk', 'current_class_id'))
+
+    entries, errors = [], []
+    for index, cell in enumerate(cells):
+        if not isinstance(cell, dict):
+            errors.append({'index': index, 'error': "Ô điểm không hợp lệ."})
+            continue
+        problems = []
+        student_id, subject_id, exam_type = _cell_id(cell.get('student')), _cell_id(cell.get('subject')), cell.get('exam_type')
+        if student_id is None or student_id not in class_by_student:
+            problems.append("không tìm thấy học sinh")
+        if subject_id is None or subject_id not in subject_ids:
+            problems.append("bạn không được phép nhập điểm môn này")
+        if not isinstance(exam_type, str) or exam_type not in exam_types:
+            problems.append("loại điểm không hợp lệ")
+        exam_date = score_value = None
+        try:
+            exam_date = date.fromisoformat(str(cell.get('exam_date')))
+        except ValueError:
+            problems.append("ngày thi không hợp lệ")
+        try:
+            raw_value = cell.get('value')
+            score_value = score_field.clean('' if raw_value is None else str(raw_value))
+            if score_value is None:
+                raise ValidationError("Thiếu điểm.")
+            score_model_field.run_validators(score_value)
+        except ValidationError as exc:
+            problems.extend(f"điểm: {m}" for m in exc.messages)
+        entry = {}
+        if 'notes' in cell:
+            try:
+                entry['notes'] = notes_field.clean('' if cell['notes'] is None else str(cell['notes']))
+            except ValidationError as exc:
+                problems.extend(f"ghi chú: {m}" for m in exc.messages)
+
+        if problems:
+            errors.append({'index': index, 'error': "; ".join(problems)})
+            continue
+        entry.update({
+            'index': index,
+            'student_id': student_id, 'subject_id': subject_id,
+            'exam_type': exam_type, 'exam_date': exam_date,
+            'score_value': score_value.quantize(TWO_PLACES),
+        })
+        entries.append(entry)
+    return entries, errors, class_by_student
+
+
+def cell_payload(entry):
+    """Ô điểm đã lưu, trả lại cho trình duyệt."""
+    payload = {
+        'index': entry['index'],
+        'student': entry['student_id'], 'subject': entry['subject_id'],
+        'exam_type': entry['exam_type'], 'exam_date': entry['exam_date'],
+        'value': entry['score_value'],
+    }
+    if 'notes' in entry:
+        payload['notes'] = entry['notes']
+    return payload
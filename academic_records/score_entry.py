@@ -0,0 +1,174 @@
+from django.core.cache import cache
+from django.db import connections
+
+from accounts.models import StudentProfile
+from school_data.models import AcademicTerm
+from .models import Score
+from .score_history import record_score_changes
+from .term_results import schedule_recompute
+from .score_stats import bump_score_versions
+from .gradebook import invalidate_snapshots_for_students
+
+
+# Danh sách học sinh và điểm đã nhập của một bảng nhập điểm được cache ngắn hạn
+# để giáo viên chuyển qua lại giữa các ngày thi không phải chờ truy vấn lại.
+SHEET_CACHE_TIMEOUT = 60  # giây
+
+
+def score_key(student_id, subject_id, exam_type, exam_date):
+    return (student_id, subject_id, exam_type, exam_date)
+
+
+def upsert_scores(entries, changed_by=None, refresh_derived=True):
+    """
+    Ghi hàng loạt điểm và lịch sử thay đổi; phải được gọi trong transaction.atomic().
+
+    entries: danh sách dict gồm student_id, subject_id, exam_type, exam_date (date),
+    score_value, tùy chọn notes (không có thì giữ ghi chú hiện có) và term_id (không có
+    thì lấy Học kỳ chứa ngày thi). Một điểm được xác định bởi (học sinh, môn, loại điểm,
+    ngày thi) giống như update_or_create trước đây.
+    Đọc điểm hiện có bằng một truy vấn, ghi các điểm mới/thay đổi bằng một lệnh
+    bulk_create(update_conflicts=True). Trả về (saved_count, updated_count).
+    refresh_derived=False để người gọi tự gọi refresh_derived_data một lần (ví dụ khi nhập theo lô).
+    """
+    # Nếu một điểm xuất hiện nhiều lần thì lấy dòng cuối cùng
+    by_key = {}
+    for entry in entries:
+        by_key[score_key(entry['student_id'], entry['subject_id'], entry['exam_type'], entry['exam_date'])] = entry
+    if not by_key:
+        return 0, 0
+
+    existing = {}
+    existing_qs = Score.objects.filter(
+        student_id__in={k[0] for k in by_key},
+        subject_id__in={k[1] for k in by_key},
+        exam_type__in={k[2] for k in by_key},
+        exam_date__in={k[3] for k in by_key},
+    ).order_by('pk')
+    for score in existing_qs:
+        existing.setdefault(score_key(score.student_id, score.subject_id, score.exam_type, score.exam_date), score)
+
+    terms = None  # Nạp danh sách Học kỳ (một truy vấn) khi cần xác định học kỳ theo ngày thi
+    to_write = []
+    created = []
+    changes = []
+    for key, entry in by_key.items():
+        score = existing.get(key)
+        if 'notes' in entry or score is None:
+            notes = entry.get('notes') or ''
+        else:
+            notes = score.notes or ''
+        if score is None:
+            term_id = entry.get('term_id')
+            if term_id is None:
+                if terms is None:
+                    terms = list(AcademicTerm.objects.all())
+                term_id = getattr(AcademicTerm.pick(terms, entry['exam_date']), 'pk', None)
+            score = Score(
+                student_id=entry['student_id'], subject_id=entry['subject_id'],
+                exam_type=entry['exam_type'], exam_date=entry['exam_date'],
+                score_value=entry['score_value'], notes=notes,
+                term_id=term_id,
+            )
+            created.append(score)
+        else:
+            term_id = entry.get('term_id') or score.term_id
+            if (score.score_value == entry['score_value'] and (score.notes or '') == notes
+                    and score.term_id == term_id):
+                continue  # Không có gì thay đổi
+            changes.append((score, score.score_value))
+            score.score_value = entry['score_value']
+            score.notes = notes
+            score.term_id = term_id
+        to_write.append(score)
+
+    if not to_write:
+        return 0, 0
+
+    # Khóa xung đột là khóa chính của các điểm đã đọc ở trên. MySQL không nhận
+    # unique_fields và tự dùng mọi khóa unique (kể cả khóa chính).
+    features = connections[Score.objects.db].features
+    Score.objects.bulk_create(
+        to_write,
+        update_conflicts=True,
+        unique_fields=['pk'] if features.supports_update_conflicts_with_target else None,
+        update_fields=['score_value', 'notes', 'term'],
+    )
+
+    if any(score.pk is None for score in created):
+        # CSDL không trả về khóa chính sau bulk insert (MySQL): đọc lại bằng một truy vấn
+        created_keys = {score_key(s.student_id, s.subject_id, s.exam_type, s.exam_date): s for s in created}
+        refetch = Score.objects.filter(
+            student_id__in={k[0] for k in created_keys},
+            subject_id__in={k[1] for k in created_keys},
+            exam_type__in={k[2] for k in created_keys},
+            exam_date__in={k[3] for k in created_keys},
+        ).values_list('pk', 'student_id', 'subject_id', 'exam_type', 'exam_date')
+        for pk, *key in refetch:
+            score = created_keys.get(tuple(key))
+            if score is not None and score.pk is None:
+                score.pk = pk
+
+    record_score_changes(
+        [(score, None, score.score_value) for score in created]
+        + [(score, old_value, score.score_value) for score, old_value in changes],
+        changed_by=changed_by,
+    )
+    if refresh_derived:
+        refresh_derived_data({s.student_id for s in to_write}, {s.subject_id for s in to_write},
+                             {s.term_id for s in to_write})
+    return len(created), len(changes)
+
+
+def refresh_derived_data(student_ids, subject_ids, term_ids):
+    """
+    bulk_create không phát tín hiệu post_save nên các đường ghi hàng loạt phải tự
+    tính lại kết quả học kỳ, đổi phiên bản thống kê và xóa snapshot bảng điểm
+    sau khi commit.
+    """
+    schedule_recompute(student_ids, term_ids)
+    bump_score_versions(subject_ids)
+    invalidate_snapshots_for_students(student_ids)
+
+
+def _students_cache_key(class_id):
+    return f'enter_scores:students:{class_id}'
+
+
+def _sheet_cache_key(class_id, subject_id, exam_type, exam_date):
+    return f'enter_scores:sheet:{class_id}:{subject_id}:{exam_type}:{exam_date}'
+
+
+def sheet_students(class_id):
+    """Danh sách (student_id, tên hiển thị) của lớp theo thứ tự họ tên, có cache."""
+    key = _students_cache_key(class_id)
+    students = cache.get(key)
+    if students is None:
+        students = [
+            (sp.pk, sp.user.get_full_name() or sp.user.username)
+            for sp in StudentProfile.objects.filter(current_class_id=class_id)
+            .select_related('user').order_by('user__last_name', 'user__first_name')
+        ]
+        cache.set(key, students, SHEET_CACHE_TIMEOUT)
+    return students
+
+
+def sheet_scores(class_id, subject_id, exam_type, exam_date):
+    """Điểm đã nhập của cả lớp cho một bài kiểm tra: {student_id: (score_value, notes)}, có cache."""
+    key = _sheet_cache_key(class_id, subject_id, exam_type, exam_date)
+    scores = cache.get(key)
+    if scores is None:
+        scores = {}
+        rows = (Score.objects
+                .filter(student__current_class_id=class_id, subject_id=subject_id,
+                        exam_type=exam_type, exam_date=exam_date)
+                .order_by('pk')
+                .values_list('student_id', 'score_value', 'notes'))
+        for student_id, score_value, notes in rows:
+            scores.setdefault(student_id, (score_value, notes))
+        cache.set(key, scores, SHEET_CACHE_TIMEOUT)
+    return scores
+
+
+def invalidate_sheet(class_id, subject_id, exam_type, exam_date):
+    cache.delete(_sheet_cache_key(class_id, subject_id, exam_type, exam_date))
@@ -0,0 +1,84 @@
+"""
+Xuất bảng điểm (một lớp, một khối hoặc toàn trường) ra CSV/XLSX với bộ nhớ không đổi.
+
+Điểm được đọc bằng values_list(...) nên không tạo đối tượng Score, theo từng nhóm
+STUDENT_BATCH_SIZE học sinh (danh sách học sinh đã sắp xếp được đọc trước) nên không giữ toàn
+bộ kết quả trong bộ nhớ. Không dùng .iterator() cho việc này: mysqlclient tải toàn bộ kết quả
+về client trước khi trả dòng đầu tiên (không có con trỏ phía server), nên trên MySQL
+.iterator() không giữ bộ nhớ không đổi. CSV được gửi dần qua StreamingHttpResponse
+ngay khi có dòng đầu tiên; XLSX được ghi bằng openpyxl ở chế độ write_only vào
+file tạm (định dạng zip chỉ hoàn tất ở cuối file) rồi gửi theo từng khối.
+"""
+import csv
+import re
+import tempfile
+
+from accounts.models import StudentProfile
+from .models import Score
+
+
+EXPORT_HEADER = ['Lớp', 'Tên đăng nhập', 'Họ tên', 'Môn học', 'Loại điểm', 'Ngày thi', 'Điểm', 'Học kỳ', 'Ghi chú']
+STUDENT_BATCH_SIZE = 200  # ~200 học sinh x vài trăm điểm mỗi truy vấn
+
+
+def class_grade(class_name):
+    """Khối của lớp lấy từ phần số đầu tên lớp (VD: '10A1' → '10'); None nếu không có."""
+    match = re.match(r'\d+', class_name or '')
+    return match.group(0) if match else None
+
+
+def classes_in_grade(classes_qs, grade):
+    return classes_qs.filter(name__regex=r'^%s(\D|$)' % re.escape(grade))
+
+
+def export_rows(classes_qs=None):
+    """Sinh từng dòng dữ liệu (theo EXPORT_HEADER) cho các lớp đã chọn; None là toàn trường."""
+    students = StudentProfile.objects.all()
+    if classes_qs is not None:
+        students = students.filter(current_class__in=classes_qs)
+    student_ids = list(students.order_by('current_class__name', 'user__last_name', 'user__first_name', 'pk')
+                       .values_list('pk', flat=True))
+    exam_labels = dict(Score.EXAM_TYPE_CHOICES)
+    for start in range(0, len(student_ids), STUDENT_BATCH_SIZE):
+        rows = (Score.objects.filter(student_id__in=student_ids[start:start + STUDENT_BATCH_SIZE])
+                .order_by('student__current_class__name', 'student__user__last_name', 'student__user__first_name',
+                          'student_id', 'subject__name', 'exam_date', 'exam_type')
+                .values_list('student__current_class__name', 'student__user__username',
+                             'student__user__last_name', 'student__user__first_name',
+                             'subject__name', 'exam_type', 'exam_date', 'score_value',
+                             'term__name', 'notes'))
+        for (class_name, username, last_name, first_name, subject_name,
+             exam_type, exam_date, score_value, term_name, notes) in rows:
+            full_name = f"{first_name} {last_name}".strip() or username  # Như User.get_full_name()
+            yield [class_name or '', username, full_name, subject_name, exam_labels.get(exam_type, exam_type),
+                   exam_date, score_value, term_name or '', notes or '']
+
+
+class _Echo:
+    """Đối tượng giả file: csv.writer ghi vào đây và nhận lại chính dòng vừa ghi."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    """Sinh từng dòng CSV đã mã hóa UTF-8 (có BOM để Excel đọc đúng tiếng Việt)."""
+    writer = csv.writer(_Echo())
+    yield '\ufeff'.encode('utf-8') + writer.writerow(EXPORT_HEADER).encode('utf-8')
+    for row in rows:
+        yield writer.writerow(row).encode('utf-8')
+
+
+def write_xlsx(rows):
+    """Ghi các dòng vào file XLSX tạm (chế độ write_only) và trả về file đã tua về đầu."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Bảng điểm')
+    sheet.append(EXPORT_HEADER)
+    for row in rows:
+        sheet.append(row)
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
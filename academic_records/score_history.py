@@ -0,0 +1,29 @@
+from .models import ScoreHistory
+
+
+def _entry(score, old_value, new_value, changed_by):
+    # Học sinh/môn/bài kiểm tra được chép sang lịch sử để vẫn đọc được sau khi điểm bị xóa
+    return ScoreHistory(score_id=score.pk, student_id=score.student_id, subject_id=score.subject_id,
+                        exam_type=score.exam_type, exam_date=score.exam_date,
+                        old_value=old_value, new_value=new_value, changed_by=changed_by)
+
+
+def record_score_changes(changes, changed_by):
+    """
+    Ghi lịch sử cho các điểm vừa được tạo/cập nhật bằng một lệnh bulk_create.
+    changes: danh sách (score, old_value, new_value); old_value là None nếu điểm mới tạo.
+    Các dòng không đổi giá trị được bỏ qua.
+    """
+    entries = [
+        _entry(score, old_value, new_value, changed_by)
+        for score, old_value, new_value in changes
+        if old_value is None or old_value != new_value
+    ]
+    return ScoreHistory.objects.bulk_create(entries)
+
+
+def record_score_deletions(scores, changed_by):
+    """Ghi lịch sử (điểm mới = NULL) cho các điểm sắp bị xóa; gọi trước khi xóa."""
+    return ScoreHistory.objects.bulk_create(
+        [_entry(score, score.score_value, None, changed_by) for score in scores]
+    )
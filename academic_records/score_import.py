@@ -0,0 +1,237 @@
+"""
+Nhập điểm hàng loạt từ file CSV/XLSX.
+
+File được đọc tuần tự từng dòng (CSV qua module csv, XLSX qua openpyxl ở chế độ
+read_only) nên bộ nhớ không tăng theo kích thước file. Mã học sinh và môn học
+được tra qua các dict nạp sẵn, giá trị được kiểm tra bằng chính các field của
+ScoreEntryForm, và điểm được ghi theo lô bằng upsert_scores.
+
+Cột bắt buộc: student (tên đăng nhập học sinh), subject (tên hoặc id môn học),
+exam_type (mã hoặc tên loại điểm), exam_date (YYYY-MM-DD hoặc dd/mm/YYYY), score.
+Cột tùy chọn: notes, term (tên Học kỳ; cột academic_period cũ vẫn được nhận). Không có
+học kỳ thì lấy Học kỳ chứa ngày thi.
+"""
+import csv
+import io
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from accounts.models import StudentProfile
+from school_data.models import AcademicTerm, Subject as SchoolSubject
+from .forms import ScoreEntryForm
+from .models import Score
+from .score_entry import upsert_scores, refresh_derived_data, invalidate_sheet
+
+
+REQUIRED_COLUMNS = ('student', 'subject', 'exam_type', 'exam_date', 'score')
+OPTIONAL_COLUMNS = ('notes', 'term')
+COLUMN_ALIASES = {'academic_period': 'term'}
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000  # Chỉ giữ chi tiết của chừng này dòng lỗi; vẫn đếm đủ tổng số
+
+
+class ScoreImportError(Exception):
+    """Lỗi khiến không thể đọc được file (định dạng, thiếu cột...)."""
+
+
+def _cell_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def iter_rows(fileobj, filename):
+    """Sinh (số dòng, dict cột → giá trị) cho từng dòng dữ liệu của file CSV/XLSX."""
+    name = (filename or '').lower()
+    if name.endswith('.xlsx'):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ScoreImportError("Máy chủ chưa cài openpyxl nên không đọc được file XLSX; hãy dùng file CSV.")
+        try:
+            workbook = load_workbook(fileobj, read_only=True, data_only=True)
+        except Exception as exc:
+            raise ScoreImportError(f"Không đọc được file XLSX: {exc}")
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            yield from _iter_table(rows)
+        finally:
+            workbook.close()
+    elif name.endswith('.csv'):
+        text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+        try:
+            yield from _iter_table(csv.reader(text))
+        except UnicodeDecodeError:
+            raise ScoreImportError("File CSV phải được lưu với mã hóa UTF-8.")
+        finally:
+            text.detach()
+    else:
+        raise ScoreImportError("Chỉ hỗ trợ file .csv hoặc .xlsx.")
+
+
+def _iter_table(rows):
+    header = next(rows, None)
+    if header is None:
+        raise ScoreImportError("File không có dữ liệu.")
+    columns = [_cell_text(h).lower() for h in header]
+    columns = [COLUMN_ALIASES.get(c, c) for c in columns]
+    missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+    if missing:
+        raise ScoreImportError(f"Thiếu cột bắt buộc: {', '.join(missing)}.")
+    positions = {c: columns.index(c) for c in REQUIRED_COLUMNS + OPTIONAL_COLUMNS if c in columns}
+    for line_number, row in enumerate(rows, start=2):
+        if not row or all(cell in (None, '') for cell in row):
+            continue
+        yield line_number, {
+            column: (row[pos] if pos < len(row) else None)
+            for column, pos in positions.items()
+        }
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = _cell_text(value)
+    for fmt in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            pass
+    raise ValidationError(f"Ngày thi '{text}' không hợp lệ (dùng YYYY-MM-DD hoặc dd/mm/YYYY)")
+
+
+class ScoreImporter:
+    """
+    Nhập điểm theo lô. subjects giới hạn các môn được phép (ví dụ các môn giáo viên
+    dạy); None nghĩa là mọi môn.
+    """
+
+    def __init__(self, changed_by=None, subjects=None, chunk_size=CHUNK_SIZE):
+        self.changed_by = changed_by
+        self.chunk_size = chunk_size
+        self.saved_count = 0
+        self.updated_count = 0
+        self.row_count = 0
+        self.error_count = 0
+        self.errors = []  # [(số dòng, thông báo)], tối đa MAX_REPORTED_ERRORS
+
+        # Các bảng tra cứu nạp sẵn: mỗi bảng một truy vấn
+        self.students = {}
+        self.student_classes = {}  # Lớp hiện tại, để xóa cache bảng nhập điểm của lớp
+        for username, pk, class_id in StudentProfile.objects.values_list('user__username', 'pk', 'current_class_id'):
+            self.students[username] = pk
+            self.student_classes[pk] = class_id
+        subject_qs = SchoolSubject.objects.all() if subjects is None else subjects
+        self.subjects = {}
+        for pk, name in subject_qs.values_list('pk', 'name'):
+            self.subjects[str(pk)] = pk
+            self.subjects[name.strip().lower()] = pk
+        self.term_list = list(AcademicTerm.objects.all())
+        self.terms = {term.name.strip().lower(): term.pk for term in self.term_list}
+        self.exam_types = {}
+        for key, label in Score.EXAM_TYPE_CHOICES:
+            self.exam_types[key.lower()] = key
+            self.exam_types[label.lower()] = key
+
+        # Field của form kiểm tra định dạng; validator của model (thang điểm 0-10) được
+        # ScoreEntryForm chạy trong full_clean của instance nên ở đây gọi trực tiếp
+        form_fields = ScoreEntryForm.base_fields
+        self.score_field = form_fields['score_value']
+        self.notes_field = form_fields['notes']
+        self.score_model_field = Score._meta.get_field('score_value')
+
+        self._touched_students = set()
+        self._touched_subjects = set()
+        self._touched_terms = set()
+
+    def _add_error(self, line_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_number, message))
+
+    def _validate(self, line_number, row):
+        problems = []
+        student_id = self.students.get(_cell_text(row.get('student')))
+        if student_id is None:
+            problems.append(f"không tìm thấy học sinh '{_cell_text(row.get('student'))}'")
+        subject_id = self.subjects.get(_cell_text(row.get('subject')).lower())
+        if subject_id is None:
+            problems.append(f"môn học '{_cell_text(row.get('subject'))}' không tồn tại hoặc bạn không được phép nhập")
+        exam_type = self.exam_types.get(_cell_text(row.get('exam_type')).lower())
+        if exam_type is None:
+            problems.append(f"loại điểm '{_cell_text(row.get('exam_type'))}' không hợp lệ")
+        term_id = None
+        term_name = _cell_text(row.get('term'))
+        if term_name:
+            term_id = self.terms.get(term_name.lower())
+            if term_id is None:
+                problems.append(f"học kỳ '{term_name}' không tồn tại")
+        exam_date = score_value = notes = None
+        try:
+            exam_date = _parse_date(row.get('exam_date'))
+        except ValidationError as exc:
+            problems.extend(exc.messages)
+        if term_id is None and exam_date is not None:
+            term_id = getattr(AcademicTerm.pick(self.term_list, exam_date), 'pk', None)
+        try:
+            score_value = self.score_field.clean(_cell_text(row.get('score')))
+            self.score_model_field.run_validators(score_value)
+        except ValidationError as exc:
+            problems.extend(f"điểm: {m}" for m in exc.messages)
+        try:
+            notes = self.notes_field.clean(_cell_text(row.get('notes')))
+        except ValidationError as exc:
+            problems.extend(f"ghi chú: {m}" for m in exc.messages)
+
+        if problems:
+            self._add_error(line_number, "; ".join(problems))
+            return None
+        return {
+            'student_id': student_id, 'subject_id': subject_id,
+            'exam_type': exam_type, 'exam_date': exam_date,
+            'score_value': score_value, 'notes': notes,
+            'term_id': term_id,
+        }
+
+    def _flush(self, chunk):
+        if not chunk:
+            return
+        with transaction.atomic():
+            saved, updated = upsert_scores(chunk, changed_by=self.changed_by, refresh_derived=False)
+        # Bảng nhập điểm (đã cache theo lớp/bài kiểm tra) của các điểm vừa ghi phải đọc lại
+        sheets = {(self.student_classes.get(entry['student_id']), entry['subject_id'],
+                   entry['exam_type'], entry['exam_date']) for entry in chunk}
+        for class_id, subject_id, exam_type, exam_date in sheets:
+            if class_id:
+                invalidate_sheet(class_id, subject_id, exam_type, exam_date)
+        self.saved_count += saved
+        self.updated_count += updated
+        for entry in chunk:
+            self._touched_students.add(entry['student_id'])
+            self._touched_subjects.add(entry['subject_id'])
+            self._touched_terms.add(entry['term_id'])
+
+    def run(self, fileobj, filename, progress=None):
+        """Đọc và ghi toàn bộ file; progress(row_count) được gọi sau mỗi lô nếu có."""
+        chunk = []
+        for line_number, row in iter_rows(fileobj, filename):
+            self.row_count += 1
+            entry = self._validate(line_number, row)
+            if entry is not None:
+                chunk.append(entry)
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk)
+                chunk = []
+                if progress:
+                    progress(self.row_count)
+        self._flush(chunk)
+        # Tính lại kết quả học kỳ/thống kê một lần cho cả file thay vì sau mỗi lô
+        if self._touched_students:
+            refresh_derived_data(self._touched_students, self._touched_subjects, self._touched_terms)
+        return self
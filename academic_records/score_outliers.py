@@ -0,0 +1,77 @@
+"""
+Phát hiện điểm bất thường khi nhập một bảng điểm (gõ nhầm 1.5 thay vì 8.5, nhập 0
+thay vì để trống...).
+
+Mọi điểm của môn học của các học sinh trong bảng được nạp bằng MỘT truy vấn; từ đó
+có cả phân bố điểm của lớp, lịch sử điểm của từng học sinh và giá trị đã lưu của bài
+kiểm tra đang nhập. Điểm chỉ được cảnh báo khi khác giá trị đã lưu, để giáo viên
+không phải xác nhận lại những điểm đã xác nhận trước đó.
+
+Dùng trung vị và độ lệch tuyệt đối trung vị (MAD) thay cho trung bình/độ lệch chuẩn
+để chính các điểm nhập nhầm không kéo lệch ngưỡng so sánh.
+"""
+import statistics
+from collections import defaultdict
+
+from .models import Score
+
+
+MAD_SCALE = 1.4826  # MAD × hệ số này xấp xỉ độ lệch chuẩn với phân phối chuẩn
+CLASS_Z_THRESHOLD = 3.5  # Ngưỡng z hiệu chỉnh (Iglewicz-Hoaglin) so với phân bố của lớp
+CLASS_MIN_GAP = 2.0  # Chênh lệch tối thiểu (điểm) với trung vị của lớp
+CLASS_MIN_SAMPLE = 5
+HISTORY_MIN_GAP = 3.0  # Chênh lệch tối thiểu (điểm) với trung vị điểm của chính học sinh
+HISTORY_MIN_SAMPLE = 3
+
+
+def _median_and_spread(values):
+    median = statistics.median(values)
+    spread = MAD_SCALE * statistics.median(abs(v - median) for v in values)
+    return median, spread
+
+
+def find_outliers(entries, student_ids, subject_id, exam_type, exam_date):
+    """
+    Các điểm bất thường trong một bảng điểm (một lớp × môn × bài kiểm tra).
+
+    entries: các dict của upsert_scores (student_id, score_value, notes);
+    student_ids: học sinh của lớp. Trả về {student_id: [lý do, ...]}.
+    """
+    history = defaultdict(list)
+    stored = {}
+    rows = (Score.objects.filter(student_id__in=student_ids, subject_id=subject_id)
+            .values_list('student_id', 'exam_type', 'exam_date', 'score_value'))
+    for student_id, row_exam_type, row_exam_date, score_value in rows:
+        if row_exam_type == exam_type and row_exam_date == exam_date:
+            stored[student_id] = float(score_value)
+        else:
+            history[student_id].append(float(score_value))
+
+    pending = [entry for entry in entries if stored.get(entry['student_id']) != float(entry['score_value'])]
+    if not pending:
+        return {}
+
+    # Phân bố của lớp: điểm của bài đang nhập cùng các bài trước đó của môn
+    class_values = [float(entry['score_value']) for entry in entries]
+    class_values += [value for values in history.values() for value in values]
+    class_stats = _median_and_spread(class_values) if len(class_values) >= CLASS_MIN_SAMPLE else None
+
+    outliers = {}
+    for entry in pending:
+        value = float(entry['score_value'])
+        reasons = []
+        if value == 0 and not entry.get('notes'):
+            reasons.append("Điểm 0 không có ghi chú (có phải để trống?)")
+        if class_stats is not None:
+            median, spread = class_stats
+            gap = abs(value - median)
+            if gap >= CLASS_MIN_GAP and (spread == 0 or gap / spread > CLASS_Z_THRESHOLD):
+                reasons.append(f"Khác xa phân bố của lớp (trung vị {median:g})")
+        past = history.get(entry['student_id'], [])
+        if len(past) >= HISTORY_MIN_SAMPLE:
+            median, spread = _median_and_spread(past)
+            if abs(value - median) >= max(HISTORY_MIN_GAP, CLASS_Z_THRESHOLD * spread):
+                reasons.append(f"Khác xa các điểm trước của học sinh (trung vị {median:g})")
+        if reasons:
+            outliers[entry['student_id']] = reasons
+    return outliers
@@ -0,0 +1,136 @@
+"""
+Công bố điểm theo đợt (ScoreRelease) thay vì hiển thị ngay khi giáo viên lưu.
+
+Điểm mới nhập có is_published=False nên bị ẩn với học sinh/phụ huynh. Khi một đợt
+đến hạn (lệnh release_scores chạy định kỳ, hoặc giáo viên công bố ngay), mọi đợt
+đến hạn được xử lý cùng nhau: một truy vấn đọc các điểm chưa công bố, một lệnh
+UPDATE bật is_published, rồi mỗi học sinh/phụ huynh nhận đúng MỘT thông báo gộp
+các bài kiểm tra vừa có điểm. Người nhận có cùng danh sách bài kiểm tra dùng chung
+một Notification; liên kết người nhận được ghi bằng một lệnh bulk_create.
+"""
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from communications.models import Notification
+from school_data.models import Class as SchoolClass, Subject as SchoolSubject
+from .models import Score, ScoreRelease
+from .score_entry import refresh_derived_data
+
+
+def exam_key(class_id, subject_id, exam_type, exam_date):
+    return (class_id, subject_id, exam_type, exam_date)
+
+
+def pending_release(class_id, subject_id, exam_type, exam_date):
+    """Đợt công bố chưa thực hiện của một bài kiểm tra (nếu có)."""
+    return (ScoreRelease.objects
+            .filter(school_class_id=class_id, subject_id=subject_id, exam_type=exam_type,
+                    exam_date=exam_date, released_at__isnull=True)
+            .order_by('release_at').first())
+
+
+def schedule_release(class_id, subject_id, exam_type, exam_date, release_at, scheduled_by=None):
+    """Hẹn (hoặc đổi giờ) công bố điểm một bài kiểm tra; mỗi bài kiểm tra chỉ có một đợt đang chờ."""
+    release = pending_release(class_id, subject_id, exam_type, exam_date)
+    if release is None:
+        release = ScoreRelease(school_class_id=class_id, subject_id=subject_id,
+                               exam_type=exam_type, exam_date=exam_date)
+    release.release_at = release_at
+    release.scheduled_by = scheduled_by
+    release.save()
+    return release
+
+
+def _notification_text(releases, class_names, subject_names):
+    exam_labels = dict(Score.EXAM_TYPE_CHOICES)
+    lines = []
+    for release in sorted(releases, key=lambda r: (r.exam_date, subject_names.get(r.subject_id, ''))):
+        lines.append(f"- {subject_names.get(release.subject_id, '?')}: "
+                     f"{exam_labels.get(release.exam_type, release.exam_type)} ngày {release.exam_date:%d/%m/%Y} "
+                     f"(lớp {class_names.get(release.school_class_id, '?')})")
+    if len(releases) == 1:
+        release = releases[0]
+        title = (f"Đã có điểm {subject_names.get(release.subject_id, '?')} - "
+                 f"{exam_labels.get(release.exam_type, release.exam_type)} ngày {release.exam_date:%d/%m/%Y}")
+    else:
+        title = f"Đã có điểm {len(releases)} bài kiểm tra"
+    content = "Nhà trường đã công bố điểm các bài kiểm tra sau, xem chi tiết tại trang Bảng điểm:\n" + "\n".join(lines)
+    return title, content
+
+
+def release_due_scores(now=None, release_ids=None):
+    """
+    Công bố mọi đợt chưa thực hiện có release_at <= now (giới hạn trong release_ids nếu có).
+    Trả về (danh sách ScoreRelease đã công bố, số điểm được công bố, số người nhận thông báo).
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        # skip_locked: lệnh chạy định kỳ và thao tác "công bố ngay" không xử lý trùng một đợt
+        due = (ScoreRelease.objects.select_for_update(skip_locked=True)
+               .filter(released_at__isnull=True, release_at__lte=now))
+        if release_ids is not None:
+            due = due.filter(pk__in=release_ids)
+        due = list(due)
+        if not due:
+            return [], 0, 0
+
+        releases_by_exam = {exam_key(r.school_class_id, r.subject_id, r.exam_type, r.exam_date): r for r in due}
+        exam_filter = reduce(or_, (
+            Q(student__current_class_id=r.school_class_id, subject_id=r.subject_id,
+              exam_type=r.exam_type, exam_date=r.exam_date)
+            for r in due
+        ))
+        rows = list(Score.objects.filter(exam_filter, is_published=False)
+                    .values_list('pk', 'student_id', 'student__parent_id', 'student__current_class_id',
+                                 'subject_id', 'exam_type', 'exam_date', 'term_id'))
+
+        released_count = defaultdict(int)
+        releases_by_user = defaultdict(set)
+        for _, student_id, parent_id, class_id, subject_id, exam_type, exam_date, _ in rows:
+            release = releases_by_exam[exam_key(class_id, subject_id, exam_type, exam_date)]
+            released_count[release.pk] += 1
+            releases_by_user[student_id].add(release.pk)  # StudentProfile/ParentProfile dùng user làm khóa chính
+            if parent_id:
+                releases_by_user[parent_id].add(release.pk)
+
+        if rows:
+            Score.objects.filter(pk__in=[row[0] for row in rows]).update(is_published=True)
+        for release in due:
+            release.released_at = now
+            release.released_count = released_count[release.pk]
+        ScoreRelease.objects.bulk_update(due, ['released_at', 'released_count'])
+
+        # Người nhận có cùng tập bài kiểm tra dùng chung một thông báo
+        recipients_by_releases = defaultdict(list)
+        for user_id, release_pks in releases_by_user.items():
+            recipients_by_releases[frozenset(release_pks)].append(user_id)
+        if recipients_by_releases:
+            releases_by_pk = {r.pk: r for r in due}
+            class_names = dict(SchoolClass.objects.filter(pk__in={r.school_class_id for r in due})
+                               .values_list('pk', 'name'))
+            subject_names = dict(SchoolSubject.objects.filter(pk__in={r.subject_id for r in due})
+                                 .values_list('pk', 'name'))
+            through_model = Notification.target_users.through
+            links = []
+            for release_pks, user_ids in recipients_by_releases.items():
+                title, content = _notification_text([releases_by_pk[pk] for pk in release_pks],
+                                                    class_names, subject_names)
+                notification = Notification.objects.create(
+                    title=title,
+                    content=content,
+                    status='SENT',
+                    is_published=True,
+                    publish_time=now,
+                )
+                links.extend(through_model(notification_id=notification.pk, user_id=user_id) for user_id in user_ids)
+            through_model.objects.bulk_create(links, batch_size=1000)
+
+        if rows:
+            # update() không phát tín hiệu post_save: tự tính lại kết quả học kỳ và xóa snapshot bảng điểm
+            refresh_derived_data({row[1] for row in rows}, {row[4] for row in rows}, {row[7] for row in rows})
+    return due, len(rows), len(releases_by_user)
@@ -0,0 +1,114 @@
+"""
+Thống kê phân bố điểm từng bài kiểm tra (trung bình, trung vị, độ lệch chuẩn,
+phân vị, biểu đồ tần suất) theo lớp × môn.
+
+Kết quả được cache theo (lớp, môn, bài kiểm tra) kèm "phiên bản dữ liệu" của
+môn học. Phiên bản đổi mỗi khi có điểm của môn đó thay đổi, nên các lần xem
+lặp lại không phải tính lại cho đến khi điểm thay đổi.
+"""
+import statistics
+import time
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+STATS_CACHE_TIMEOUT = 60 * 60 * 24  # Đã có phiên bản dữ liệu trong khóa nên có thể giữ lâu
+HISTOGRAM_BINS = 10  # Các khoảng [0,1), [1,2), ..., [9,10]
+
+
+def _version_key(subject_id):
+    return f'scores:version:subject:{subject_id}'
+
+
+def score_data_versions(subject_ids):
+    """
+    {subject_id: phiên bản} đọc bằng một lần get_many. Môn chưa có phiên bản được
+    gán một giá trị theo thời gian để không trùng với các khóa cache đã bị xóa.
+    """
+    keys = {_version_key(subject_id): subject_id for subject_id in subject_ids}
+    found = cache.get_many(keys)
+    versions = {keys[key]: value for key, value in found.items()}
+    for key, subject_id in keys.items():
+        if subject_id not in versions:
+            stamp = time.time_ns()
+            cache.add(key, stamp, None)
+            versions[subject_id] = cache.get(key, stamp)
+    return versions
+
+
+def bump_score_versions(subject_ids):
+    """Đổi phiên bản dữ liệu của các môn sau khi transaction hiện tại commit."""
+    subject_ids = set(subject_ids)
+
+    def bump():
+        stamp = time.time_ns()
+        cache.set_many({_version_key(subject_id): stamp for subject_id in subject_ids}, None)
+
+    transaction.on_commit(bump)
+
+
+def exam_statistics(values):
+    """Thống kê một vector điểm (đã có ít nhất một phần tử)."""
+    vector = sorted(float(v) for v in values)
+    n = len(vector)
+    histogram = [0] * HISTOGRAM_BINS
+    for v in vector:
+        histogram[min(max(int(v), 0), HISTOGRAM_BINS - 1)] += 1
+    if n > 1:
+        percentiles = statistics.quantiles(vector, n=100, method='inclusive')
+        p25, p75, p90 = percentiles[24], percentiles[74], percentiles[89]
+    else:
+        p25 = p75 = p90 = vector[0]
+    peak = max(histogram)
+    return {
+        'count': n,
+        'mean': round(statistics.fmean(vector), 2),
+        'median': round(statistics.median(vector), 2),
+        'std': round(statistics.pstdev(vector), 2),
+        'min': vector[0],
+        'max': vector[-1],
+        'p25': round(p25, 2),
+        'p75': round(p75, 2),
+        'p90': round(p90, 2),
+        'histogram': [
+            {'label': f'{i}–{i + 1}', 'count': count, 'width': round(100 * count / peak) if peak else 0}
+            for i, count in enumerate(histogram)
+        ],
+    }
+
+
+def class_subject_exam_stats(class_id, subject_id, student_ids, grid, version):
+    """
+    Thống kê từng bài kiểm tra (loại điểm + ngày thi) của một lớp × môn, dùng lưới
+    điểm đã nạp (xem gradebook.fetch_score_grid). Trả về danh sách theo thứ tự bài kiểm tra.
+    """
+    vectors = defaultdict(list)
+    for student_id in student_ids:
+        for score in grid.get(student_id, {}).get(subject_id, []):
+            vectors[(score.exam_date, getattr(score, 'exam_type_order', 0), score.exam_type)].append(score)
+    if not vectors:
+        return []
+
+    exams = sorted(vectors)
+    keys = {
+        f'scores:stats:{class_id}:{subject_id}:{exam_type}:{exam_date.isoformat()}:{version}': (exam_date, order, exam_type)
+        for exam_date, order, exam_type in exams
+    }
+    cached = cache.get_many(keys)
+    missing = {}
+    for key, exam in keys.items():
+        if key not in cached:
+            missing[key] = exam_statistics(s.score_value for s in vectors[exam])
+    if missing:
+        cache.set_many(missing, STATS_CACHE_TIMEOUT)
+    cached.update(missing)
+
+    results = []
+    for key, (exam_date, order, exam_type) in keys.items():
+        stats = dict(cached[key])
+        stats['exam_date'] = exam_date
+        stats['exam_type_display'] = vectors[(exam_date, order, exam_type)][0].get_exam_type_display()
+        results.append(stats)
+    return results
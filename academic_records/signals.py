@@ -0,0 +1,62 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from accounts.models import StudentProfile
+from .models import Score, Evaluation, TermResult
+from .term_results import schedule_recompute
+from .score_stats import bump_score_versions
+from .gradebook import invalidate_class_snapshots, invalidate_snapshots_for_students
+from .comment_bank import record_phrases
+
+
+@receiver(post_save, sender=Score)
+@receiver(post_delete, sender=Score)
+def score_changed(sender, instance, **kwargs):
+    # Tính lại kết quả học kỳ của (lớp, học kỳ) chứa điểm này, và học kỳ cũ nếu điểm vừa đổi học kỳ
+    schedule_recompute([instance.student_id], [instance.term_id, getattr(instance, '_loaded_term_id', None)])
+    # Làm mất hiệu lực thống kê đã cache của môn học này
+    bump_score_versions([instance.subject_id])
+    # Xóa snapshot bảng điểm của lớp chứa học sinh
+    invalidate_snapshots_for_students([instance.student_id])
+
+
+@receiver(pre_save, sender=StudentProfile)
+def remember_previous_class(sender, instance, **kwargs):
+    # Ghi nhớ lớp cũ để biết học sinh có chuyển lớp hay không
+    instance._previous_class_id = None
+    if instance.pk:
+        instance._previous_class_id = (StudentProfile.objects.filter(pk=instance.pk)
+                                       .values_list('current_class_id', flat=True).first())
+
+
+@receiver(post_save, sender=StudentProfile)
+def student_class_changed(sender, instance, created, **kwargs):
+    previous_class_id = getattr(instance, '_previous_class_id', None)
+    if created or previous_class_id != instance.current_class_id:
+        # Điểm của học sinh rời lớp cũ và xuất hiện ở lớp mới
+        invalidate_class_snapshots([previous_class_id, instance.current_class_id])
+    if not created and previous_class_id != instance.current_class_id:
+        # Xếp hạng học kỳ của cả lớp cũ (qua TermResult đã lưu) và lớp mới phải tính lại
+        term_ids = set(TermResult.objects.filter(student=instance).values_list('term_id', flat=True))
+        term_ids.update(Score.objects.filter(student=instance, term__isnull=False)
+                        .values_list('term_id', flat=True).distinct())
+        schedule_recompute([instance.pk], term_ids)
+
+
+@receiver(post_delete, sender=StudentProfile)
+def student_removed(sender, instance, **kwargs):
+    invalidate_class_snapshots([instance.current_class_id])
+
+
+@receiver(pre_save, sender=Evaluation)
+def remember_previous_content(sender, instance, **kwargs):
+    # Khi sửa đánh giá, các câu đã có trong nội dung cũ không được đếm lại vào ngân hàng nhận xét
+    instance._previous_content = ''
+    if instance.pk:
+        instance._previous_content = (Evaluation.objects.filter(pk=instance.pk)
+                                      .values_list('content', flat=True).first()) or ''
+
+
+@receiver(post_save, sender=Evaluation)
+def evaluation_saved(sender, instance, **kwargs):
+    record_phrases(instance.evaluator_id, [instance.content], [getattr(instance, '_previous_content', '')])
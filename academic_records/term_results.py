@@ -0,0 +1,117 @@
+"""
+Tính điểm trung bình học kỳ có trọng số và xếp hạng trong lớp.
+
+Kết quả được lưu vào TermResult để các trang xem điểm không phải tính lại từ
+các dòng Score. Mỗi lần tính xử lý trọn một (lớp, học kỳ) vì xếp hạng phụ
+thuộc vào cả lớp; khi một điểm thay đổi chỉ (lớp, học kỳ) chứa điểm đó được
+tính lại. Chỉ điểm đã công bố được tính, để ĐTB không làm lộ điểm chưa công bố.
+"""
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import connections, transaction
+from django.utils import timezone
+
+from accounts.models import StudentProfile
+from .models import Score, TermResult
+
+
+# Hệ số: kiểm tra miệng/15 phút hệ số 1, 1 tiết hệ số 2, giữa kỳ/cuối kỳ hệ số 3.
+# Thi tốt nghiệp không tính vào điểm học kỳ.
+EXAM_TYPE_WEIGHTS = {
+    'ORAL_TEST': 1,
+    '15_MIN_TEST': 1,
+    '45_MIN_TEST': 2,
+    'MID_TERM_1': 3,
+    'END_TERM_1': 3,
+    'MID_TERM_2': 3,
+    'END_TERM_2': 3,
+}
+
+TWO_PLACES = Decimal('0.01')
+
+
+def _round(value):
+    return value.quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+
+
+def compute_term_results(school_class, term):
+    """
+    Tính lại và lưu TermResult của mọi học sinh trong lớp cho một học kỳ (AcademicTerm hoặc id).
+
+    Điểm được nạp bằng một truy vấn values_list; kết quả được ghi bằng một lệnh
+    bulk_create(update_conflicts=True). Học sinh không còn điểm nào trong kỳ sẽ bị
+    xóa kết quả cũ. Trả về danh sách TermResult theo thứ hạng.
+    """
+    class_id = getattr(school_class, 'pk', school_class)
+    term_id = getattr(term, 'pk', term)
+
+    # sums[student_id][subject_id] = [tổng điểm × hệ số, tổng hệ số]
+    sums = defaultdict(lambda: defaultdict(lambda: [Decimal(0), 0]))
+    rows = (Score.objects
+            .filter(student__current_class_id=class_id, term_id=term_id, is_published=True,
+                    exam_type__in=list(EXAM_TYPE_WEIGHTS))
+            .values_list('student_id', 'subject_id', 'exam_type', 'score_value'))
+    for student_id, subject_id, exam_type, score_value in rows:
+        weight = EXAM_TYPE_WEIGHTS[exam_type]
+        cell = sums[student_id][subject_id]
+        cell[0] += score_value * weight
+        cell[1] += weight
+
+    now = timezone.now()
+    results = []
+    for student_id, subjects in sums.items():
+        subject_averages = {subject_id: _round(total / weight) for subject_id, (total, weight) in subjects.items()}
+        overall = _round(sum(subject_averages.values()) / len(subject_averages))
+        results.append(TermResult(
+            student_id=student_id, school_class_id=class_id, term_id=term_id,
+            subject_averages={str(k): str(v) for k, v in subject_averages.items()},
+            overall_average=overall, class_size=len(sums), computed_at=now,
+        ))
+
+    # Xếp hạng kiểu thi đấu: bằng điểm thì cùng hạng, hạng kế tiếp bị bỏ qua (1, 2, 2, 4)
+    results.sort(key=lambda r: r.overall_average, reverse=True)
+    for position, result in enumerate(results, start=1):
+        previous = results[position - 2] if position > 1 else None
+        if previous is not None and previous.overall_average == result.overall_average:
+            result.class_rank = previous.class_rank
+        else:
+            result.class_rank = position
+
+    with transaction.atomic():
+        stale = TermResult.objects.filter(school_class_id=class_id, term_id=term_id)
+        stale.exclude(student_id__in=[r.student_id for r in results]).delete()
+        if results:
+            features = connections[TermResult.objects.db].features
+            TermResult.objects.bulk_create(
+                results,
+                update_conflicts=True,
+                unique_fields=['student', 'term'] if features.supports_update_conflicts_with_target else None,
+                update_fields=['school_class', 'subject_averages', 'overall_average',
+                               'class_rank', 'class_size', 'computed_at'],
+            )
+    return results
+
+
+def recompute_for_students(student_ids, term_ids):
+    """
+    Tính lại các (lớp, học kỳ) chứa các học sinh và học kỳ đã cho: lớp hiện tại, và cả lớp
+    trong TermResult đã lưu (học sinh vừa chuyển lớp phải được bỏ khỏi xếp hạng của lớp cũ).
+    """
+    student_ids = set(student_ids)
+    term_ids = {t for t in term_ids if t}
+    if not term_ids:
+        return
+    class_ids = set(StudentProfile.objects.filter(pk__in=student_ids, current_class__isnull=False)
+                    .values_list('current_class_id', flat=True))
+    targets = {(class_id, term_id) for class_id in class_ids for term_id in term_ids}
+    targets.update(TermResult.objects.filter(student_id__in=student_ids, term_id__in=term_ids)
+                   .values_list('school_class_id', 'term_id'))
+    for class_id, term_id in targets:
+        compute_term_results(class_id, term_id)
+
+
+def schedule_recompute(student_ids, term_ids):
+    """Tính lại kết quả sau khi transaction hiện tại commit thành công."""
+    student_ids, term_ids = set(student_ids), set(term_ids)
+    transaction.on_commit(lambda: recompute_for_students(student_ids, term_ids))
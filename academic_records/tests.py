@@ -1 +1,139 @@
-from django.test import TestCase
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+
+
+class AcademicPeriodToTermMigrationTests(TransactionTestCase):
+    """Migration 0007: chuỗi academic_period -> AcademicTerm, gộp điểm trùng."""
+
+    migrate_from = [
+        ('academic_records', '0006_term_fk'),
+        ('school_data', '0003_academic_term'),
+        ('communications', '0010_requestform_disputed_score'),
+    ]
+    migrate_to = [('academic_records', '0007_academic_period_to_term')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        apps = executor.loader.project_state(self.migrate_from).apps
+
+        User = apps.get_model('accounts', 'User')
+        StudentProfile = apps.get_model('accounts', 'StudentProfile')
+        Subject = apps.get_model('school_data', 'Subject')
+        Score = apps.get_model('academic_records', 'Score')
+        ScoreHistory = apps.get_model('academic_records', 'ScoreHistory')
+        RequestForm = apps.get_model('communications', 'RequestForm')
+
+        parent = User.objects.create(username='parent')
+        student = StudentProfile.objects.create(user=User.objects.create(username='student'))
+        subject = Subject.objects.create(name='Toán')
+
+        def score(period, exam_date, exam_type='45_MIN_TEST', value='7.00'):
+            return Score.objects.create(student=student, subject=subject, exam_type=exam_type, exam_date=exam_date,
+                                        score_value=Decimal(value), academic_period=period)
+
+        # Chuỗi đọc được (có năm học / suy năm học từ ngày thi) và chuỗi không đọc được
+        self.parsed_id = score('Học kỳ 2 - 2024/2025', date(2025, 3, 10)).pk
+        self.inferred_id = score('HK1', date(2024, 10, 5), exam_type='ORAL_TEST').pk
+        self.unparsed_id = score('không rõ', date(2025, 4, 1), exam_type='15_MIN_TEST').pk
+        # Hai dòng chỉ khác chuỗi kỳ học: gộp, giữ dòng mới nhất
+        old = score('HK1 2024-2025', date(2024, 11, 20), exam_type='MID_TERM_1', value='5.00')
+        new = score('HK1 2024/2025', date(2024, 11, 20), exam_type='MID_TERM_1', value='6.00')
+        self.old_id, self.new_id = old.pk, new.pk
+        self.history_id = ScoreHistory.objects.create(score=old, new_value=Decimal('5.00')).pk
+        self.appeal_id = RequestForm.objects.create(submitted_by=parent, related_student=student, form_type='GRADE_APPEAL',
+                                                    title='Phúc khảo', content='...', disputed_score=old).pk
+
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(self.migrate_to)
+        self.apps = executor.loader.project_state(self.migrate_to).apps
+
+    def tearDown(self):
+        MigrationExecutor(connection).migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_periods_resolve_to_terms(self):
+        Score = self.apps.get_model('academic_records', 'Score')
+        self.assertEqual(Score.objects.get(pk=self.parsed_id).term.name, 'HK2 2024-2025')
+        self.assertEqual(Score.objects.get(pk=self.inferred_id).term.name, 'HK1 2024-2025')
+        # Chuỗi không đọc được: gán theo khoảng ngày của Học kỳ đã tạo
+        self.assertEqual(Score.objects.get(pk=self.unparsed_id).term.name, 'HK2 2024-2025')
+
+    def test_duplicates_merged_with_history_and_appeals(self):
+        Score = self.apps.get_model('academic_records', 'Score')
+        ScoreHistory = self.apps.get_model('academic_records', 'ScoreHistory')
+        RequestForm = self.apps.get_model('communications', 'RequestForm')
+        self.assertFalse(Score.objects.filter(pk=self.old_id).exists())
+        self.assertEqual(Score.objects.get(pk=self.new_id).score_value, Decimal('6.00'))
+        self.assertEqual(ScoreHistory.objects.get(pk=self.history_id).score_id, self.new_id)
+        self.assertEqual(RequestForm.objects.get(pk=self.appeal_id).disputed_score_id, self.new_id)
+
+
+class ClassSnapshotUnknownExamTypeTests(TestCase):
+    """Mã loại điểm ngoài EXAM_TYPE_CHOICES (dữ liệu cũ/bulk_create) không được làm hỏng snapshot của lớp."""
+
+    def setUp(self):
+        from accounts.models import StudentProfile, User
+        from school_data.models import Class as SchoolClass, Subject
+        from .models import Score
+
+        self.school_class = SchoolClass.objects.create(name='10A1')
+        self.subject = Subject.objects.create(name='Toán')
+        self.student = StudentProfile.objects.create(user=User.objects.create(username='hs1'),
+                                                     current_class=self.school_class)
+        # bulk_create bỏ qua kiểm tra choices, như dữ liệu cũ
+        Score.objects.bulk_create([
+            Score(student=self.student, subject=self.subject, exam_type='LEGACY_TEST',
+                  exam_date=date(2024, 10, 1), score_value=Decimal('6.50')),
+            Score(student=self.student, subject=self.subject, exam_type='ORAL_TEST',
+                  exam_date=date(2024, 10, 1), score_value=Decimal('8.00')),
+        ])
+
+    def test_unknown_exam_type_kept_and_sorted_last(self):
+        from .gradebook import class_snapshots, class_scores, class_score_matrix, fetch_score_grid
+
+        snapshot = class_snapshots([self.school_class.pk])[self.school_class.pk]
+        self.assertEqual(len(snapshot), 2)
+        self.assertEqual(sorted(score.exam_type for score in class_scores([self.school_class.pk])),
+                         ['LEGACY_TEST', 'ORAL_TEST'])
+
+        cell = fetch_score_grid([self.school_class], [self.subject])[self.student.pk][self.subject.pk]
+        rows = list(cell)
+        self.assertEqual([row.exam_type for row in rows], ['ORAL_TEST', 'LEGACY_TEST'])
+        self.assertEqual(rows[1].get_exam_type_display(), 'LEGACY_TEST')
+        self.assertEqual(rows[1].score_value, Decimal('6.50'))
+
+        matrix = class_score_matrix(self.school_class, [self.student], [self.subject])[self.subject]
+        self.assertEqual(matrix['score_count'], 2)
+        self.assertEqual(matrix['average'], Decimal('7.25'))
+
+
+class CleanScoreCellsTests(TestCase):
+    """Ô điểm JSON có mã không phải số (list, dict...) phải thành lỗi của ô, không làm lỗi 500."""
+
+    def test_non_scalar_ids_are_cell_errors(self):
+        from accounts.models import StudentProfile, User
+        from school_data.models import Subject
+        from .score_cells import clean_score_cells
+
+        student = StudentProfile.objects.create(user=User.objects.create(username='hs1'))
+        subject = Subject.objects.create(name='Toán')
+        valid = {'student': student.pk, 'subject': str(subject.pk), 'exam_type': 'ORAL_TEST',
+                 'exam_date': '2024-10-01', 'value': '8'}
+        cells = [
+            {**valid, 'student': [student.pk], 'subject': {}},
+            {**valid, 'exam_type': ['ORAL_TEST']},
+            {**valid, 'student': True},
+            valid,
+        ]
+        entries, errors, _ = clean_score_cells(cells, {subject.pk})
+        self.assertEqual([error['index'] for error in errors], [0, 1, 2])
+        self.assertIn("không tìm thấy học sinh", errors[0]['error'])
+        self.assertIn("không được phép nhập điểm môn này", errors[0]['error'])
+        self.assertIn("loại điểm không hợp lệ", errors[1]['error'])
+        self.assertEqual(len(entries), 1)
+        self.assertEqual((entries[0]['student_id'], entries[0]['subject_id']), (student.pk, subject.pk))
@@ -7,16 +7,23 @@ urlpatterns = [
     # ... (các URL cho scores, rewards-discipline, add/edit evaluation, view_evaluations đã có) ...
     path('scores/', views.view_scores, name='view_scores'),
     path('enter-scores/', views.enter_scores, name='enter_scores'),
+    path('enter-scores/import/', views.import_scores, name='import_scores'),
+    path('enter-scores/cells/', views.save_score_cells, name='save_score_cells'),
+    path('enter-scores/release/', views.schedule_score_release, name='schedule_score_release'),
+    path('scores/<int:score_id>/history/', views.score_history, name='score_history'),
     path('teacher/class-scores/', views.manage_scores_dashboard, name='teacher_view_class_scores'),
     
     path('rewards-discipline/', views.view_reward_discipline, name='view_reward_discipline'),
     path('teacher/class-rewards-discipline/', views.teacher_view_class_rewards_discipline, name='teacher_view_class_rewards_discipline'),
+    path('teacher/class-attendance/', views.teacher_class_attendance, name='teacher_class_attendance'),
     path('rewards-discipline/add/', views.manage_reward_discipline_record, name='add_reward_discipline'),
     path('rewards-discipline/<int:pk>/edit/', views.manage_reward_discipline_record, name='edit_reward_discipline'),
     path('school-wide/rewards-discipline/', views.school_wide_reward_discipline_list, name='school_wide_reward_discipline_list'),
 
     path('evaluations/add/', views.create_edit_evaluation, name='add_evaluation'), 
     path('evaluations/<int:pk>/edit/', views.create_edit_evaluation, name='edit_evaluation'), 
+    path('evaluations/class-sheet/', views.class_evaluation_sheet, name='class_evaluation_sheet'),
+    path('evaluations/comment-suggestions/', views.comment_suggestions, name='comment_suggestions'),
     path('evaluations/view/', views.view_evaluations, name='view_evaluations'),
 
     # URL MỚI CHO GIÁO VIÊN XEM ĐÁNH GIÁ CỦA MÌNH
@@ -25,4 +32,5 @@ urlpatterns = [
     path('school-wide/evaluations/', views.school_wide_evaluations, name='school_wide_evaluations'),
 
     path('school-wide/scores/', views.school_wide_scores, name='school_wide_scores'),
+    path('school-wide/scores/export/', views.export_scores, name='export_scores'),
 ]
@@ -1,25 +1,69 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import Http404, StreamingHttpResponse, FileResponse, JsonResponse
+from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.exceptions import PermissionDenied
 from django.utils import timezone
-from django.db.models import Q, Max, Case, When, Value, IntegerField
-from django.forms import modelformset_factory 
+from django.utils.http import content_disposition_header
+from django.db.models import Q, Max
+from django.db import transaction
+from django.forms import modelformset_factory, formset_factory
 from django.urls import reverse
+from django.core.paginator import Paginator
 from collections import defaultdict
+from datetime import date
 import json 
 
-from .models import Score, RewardAndDiscipline, Evaluation # Đảm bảo Evaluation được import
+from .models import Score, RewardAndDiscipline, Evaluation, TermResult # Đảm bảo Evaluation được import
 from accounts.models import StudentProfile, ParentProfile, User, Role
 from school_data.models import Class as SchoolClass, Subject as SchoolSubject, Department
-from .forms import ScoreContextForm, ScoreEntryForm, RewardAndDisciplineForm, EvaluationForm, EvaluationSubjectReviewForm # Đảm bảo EvaluationForm được import
+from .forms import ScoreContextForm, ScoreEntryForm, ScoreImportForm, ScoreReleaseForm, RewardAndDisciplineForm, EvaluationForm, EvaluationSubjectReviewForm, ClassEvaluationRowForm, EvaluationFacetForm # Đảm bảo EvaluationForm được import
 from communications.models import Notification
+from school_data.models import AcademicTerm
+from .attendance import set_class_absences, class_attendance_summary
+from .score_entry import upsert_scores, sheet_students, sheet_scores, invalidate_sheet
+from .score_import import ScoreImporter, ScoreImportError
+from .score_export import export_rows, iter_csv, write_xlsx, class_grade, classes_in_grade
+from .gradebook import (fetch_score_grid, subject_tables, student_rows_by_class, class_score_matrix,
+                        class_scores, scores_for_students)
+from .score_stats import score_data_versions, class_subject_exam_stats
+from .at_risk import latest_at_risk
+from .score_outliers import find_outliers
+from .score_cells import clean_score_cells, cell_payload, MAX_SCORE_CELLS
+from .score_release import pending_release, schedule_release, release_due_scores
+from .evaluation_sheet import SHEET_EVALUATION_TYPES, sheet_evaluations, save_class_evaluations
+from .comment_bank import suggest as suggest_comments
+from .evaluation_facets import evaluation_facets, filter_by_facets, add_facet_links
+
+EVALUATIONS_PER_PAGE = 50
 
 def convert_defaultdict_to_dict(d):
     if isinstance(d, defaultdict):
         return {k: convert_defaultdict_to_dict(v) for k, v in d.items()}
     return d
 
+def term_results_for_display(students):
+    """[(học sinh, [TermResult kèm subject_rows]), ...] cho các học sinh, không đọc lại các dòng Score."""
+    if not students:
+        return []
+    results_by_student = defaultdict(list)
+    for result in TermResult.objects.filter(student__in=students).select_related('term').order_by('term__start_date'):
+        results_by_student[result.student_id].append(result)
+    if not results_by_student:
+        return []
+    subject_names = dict(SchoolSubject.objects.values_list('pk', 'name'))
+    display = []
+    for student in students:
+        for result in results_by_student.get(student.pk, []):
+            result.subject_rows = sorted(
+                (subject_names.get(int(subject_id), '?'), average)
+                for subject_id, average in result.subject_averages.items()
+            )
+        if results_by_student.get(student.pk):
+            display.append((student, results_by_student[student.pk]))
+    return display
+
 @login_required
 def view_scores(request):
     user = request.user
@@ -59,13 +103,17 @@ def view_scores(request):
     scores_data_restructured = defaultdict(lambda: defaultdict(lambda: {'subject_name': '', 'teacher_names': '', 'scores': []}))
 
     if context['students_to_view']:
-        student_profile_pks = [sp.pk for sp in context['students_to_view']]
-        scores_qs = Score.objects.filter(student_id__in=student_profile_pks)\
-            .select_related('subject', 'student__user')\
-            .prefetch_related('subject__teachers__user')\
-            .order_by('student__user__username', 'subject__name', 'exam_date', 'exam_type')
-
-        for score_item in scores_qs:
+        # Điểm đã công bố đọc trực tiếp từ CSDL (xem scores_for_students); môn học (kèm giáo viên) nạp bằng một truy vấn
+        students_by_pk = {sp.pk: sp for sp in context['students_to_view']}
+        scores_list = scores_for_students(context['students_to_view'], published_only=True)
+        subjects_by_pk = SchoolSubject.objects.prefetch_related('teachers__user')\
+            .in_bulk({score_item.subject_id for score_item in scores_list})
+        for score_item in scores_list:
+            score_item.student = students_by_pk[score_item.student_id]
+            score_item.subject = subjects_by_pk[score_item.subject_id]
+        scores_list.sort(key=lambda sc: (sc.student.user.username, sc.subject.name, sc.exam_date, sc.exam_type))
+
+        for score_item in scores_list:
             student_display_name = score_item.student.user.get_full_name() or score_item.student.user.username
             subject_obj = score_item.subject
             subject_pk = subject_obj.pk
@@ -92,6 +140,9 @@ def view_scores(request):
                 'scores': data['scores']
             }
     context['scores_by_student_subject'] = final_scores_data
+    context['term_results_by_student'] = term_results_for_display(context['students_to_view'])
+    if context['is_parent'] and context['students_to_view']:
+        context['at_risk_term'], context['at_risk_flags'] = latest_at_risk(students=context['students_to_view'])
     return render(request, 'academic_records/view_scores.html', context)
 
 @login_required
@@ -106,6 +157,10 @@ def enter_scores(request):
     score_formset = ScoreFormSet_default(queryset=Score.objects.none()) 
     
     students_for_scoring = []
+    has_outliers = False
+    release_form = None
+    unpublished_count = 0
+    scheduled_release = None
     selected_class_id = request.GET.get('school_class')
     selected_subject_id = request.GET.get('subject')
     selected_exam_type = request.GET.get('exam_type')
@@ -117,7 +172,10 @@ def enter_scores(request):
         post_selected_exam_type = request.POST.get('selected_exam_type_hidden')
         post_selected_exam_date = request.POST.get('selected_exam_date_hidden')
 
-        score_context_form = ScoreContextForm(initial={
+        # Các trường ẩn được kiểm tra lại như form chọn bài kiểm tra: loại điểm phải thuộc
+        # EXAM_TYPE_CHOICES và môn phải là môn giáo viên dạy (upsert_scores dùng bulk_create,
+        # không chạy validate của model)
+        score_context_form = ScoreContextForm({
             'school_class': post_selected_class_id, 'subject': post_selected_subject_id,
             'exam_type': post_selected_exam_type, 'exam_date': post_selected_exam_date,
         }, teacher=teacher)
@@ -130,35 +188,56 @@ def enter_scores(request):
         ScoreFormSet_post = modelformset_factory(Score, form=ScoreEntryForm, extra=num_forms_for_post, can_delete=False)
         score_formset = ScoreFormSet_post(request.POST, queryset=Score.objects.none())
 
-        if score_formset.is_valid():
-            saved_count = 0
-            updated_count = 0
-            subject_instance = get_object_or_404(SchoolSubject, pk=post_selected_subject_id)
+        if not score_context_form.is_valid():
+            messages.error(request, "Thông tin lớp, môn học, loại điểm hoặc ngày thi không hợp lệ. Không có điểm nào được lưu.")
+        elif score_formset.is_valid():
+            subject_instance = score_context_form.cleaned_data['subject']
+            post_selected_exam_type = score_context_form.cleaned_data['exam_type']
+            exam_date_value = score_context_form.cleaned_data['exam_date']
 
+            entries = []
             for form_in_formset in score_formset:
                 if form_in_formset.has_changed() and form_in_formset.cleaned_data.get('score_value') is not None:
                     student_id = form_in_formset.cleaned_data.get('student_id')
-                    score_value = form_in_formset.cleaned_data.get('score_value')
-                    notes = form_in_formset.cleaned_data.get('notes', '')
-
                     if student_id:
-                        student_profile = get_object_or_404(StudentProfile, pk=student_id)
-                        score_entry, created = Score.objects.update_or_create(
-                            student=student_profile, subject=subject_instance,
-                            exam_type=post_selected_exam_type, exam_date=post_selected_exam_date,
-                            defaults={'score_value': score_value, 'notes': notes}
-                        )
-                        if created: saved_count += 1
-                        else: updated_count += 1
-            
-            if saved_count > 0 or updated_count > 0:
-                messages.success(request, f"Đã lưu {saved_count} điểm mới và cập nhật {updated_count} điểm thành công!")
+                        entries.append({
+                            'student_id': student_id, 'subject_id': subject_instance.pk,
+                            'exam_type': post_selected_exam_type, 'exam_date': exam_date_value,
+                            'score_value': form_in_formset.cleaned_data.get('score_value'),
+                            'notes': form_in_formset.cleaned_data.get('notes', ''),
+                        })
+
+            # Kiểm tra toàn bộ mã học sinh bằng một truy vấn
+            submitted_ids = {entry['student_id'] for entry in entries}
+            if submitted_ids - set(StudentProfile.objects.filter(pk__in=submitted_ids).values_list('pk', flat=True)):
+                raise Http404("Không tìm thấy học sinh.")
+
+            # Điểm bất thường so với lớp/lịch sử của học sinh (một truy vấn cho cả bảng):
+            # hiển thị lại bảng để giáo viên sửa hoặc xác nhận trước khi lưu
+            outliers = {}
+            if entries and not request.POST.get('confirm_outliers'):
+                outliers = find_outliers(entries, [sp.pk for sp in students_for_scoring], subject_instance.pk,
+                                         post_selected_exam_type, exam_date_value)
+            if outliers:
+                has_outliers = True
+                for form_in_formset in score_formset:
+                    form_in_formset.outlier_reasons = outliers.get(form_in_formset.cleaned_data.get('student_id'), [])
+                messages.warning(request, f"Có {len(outliers)} điểm bất thường. Vui lòng kiểm tra lại, hoặc đánh dấu "
+                                          f"\"Xác nhận các điểm bất thường\" rồi lưu lại.")
             else:
-                messages.info(request, "Không có thay đổi nào được thực hiện hoặc không có điểm nào được nhập.")
-            
-            redirect_url_params = (f"?school_class={post_selected_class_id}&subject={post_selected_subject_id}"
-                                   f"&exam_type={post_selected_exam_type}&exam_date={post_selected_exam_date}")
-            return redirect(reverse('academic_records:enter_scores') + redirect_url_params)
+                # Ghi điểm và lịch sử (phục vụ phúc khảo) trong cùng một transaction
+                with transaction.atomic():
+                    saved_count, updated_count = upsert_scores(entries, changed_by=teacher)
+                invalidate_sheet(post_selected_class_id, subject_instance.pk, post_selected_exam_type, exam_date_value)
+
+                if saved_count > 0 or updated_count > 0:
+                    messages.success(request, f"Đã lưu {saved_count} điểm mới và cập nhật {updated_count} điểm thành công!")
+                else:
+                    messages.info(request, "Không có thay đổi nào được thực hiện hoặc không có điểm nào được nhập.")
+
+                redirect_url_params = (f"?school_class={post_selected_class_id}&subject={post_selected_subject_id}"
+                                       f"&exam_type={post_selected_exam_type}&exam_date={post_selected_exam_date}")
+                return redirect(reverse('academic_records:enter_scores') + redirect_url_params)
         else:
             messages.error(request, "Vui lòng kiểm tra lại các lỗi trong bảng điểm.")
 
@@ -166,30 +245,46 @@ def enter_scores(request):
         target_class = get_object_or_404(SchoolClass, pk=selected_class_id)
         target_subject = get_object_or_404(SchoolSubject, pk=selected_subject_id)
         
-        students_for_scoring = StudentProfile.objects.filter(current_class=target_class).select_related('user').order_by('user__last_name', 'user__first_name')
+        # Một truy vấn cho danh sách học sinh và một cho điểm đã nhập, ghép trong bộ nhớ (có cache ngắn hạn)
+        students_for_scoring = sheet_students(target_class.pk)
+        existing_scores = sheet_scores(target_class.pk, target_subject.pk, selected_exam_type, selected_exam_date)
 
         initial_data_for_formset = []
-        if students_for_scoring.exists():
-            for student_profile in students_for_scoring:
-                existing_score = Score.objects.filter(
-                    student=student_profile, subject=target_subject,
-                    exam_type=selected_exam_type, exam_date=selected_exam_date,
-                ).first()
+        if students_for_scoring:
+            for student_id, student_name in students_for_scoring:
+                score_value, notes = existing_scores.get(student_id, (None, ''))
                 initial_data_for_formset.append({
-                    'student_id': student_profile.pk,
-                    'student_name': student_profile.user.get_full_name() or student_profile.user.username,
-                    'score_value': existing_score.score_value if existing_score else None,
-                    'notes': existing_score.notes if existing_score else '',
+                    'student_id': student_id,
+                    'student_name': student_name,
+                    'score_value': score_value,
+                    'notes': notes or '',
                 })
-            
+
             num_forms_to_create = len(initial_data_for_formset)
             ScoreFormSet_get = modelformset_factory(Score, form=ScoreEntryForm, extra=num_forms_to_create, can_delete=False)
             score_formset = ScoreFormSet_get(queryset=Score.objects.none(), initial=initial_data_for_formset)
+
+            # Điểm của bài kiểm tra chỉ hiển thị với học sinh/phụ huynh sau đợt công bố
+            exam_date_value = score_context_form.cleaned_data['exam_date']
+            unpublished_count = Score.objects.filter(
+                student__current_class_id=target_class.pk, subject_id=target_subject.pk,
+                exam_type=selected_exam_type, exam_date=exam_date_value, is_published=False,
+            ).count()
+            scheduled_release = pending_release(target_class.pk, target_subject.pk, selected_exam_type, exam_date_value)
+            release_form = ScoreReleaseForm(initial={
+                'school_class': target_class.pk, 'subject': target_subject.pk,
+                'exam_type': selected_exam_type, 'exam_date': exam_date_value,
+                'release_at': timezone.localtime(scheduled_release.release_at) if scheduled_release else None,
+            }, teacher=teacher)
         
     context = {
         'score_context_form': score_context_form,
         'score_formset': score_formset,
         'students_for_scoring': students_for_scoring,
+        'has_outliers': has_outliers,
+        'release_form': release_form,
+        'unpublished_count': unpublished_count,
+        'scheduled_release': scheduled_release,
         'selected_class_id': selected_class_id,
         'selected_subject_id': selected_subject_id,
         'selected_exam_type': selected_exam_type,
@@ -198,6 +293,158 @@ def enter_scores(request):
     }
     return render(request, 'academic_records/enter_scores.html', context)
 
+@login_required
+@require_POST
+def schedule_score_release(request):
+    """Hẹn giờ (hoặc công bố ngay) điểm của một bài kiểm tra cho học sinh và phụ huynh."""
+    teacher = request.user
+    if not (hasattr(teacher, 'role') and teacher.role and teacher.role.name == 'TEACHER'):
+        raise PermissionDenied("Chức năng này chỉ dành cho Giáo Viên.")
+
+    form = ScoreReleaseForm(request.POST, teacher=teacher)  # Chỉ nhận các môn giáo viên dạy
+    if not form.is_valid():
+        messages.error(request, "Thông tin đợt công bố điểm không hợp lệ: "
+                                + "; ".join(m for errors in form.errors.values() for m in errors))
+        return redirect('academic_records:enter_scores')
+
+    data = form.cleaned_data
+    redirect_url = reverse('academic_records:enter_scores') + (
+        f"?school_class={data['school_class'].pk}&subject={data['subject'].pk}"
+        f"&exam_type={data['exam_type']}&exam_date={data['exam_date']:%Y-%m-%d}")
+    now = timezone.now()
+    release_at = data['release_at'] or now
+    with transaction.atomic():
+        release = schedule_release(data['school_class'].pk, data['subject'].pk, data['exam_type'], data['exam_date'],
+                                   release_at, scheduled_by=teacher)
+    if release_at <= now:
+        released, score_count, recipient_count = release_due_scores(now, release_ids=[release.pk])
+        if released:
+            messages.success(request, f"Đã công bố {score_count} điểm và gửi thông báo tới {recipient_count} học sinh/phụ huynh.")
+        else:
+            messages.info(request, "Đợt công bố này đang được xử lý.")
+    else:
+        messages.success(request, f"Điểm sẽ được công bố lúc {timezone.localtime(release_at):%H:%M %d/%m/%Y}.")
+    return redirect(redirect_url)
+
+@login_required
+@require_POST
+def save_score_cells(request):
+    """
+    Lưu các ô điểm đã sửa trên bảng điểm (chế độ sửa trực tiếp) bằng một lần upsert.
+    Body là danh sách JSON các ô (xem score_cells.py); phản hồi gồm giá trị mới của các
+    ô đã lưu, lỗi của từng ô không hợp lệ và cảnh báo điểm bất thường.
+    """
+    teacher = request.user
+    if not (hasattr(teacher, 'role') and teacher.role and teacher.role.name == 'TEACHER'):
+        raise PermissionDenied("Chức năng này chỉ dành cho Giáo Viên.")
+    try:
+        cells = json.loads(request.body)
+    except (ValueError, UnicodeDecodeError):
+        return JsonResponse({'error': "Dữ liệu gửi lên không phải JSON hợp lệ."}, status=400)
+    if not isinstance(cells, list) or not cells:
+        return JsonResponse({'error': "Cần gửi danh sách các ô điểm đã sửa."}, status=400)
+    if len(cells) > MAX_SCORE_CELLS:
+        return JsonResponse({'error': f"Mỗi lần lưu tối đa {MAX_SCORE_CELLS} ô điểm."}, status=400)
+
+    teacher_profile = getattr(teacher, 'teacher_profile', None)
+    subject_ids = set(teacher_profile.subjects_taught.values_list('pk', flat=True)) if teacher_profile else set()
+    entries, errors, class_by_student = clean_score_cells(cells, subject_ids)
+    if not entries:
+        return JsonResponse({'saved': 0, 'updated': 0, 'cells': [], 'errors': errors, 'warnings': []}, status=400)
+
+    # Nhóm theo bảng điểm (lớp × môn × bài kiểm tra) để kiểm tra điểm bất thường và xóa cache bảng nhập điểm
+    sheets = defaultdict(list)
+    for entry in entries:
+        sheets[(class_by_student[entry['student_id']], entry['subject_id'], entry['exam_type'], entry['exam_date'])].append(entry)
+    roster = defaultdict(list)
+    for student_id, class_id in StudentProfile.objects.filter(
+            current_class_id__in={key[0] for key in sheets if key[0]}).values_list('pk', 'current_class_id'):
+        roster[class_id].append(student_id)
+    warnings = []
+    for (class_id, subject_id, exam_type, exam_date), sheet_entries in sheets.items():
+        outliers = find_outliers(sheet_entries, roster[class_id] or [e['student_id'] for e in sheet_entries],
+                                 subject_id, exam_type, exam_date)
+        warnings.extend({'index': entry['index'], 'warning': "; ".join(outliers[entry['student_id']])}
+                        for entry in sheet_entries if entry['student_id'] in outliers)
+
+    with transaction.atomic():
+        saved_count, updated_count = upsert_scores(entries, changed_by=teacher)
+    for class_id, subject_id, exam_type, exam_date in sheets:
+        if class_id:
+            invalidate_sheet(class_id, subject_id, exam_type, exam_date)
+
+    return JsonResponse({
+        'saved': saved_count,
+        'updated': updated_count,
+        'cells': [cell_payload(entry) for entry in entries],
+        'errors': errors,
+        'warnings': warnings,
+    })
+
+@login_required
+def import_scores(request):
+    teacher = request.user
+    if not (hasattr(teacher, 'role') and teacher.role and teacher.role.name == 'TEACHER'):
+        raise PermissionDenied("Chức năng này chỉ dành cho Giáo Viên.")
+    teacher_profile = getattr(teacher, 'teacher_profile', None)
+    if not teacher_profile:
+        raise PermissionDenied("Không tìm thấy hồ sơ giáo viên của bạn.")
+
+    importer = None
+    if request.method == 'POST':
+        form = ScoreImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            uploaded = form.cleaned_data['file']
+            # Giáo viên chỉ được nhập điểm cho các môn mình dạy
+            importer = ScoreImporter(changed_by=teacher, subjects=teacher_profile.subjects_taught.all())
+            try:
+                importer.run(uploaded, uploaded.name)
+            except ScoreImportError as exc:
+                messages.error(request, str(exc))
+                importer = None
+            else:
+                messages.success(request, f"Đã đọc {importer.row_count} dòng: lưu {importer.saved_count} điểm mới, "
+                                          f"cập nhật {importer.updated_count} điểm, {importer.error_count} dòng lỗi.")
+    else:
+        form = ScoreImportForm()
+
+    context = {
+        'page_title': 'Nhập điểm từ file',
+        'form': form,
+        'importer': importer,
+    }
+    return render(request, 'academic_records/import_scores.html', context)
+
+def can_view_student_scores(user, student):
+    user_role_name = getattr(user.role, 'name', None) if hasattr(user, 'role') and user.role else None
+    if user.is_staff and (user.department_id or user_role_name in ['SCHOOL_ADMIN', 'ADMIN']):
+        return True
+    if user_role_name == 'TEACHER':
+        return True
+    if user_role_name == 'STUDENT':
+        return student.user_id == user.pk
+    if user_role_name == 'PARENT':
+        return student.parent_id == user.pk
+    return False
+
+@login_required
+def score_history(request, score_id):
+    score = get_object_or_404(Score.objects.select_related('student__user', 'subject', 'term'), pk=score_id)
+    if not can_view_student_scores(request.user, score.student):
+        raise PermissionDenied("Bạn không có quyền xem lịch sử điểm này.")
+    if not score.is_published and request.user.pk in (score.student.user_id, score.student.parent_id):
+        raise Http404("Điểm này chưa được công bố.")
+
+    # Lịch sử chỉ được đọc khi có yêu cầu, qua index (score, changed_at)
+    history = score.history.select_related('changed_by').order_by('-changed_at')
+    context = {
+        'page_title': f'Lịch sử điểm {score.subject.name} - {score.student.user.get_full_name() or score.student.user.username}',
+        'score': score,
+        'history': history,
+        'grade_appeals': score.grade_appeals.select_related('submitted_by').order_by('-submission_date'),
+    }
+    return render(request, 'academic_records/score_history.html', context)
+
 @login_required
 def teacher_view_class_scores(request):
     # ... (code teacher_view_class_scores không thay đổi) ...
@@ -221,13 +468,20 @@ def teacher_view_class_scores(request):
     if active_class:
         students_in_class = StudentProfile.objects.filter(current_class=active_class).select_related('user').order_by('user__last_name', 'user__first_name')
         if students_in_class.exists():
-            student_pks = [sp.pk for sp in students_in_class]
-            scores_qs = Score.objects.filter(student_id__in=student_pks).select_related('subject', 'student__user').order_by('student__user__last_name', 'student__user__first_name', 'academic_period', 'subject__name', 'exam_date')
-            
-            for score_item in scores_qs:
-                student_display_name = score_item.student.user.get_full_name() or score_item.student.user.username
-                period = score_item.academic_period or "Chưa xác định kỳ học"
-                subject_name = score_item.subject.name
+            students_by_pk = {sp.pk: sp for sp in students_in_class}
+            scores_list = [sc for sc in class_scores([active_class.pk]) if sc.student_id in students_by_pk]
+            subject_names = dict(SchoolSubject.objects.filter(pk__in={sc.subject_id for sc in scores_list}).values_list('pk', 'name'))
+            student_order = {pk: i for i, pk in enumerate(students_by_pk)}
+            terms_by_pk = AcademicTerm.objects.in_bulk({sc.term_id for sc in scores_list if sc.term_id})
+            scores_list.sort(key=lambda sc: (student_order[sc.student_id],
+                                             terms_by_pk[sc.term_id].start_date if sc.term_id else date.max,
+                                             subject_names[sc.subject_id], sc.exam_date))
+
+            for score_item in scores_list:
+                student = students_by_pk[score_item.student_id]
+                student_display_name = student.user.get_full_name() or student.user.username
+                period = terms_by_pk[score_item.term_id].name if score_item.term_id else "Chưa xác định học kỳ"
+                subject_name = subject_names[score_item.subject_id]
                 scores_data_defaultdict[student_display_name][period][subject_name].append(score_item)
     else:
         if homeroom_classes.exists():
@@ -430,6 +684,71 @@ def school_wide_reward_discipline_list(request):
     }
     return render(request, 'academic_records/school_wide_reward_discipline_list.html', context)
 
+@login_required
+def teacher_class_attendance(request):
+    teacher = request.user
+    if not (hasattr(teacher, 'role') and teacher.role and teacher.role.name == 'TEACHER'):
+        raise PermissionDenied("Chức năng này chỉ dành cho Giáo viên.")
+
+    homeroom_classes = SchoolClass.objects.filter(homeroom_teacher=teacher).order_by('name')
+    selected_class_pk = request.POST.get('class_to_view') or request.GET.get('class_to_view')
+    active_class = None
+    if selected_class_pk:
+        active_class = get_object_or_404(SchoolClass, pk=selected_class_pk, homeroom_teacher=teacher)
+    elif homeroom_classes.exists():
+        active_class = homeroom_classes.first()
+
+    selected_day = timezone.localdate()
+    selected_day_str = request.POST.get('day') or request.GET.get('day')
+    if selected_day_str:
+        try:
+            selected_day = date.fromisoformat(selected_day_str)
+        except ValueError:
+            messages.error(request, "Ngày không hợp lệ, hiển thị điểm danh hôm nay.")
+
+    term = AcademicTerm.for_date(selected_day)
+
+    if request.method == 'POST' and active_class:
+        if term is None:
+            messages.error(request, "Ngày đã chọn không thuộc học kỳ nào. Vui lòng liên hệ Phòng Giáo vụ để khai báo học kỳ.")
+        elif not term.is_school_day(selected_day):
+            messages.error(request, "Ngày đã chọn là ngày nghỉ (cuối tuần hoặc ngày nghỉ lễ), không cần điểm danh.")
+        else:
+            absent_pks = [int(pk) for pk in request.POST.getlist('absent_students') if pk.isdigit()]
+            set_class_absences(active_class, selected_day, absent_pks)
+            messages.success(request, f"Đã lưu điểm danh ngày {selected_day:%d/%m/%Y} cho lớp {active_class.name}.")
+            return redirect(reverse('academic_records:teacher_class_attendance') + f"?class_to_view={active_class.pk}&day={selected_day:%Y-%m-%d}")
+
+    rows = []
+    absent_today = []
+    if active_class:
+        students_in_class = StudentProfile.objects.filter(current_class=active_class).select_related('user').order_by('user__last_name', 'user__first_name')
+        summary = class_attendance_summary(active_class, term, selected_day) if term else {}
+        empty = {'absent': 0, 'excused': 0, 'unexcused': 0, 'absent_on_day': False}
+        for student in students_in_class:
+            stats = summary.get(student.pk, empty)
+            rows.append({'student': student, **stats})
+            if stats['absent_on_day']:
+                absent_today.append(student)
+    elif not homeroom_classes.exists():
+        messages.info(request, "Bạn hiện không chủ nhiệm lớp nào.")
+
+    context = {
+        'page_title': f'Điểm danh Lớp {active_class.name}' if active_class else 'Điểm danh Lớp Chủ Nhiệm',
+        'homeroom_classes': homeroom_classes,
+        'active_class': active_class,
+        'selected_day': selected_day,
+        'term': term,
+        'attendance_rows': rows,
+        'absent_today': absent_today,
+        'class_totals': {
+            'absent': sum(row['absent'] for row in rows),
+            'excused': sum(row['excused'] for row in rows),
+            'unexcused': sum(row['unexcused'] for row in rows),
+        },
+    }
+    return render(request, 'academic_records/teacher_class_attendance.html', context)
+
 # === VIEW MỚI CHO GIÁO VIÊN TẠO/SỬA ĐÁNH GIÁ ===
 @login_required
 def create_edit_evaluation(request, pk=None):
@@ -559,6 +878,86 @@ def create_edit_evaluation(request, pk=None):
         }
         return render(request, 'academic_records/create_edit_evaluation.html', context)
 
+@login_required
+def comment_suggestions(request):
+    """Gợi ý câu nhận xét (ngân hàng của giáo viên rồi của trường) cho đoạn đang gõ ?q=..."""
+    user = request.user
+    user_role_name = getattr(user.role, 'name', None) if hasattr(user, 'role') and user.role else None
+    if not (user_role_name == 'TEACHER' or (user.is_staff and user_role_name in ['SCHOOL_ADMIN', 'ADMIN'])):
+        raise PermissionDenied("Bạn không có quyền thực hiện hành động này.")
+    return JsonResponse({'suggestions': suggest_comments(user, request.GET.get('q', '')[:100])})
+
+@login_required
+def class_evaluation_sheet(request):
+    """Nhập đánh giá hạnh kiểm/cuối kỳ cho cả lớp chủ nhiệm trên một bảng."""
+    user = request.user
+    user_role_name = getattr(user.role, 'name', None) if hasattr(user, 'role') and user.role else None
+    is_admin = user.is_staff and user_role_name in ['SCHOOL_ADMIN', 'ADMIN']
+    if not (user_role_name == 'TEACHER' or is_admin):
+        raise PermissionDenied("Bạn không có quyền thực hiện hành động này.")
+
+    classes = SchoolClass.objects.all() if is_admin else SchoolClass.objects.filter(homeroom_teacher=user)
+    classes = classes.order_by('name')
+    selected_class_pk = request.POST.get('class_to_view') or request.GET.get('class_to_view')
+    active_class = get_object_or_404(classes, pk=selected_class_pk) if selected_class_pk else classes.first()
+    evaluation_type = request.POST.get('evaluation_type') or request.GET.get('evaluation_type') or 'CONDUCT'
+    if evaluation_type not in SHEET_EVALUATION_TYPES:
+        raise Http404("Loại đánh giá không hợp lệ.")
+
+    EvaluationSheetFormSet = formset_factory(ClassEvaluationRowForm, extra=0)
+    formset = None
+    students = []
+    # Đánh giá đã có được tìm theo học kỳ: không có học kỳ thì không lưu (tránh tạo trùng)
+    term = AcademicTerm.for_date(timezone.localdate())
+    if active_class:
+        students = list(StudentProfile.objects.filter(current_class=active_class)
+                        .select_related('user').order_by('user__last_name', 'user__first_name'))
+        if term is None:
+            messages.error(request, "Hôm nay không thuộc học kỳ nào nên chưa thể lưu bảng đánh giá. "
+                                    "Vui lòng liên hệ Phòng Giáo vụ để khai báo học kỳ.")
+        if request.method == 'POST':
+            formset = EvaluationSheetFormSet(request.POST)
+            if term is not None and formset.is_valid():
+                class_student_ids = {sp.pk for sp in students}
+                contents = {}
+                for form in formset:
+                    student_id = form.cleaned_data.get('student_id')
+                    if student_id not in class_student_ids:
+                        raise Http404("Không tìm thấy học sinh trong lớp.")
+                    contents[student_id] = form.cleaned_data.get('content', '')
+                created_count, updated_count = save_class_evaluations(active_class, evaluation_type, contents, user, term)
+                if created_count or updated_count:
+                    messages.success(request, f"Đã lưu {created_count} đánh giá mới và cập nhật {updated_count} đánh giá "
+                                              f"cho lớp {active_class.name}.")
+                else:
+                    messages.info(request, "Không có thay đổi nào được thực hiện.")
+                return redirect(reverse('academic_records:class_evaluation_sheet')
+                                + f"?class_to_view={active_class.pk}&evaluation_type={evaluation_type}")
+            elif term is not None:
+                messages.error(request, "Vui lòng kiểm tra lại các lỗi trong bảng đánh giá.")
+        else:
+            # Điền sẵn các đánh giá người nhập đã viết trong học kỳ hiện tại (một truy vấn)
+            existing = sheet_evaluations([sp.pk for sp in students], evaluation_type, user, term)
+            formset = EvaluationSheetFormSet(initial=[
+                {'student_id': sp.pk, 'content': existing[sp.pk].content if sp.pk in existing else ''}
+                for sp in students
+            ])
+    elif not is_admin:
+        messages.info(request, "Bạn hiện không chủ nhiệm lớp nào.")
+
+    context = {
+        'page_title': f'Đánh giá cả lớp {active_class.name}' if active_class else 'Đánh giá cả lớp',
+        'classes': classes,
+        'active_class': active_class,
+        'evaluation_type': evaluation_type,
+        'evaluation_type_choices': [(key, label) for key, label in Evaluation.EVALUATION_TYPE_CHOICES
+                                    if key in SHEET_EVALUATION_TYPES],
+        'term': term,
+        'sheet_rows': list(zip(students, formset.forms)) if formset is not None else [],
+        'formset': formset,
+    }
+    return render(request, 'academic_records/class_evaluation_sheet.html', context)
+
 @login_required
 def view_evaluations(request):
     user = request.user
@@ -650,129 +1049,86 @@ def manage_scores_dashboard(request):
     if not (hasattr(teacher, 'role') and teacher.role and teacher.role.name == 'TEACHER'):
         raise PermissionDenied("Chức năng này chỉ dành cho Giáo viên.")
 
-    # Define the desired order of exam types
-    exam_type_order_keys = [
-        'ORAL_TEST', '15_MIN_TEST', '45_MIN_TEST',
-        'MID_TERM_1', 'END_TERM_1',
-        'MID_TERM_2', 'END_TERM_2',
-        'FINAL_EXAM'
-    ]
-    exam_type_when_conditions = []
-    for i, exam_type_key in enumerate(exam_type_order_keys):
-        exam_type_when_conditions.append(When(exam_type=exam_type_key, then=Value(i)))
-
     context = {
         'page_title': 'Quản lý Điểm',
         'homeroom_classes_list': [],
         'active_homeroom_class': None,
-        'homeroom_data': defaultdict(lambda: {
-            'teacher_name_display': "N/A", # Default
-            'students_map': defaultdict(lambda: {'scores': [], 'student_info': None})
-        }),
-        'taught_classes_data': defaultdict(lambda: defaultdict(lambda: defaultdict(lambda: {'scores': [], 'student_info': None}))),
+        'homeroom_data': {},
+        'taught_classes_data': {},
         'all_score_types_choices': Score.EXAM_TYPE_CHOICES,
+        'at_risk_term': None,
+        'at_risk_students': [],
     }
 
     # 1. Homeroom Class Data
     homeroom_classes = SchoolClass.objects.filter(homeroom_teacher=teacher).order_by('name')
     context['homeroom_classes_list'] = homeroom_classes
-    
+
     selected_hr_class_pk = request.GET.get('homeroom_class_pk')
     active_homeroom_class = None
     if selected_hr_class_pk:
         active_homeroom_class = get_object_or_404(SchoolClass, pk=selected_hr_class_pk, homeroom_teacher=teacher)
-    elif homeroom_classes.exists():
+    else:
         active_homeroom_class = homeroom_classes.first()
     context['active_homeroom_class'] = active_homeroom_class
 
+    teacher_profile_obj = getattr(teacher, 'teacher_profile', None)
+    subjects_personally_taught = list(teacher_profile_obj.subjects_taught.all().order_by('name')) if teacher_profile_obj else []
+
+    # Lấy tất cả các lớp có học sinh học môn mà giáo viên này dạy, loại trừ lớp chủ nhiệm
+    taught_classes = list(SchoolClass.objects.filter(
+        students__enrolled_subjects__in=subjects_personally_taught
+    ).exclude(homeroom_teacher=teacher).distinct().order_by('name')) if subjects_personally_taught else []
+
+    # Học sinh của lớp chủ nhiệm và các lớp dạy: một truy vấn values_list, dùng làm bảng tra chung
+    class_ids = [c.pk for c in taught_classes]
     if active_homeroom_class:
-        students_in_hr = StudentProfile.objects.filter(current_class=active_homeroom_class).select_related('user').order_by('user__last_name', 'user__first_name')
-        all_subjects_for_hr_view = SchoolSubject.objects.all().order_by('name').prefetch_related('teachers__user') # User's preference
+        class_ids.append(active_homeroom_class.pk)
+    students_by_class = student_rows_by_class(class_ids)
+
+    if active_homeroom_class:
+        # Danh sách học sinh cần lưu ý do lệnh detect_at_risk_students tính hằng đêm
+        context['at_risk_term'], context['at_risk_students'] = latest_at_risk(school_class=active_homeroom_class)
+        students_in_hr = students_by_class[active_homeroom_class.pk]
+        all_subjects_for_hr_view = list(SchoolSubject.objects.all().order_by('name').prefetch_related('teachers__user'))
 
         homeroom_teacher_user = active_homeroom_class.homeroom_teacher
-        homeroom_teacher_profile = None
-        if homeroom_teacher_user:
-            homeroom_teacher_profile = getattr(homeroom_teacher_user, 'teacher_profile', None)
-
-        for subj in all_subjects_for_hr_view: # Iterate over all subjects
-            display_teacher_names = []
-            # Check if homeroom teacher teaches this subject
-            if homeroom_teacher_profile and subj in homeroom_teacher_profile.subjects_taught.all():
-                display_teacher_names.append(homeroom_teacher_user.get_full_name() or homeroom_teacher_user.username)
+        homeroom_teacher_profile = getattr(homeroom_teacher_user, 'teacher_profile', None) if homeroom_teacher_user else None
+        homeroom_subject_ids = set(homeroom_teacher_profile.subjects_taught.values_list('pk', flat=True)) if homeroom_teacher_profile else set()
+
+        grid = fetch_score_grid([active_homeroom_class], all_subjects_for_hr_view)
+        tables = subject_tables(students_in_hr, all_subjects_for_hr_view, grid)
+        versions = score_data_versions([subj.pk for subj in all_subjects_for_hr_view])
+        hr_student_ids = [sp.pk for sp in students_in_hr]
+        for subj in all_subjects_for_hr_view:
+            # Nếu GVCN dạy môn này thì hiển thị GVCN, ngược lại liệt kê các giáo viên của môn
+            if subj.pk in homeroom_subject_ids:
+                display_teacher_names = {homeroom_teacher_user.get_full_name() or homeroom_teacher_user.username}
             else:
-                # If not taught by homeroom teacher, list other general teachers of the subject
-                for teacher_profile_obj in subj.teachers.all(): # These are TeacherProfile instances
-                    teacher_user = teacher_profile_obj.user
-                    teacher_name = teacher_user.get_full_name() or teacher_user.username
-                    display_teacher_names.append(teacher_name)
-            
-            # Use set to ensure unique names if a teacher falls into multiple categories (unlikely here but good practice)
-            unique_display_teacher_names = sorted(list(set(display_teacher_names)))
-            teacher_name_str = ", ".join(unique_display_teacher_names) if unique_display_teacher_names else "N/A"
-            
-            context['homeroom_data'][subj]['teacher_name_display'] = teacher_name_str
-            
-            for stud_profile in students_in_hr:
-                if not context['homeroom_data'][subj]['students_map'][stud_profile.pk]['student_info']:
-                    context['homeroom_data'][subj]['students_map'][stud_profile.pk]['student_info'] = stud_profile
-                
-                scores = (Score.objects.filter(student=stud_profile, subject=subj)
-                    .annotate(
-                        custom_exam_type_order=Case(
-                            *exam_type_when_conditions,
-                            default=Value(len(exam_type_order_keys)),
-                            output_field=IntegerField()
-                        )
-                    )
-                    .order_by('exam_date', 'custom_exam_type_order', 'exam_type'))
-                context['homeroom_data'][subj]['students_map'][stud_profile.pk]['scores'] = list(scores)
+                display_teacher_names = {tp.user.get_full_name() or tp.user.username for tp in subj.teachers.all()}
+            context['homeroom_data'][subj] = {
+                'teacher_name_display': ", ".join(sorted(display_teacher_names)) or "N/A",
+                'rows': tables[subj],
+                'exam_stats': class_subject_exam_stats(active_homeroom_class.pk, subj.pk, hr_student_ids, grid, versions[subj.pk]),
+            }
 
     # 2. Taught Classes Data (không dùng teachers field)
-    teacher_profile_obj = getattr(teacher, 'teacher_profile', None)
-    subjects_personally_taught = teacher_profile_obj.subjects_taught.all().order_by('name') if teacher_profile_obj else SchoolSubject.objects.none()
-    # Lấy tất cả các lớp có học sinh học môn mà giáo viên này dạy, loại trừ lớp chủ nhiệm
-    taught_classes_qs = SchoolClass.objects.filter(
-        students__enrolled_subjects__in=subjects_personally_taught
-    ).exclude(homeroom_teacher=teacher).distinct().order_by('name')
-    for t_class in taught_classes_qs:
-        students_in_t_class = StudentProfile.objects.filter(current_class=t_class).select_related('user').order_by('user__last_name', 'user__first_name')
-        for subj_taught in subjects_personally_taught:
-            for stud_profile in students_in_t_class:
-                if not context['taught_classes_data'][t_class][subj_taught][stud_profile.pk]['student_info']:
-                    context['taught_classes_data'][t_class][subj_taught][stud_profile.pk]['student_info'] = stud_profile
-                scores = (Score.objects.filter(student=stud_profile, subject=subj_taught)
-                    .annotate(
-                        custom_exam_type_order=Case(
-                            *exam_type_when_conditions,
-                            default=Value(len(exam_type_order_keys)),
-                            output_field=IntegerField()
-                        )
-                    )
-                    .order_by('exam_date', 'custom_exam_type_order', 'exam_type'))
-                context['taught_classes_data'][t_class][subj_taught][stud_profile.pk]['scores'] = list(scores)
-
-    # Chuyển defaultdict thành dict thường để template dễ xử lý hơn
-    final_homeroom_data = {}
-    for subj_obj, data_dict in context['homeroom_data'].items():
-       final_homeroom_data[subj_obj] = {
-           'teacher_name_display': data_dict['teacher_name_display'],
-           'students_map': dict(data_dict['students_map']) # Convert inner defaultdict
-       }
-       # Ensure students_map's inner dicts are also plain dicts if necessary (they are already {'scores': [], 'student_info': None})
-       for student_pk, student_data in final_homeroom_data[subj_obj]['students_map'].items():
-           final_homeroom_data[subj_obj]['students_map'][student_pk] = dict(student_data)
-
-    context['homeroom_data'] = final_homeroom_data
-
-    final_taught_classes_data = {}
-    for class_obj, subject_map in context['taught_classes_data'].items():
-        final_taught_classes_data[class_obj] = {}
-        for subj, student_map_val in subject_map.items():
-            if any(s_data['scores'] or s_data['student_info'] for s_data in student_map_val.values()):
-                final_taught_classes_data[class_obj][subj] = dict(student_map_val)
-        if not final_taught_classes_data[class_obj]:
-            del final_taught_classes_data[class_obj]
-    context['taught_classes_data'] = final_taught_classes_data
+    if taught_classes:
+        grid = fetch_score_grid(taught_classes, subjects_personally_taught)
+        versions = score_data_versions([subj.pk for subj in subjects_personally_taught])
+        for t_class in taught_classes:
+            students_in_t_class = students_by_class[t_class.pk]
+            if students_in_t_class:
+                student_ids = [sp.pk for sp in students_in_t_class]
+                tables = subject_tables(students_in_t_class, subjects_personally_taught, grid)
+                context['taught_classes_data'][t_class] = {
+                    subj: {
+                        'rows': tables[subj],
+                        'exam_stats': class_subject_exam_stats(t_class.pk, subj.pk, student_ids, grid, versions[subj.pk]),
+                    }
+                    for subj in subjects_personally_taught
+                }
+
     return render(request, 'academic_records/teacher_view_class_scores.html', context)
 
 @login_required
@@ -780,15 +1136,20 @@ def school_wide_evaluations(request):
     user = request.user
     if not (user.is_staff and hasattr(user, 'department') and user.department):
         raise PermissionDenied("Bạn không có quyền truy cập trang này.")
-    evaluations_conduct = Evaluation.objects.filter(
-        evaluation_type__in=['CONDUCT', 'TERM_REVIEW']
-    ).select_related('student__user', 'student__current_class', 'evaluator').order_by('-evaluation_date')
-    evaluations_subject_review = Evaluation.objects.filter(
-        evaluation_type='SUBJECT_REVIEW'
-    ).select_related('student__user', 'student__current_class', 'subject', 'evaluator').order_by('-evaluation_date')
+    filter_form = EvaluationFacetForm(request.GET or None)
+    selected = filter_form.selected_facets()
+    in_range = filter_form.filter_dates(Evaluation.objects.all())
+    facets, total = evaluation_facets(in_range, selected)
+    evaluations = filter_by_facets(in_range, selected).select_related(
+        'student__user', 'student__current_class', 'subject', 'evaluator'
+    ).order_by('-evaluation_date', '-pk')
+    page_obj = Paginator(evaluations, EVALUATIONS_PER_PAGE).get_page(request.GET.get('page'))
     context = {
-        'evaluations_conduct': evaluations_conduct,
-        'evaluations_subject_review': evaluations_subject_review,
+        'evaluations': page_obj,
+        'page_obj': page_obj,
+        'filter_form': filter_form,
+        'facets': add_facet_links(facets, request.GET),
+        'total': total,
         'page_title': 'Tổng hợp Đánh giá & Nhận xét Toàn trường',
     }
     return render(request, 'academic_records/school_wide_evaluations.html', context)
@@ -803,34 +1164,74 @@ def school_wide_scores(request):
     selected_class = None
     students_in_class = []
     scores_by_subject = {}
+    available_terms = []
+    selected_term = None
+    term_ranking = []
     if selected_class_id:
         try:
             selected_class = SchoolClass.objects.get(pk=selected_class_id)
             students_in_class = StudentProfile.objects.filter(current_class=selected_class).select_related('user').order_by('user__last_name', 'user__first_name')
-            subjects = SchoolSubject.objects.all().order_by('name').prefetch_related('teachers__user')
+            subjects = list(SchoolSubject.objects.all().order_by('name').prefetch_related('teachers__user'))
             for subject in subjects:
-                subject_scores = []
-                # Lấy giáo viên thực sự dạy môn này cho lớp này
-                teacher_names = []
-                for teacher_profile in subject.teachers.all():
-                    if hasattr(teacher_profile, 'subjects_taught') and subject in teacher_profile.subjects_taught.all():
-                        teacher_names.append(teacher_profile.user.get_full_name() or teacher_profile.user.username)
-                teacher_names_str = ", ".join(sorted(list(set(teacher_names)))) or "N/A"
-                subject.teacher_names = teacher_names_str
-                for student in students_in_class:
-                    scores = Score.objects.filter(student=student, subject=subject).order_by('exam_date', 'exam_type')
-                    subject_scores.append({
-                        'student': student,
-                        'scores': list(scores)
-                    })
-                scores_by_subject[subject] = subject_scores
+                teacher_names = {tp.user.get_full_name() or tp.user.username for tp in subject.teachers.all()}
+                subject.teacher_names = ", ".join(sorted(teacher_names)) or "N/A"
+            scores_by_subject = class_score_matrix(selected_class, list(students_in_class), subjects)
+
+            # Xếp hạng học kỳ đọc từ TermResult đã tính sẵn
+            available_terms = list(AcademicTerm.objects.filter(term_results__school_class=selected_class).distinct())
+            selected_term_id = request.GET.get('term')
+            selected_term = next((t for t in available_terms if str(t.pk) == selected_term_id),
+                                 available_terms[0] if available_terms else None)
+            if selected_term:
+                term_ranking = list(TermResult.objects.filter(school_class=selected_class, term=selected_term)
+                                    .select_related('student__user').order_by('class_rank', 'student__user__last_name'))
         except SchoolClass.DoesNotExist:
             selected_class = None
     context = {
         'page_title': 'Tổng hợp điểm theo lớp',
+        'selected_grade': class_grade(selected_class.name) if selected_class else None,
         'all_classes': all_classes,
         'selected_class': selected_class,
         'scores_by_subject': scores_by_subject,
         'students_in_class': students_in_class,
+        'available_terms': available_terms,
+        'selected_term': selected_term,
+        'term_ranking': term_ranking,
     }
     return render(request, 'academic_records/school_wide_scores.html', context)
+
+@login_required
+def export_scores(request):
+    user = request.user
+    if not (user.is_staff and hasattr(user, 'department') and user.department):
+        raise PermissionDenied("Bạn không có quyền truy cập trang này.")
+
+    scope = request.GET.get('scope', 'class')
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in ('csv', 'xlsx'):
+        raise Http404("Định dạng xuất không được hỗ trợ.")
+
+    if scope == 'class':
+        selected_class = get_object_or_404(SchoolClass, pk=request.GET.get('class_id') or 0)
+        classes_qs = SchoolClass.objects.filter(pk=selected_class.pk)
+        filename = f"bang_diem_lop_{selected_class.name}"
+    elif scope == 'grade':
+        grade = request.GET.get('grade', '')
+        if not grade.isdigit():
+            raise Http404("Khối không hợp lệ.")
+        classes_qs = classes_in_grade(SchoolClass.objects.all(), grade)
+        filename = f"bang_diem_khoi_{grade}"
+    elif scope == 'school':
+        classes_qs = None
+        filename = "bang_diem_toan_truong"
+    else:
+        raise Http404("Phạm vi xuất không hợp lệ.")
+
+    rows = export_rows(classes_qs)
+    if export_format == 'csv':
+        response = StreamingHttpResponse(iter_csv(rows), content_type='text/csv; charset=utf-8')
+        # Tên lớp có thể có dấu/ký tự đặc biệt: để Django mã hóa (filename*=utf-8'')
+        response['Content-Disposition'] = content_disposition_header(True, f"{filename}.csv")
+        return response
+    return FileResponse(write_xlsx(rows), as_attachment=True, filename=f"{filename}.xlsx",
+                        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
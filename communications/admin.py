@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Notification, Conversation, Message, RequestForm # Thêm RequestForm vào import
+from .models import Notification, Conversation, Message, RequestForm, RequestSLAPolicy, StoredFile, Attachment, RequestEvent # Thêm RequestForm vào import
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
@@ -44,6 +44,17 @@ class ConversationAdmin(admin.ModelAdmin):
     display_participants.short_description = "Thành viên" # Đặt tên cột
 
 
+class RequestEventInline(admin.TabularInline):
+    model = RequestEvent
+    extra = 0
+    can_delete = False
+    fields = ('seq', 'event_type', 'actor', 'created_at', 'data')
+    readonly_fields = fields # Lịch sử chỉ ghi thêm, không chỉnh sửa
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(RequestForm)
 class RequestFormAdmin(admin.ModelAdmin):
     list_display = (
@@ -54,7 +65,8 @@ class RequestFormAdmin(admin.ModelAdmin):
         'submission_date',
         'assigned_department',
         'display_assigned_teachers', # Thêm để hiển thị giáo viên
-        'response_date'
+        'response_date',
+        'escalation_level'
     )
     list_filter = ('status', 'form_type', 'submission_date', 'assigned_department', 'assigned_teachers') # Thêm assigned_teachers
     search_fields = (
@@ -72,17 +84,40 @@ class RequestFormAdmin(admin.ModelAdmin):
             'fields': ('assigned_department', 'assigned_teachers') # Thêm assigned_teachers
         }),
         ('Xử lý và Trạng thái', {
-            'fields': ('status',)
+            'fields': ('status', 'escalation_level', 'last_escalated_at')
         }),
         ('Phản hồi từ Nhà trường', {
             'classes': ('collapse',),
             'fields': ('response_content', 'responded_by', 'response_date')
         }),
     )
-    readonly_fields = ('submission_date',)
+    readonly_fields = ('submission_date', 'escalation_level', 'last_escalated_at')
     autocomplete_fields = ['submitted_by', 'related_student', 'assigned_department', 'responded_by'] # Giữ nguyên
     filter_horizontal = ('assigned_teachers',) 
+    inlines = [RequestEventInline]
 
     def display_assigned_teachers(self, obj):
         return ", ".join([teacher.username for teacher in obj.assigned_teachers.all()])
-    display_assigned_teachers.short_description = 'Giáo viên nhận'
\ No newline at end of file
+    display_assigned_teachers.short_description = 'Giáo viên nhận'
+
+
+@admin.register(RequestSLAPolicy)
+class RequestSLAPolicyAdmin(admin.ModelAdmin):
+    list_display = ('form_type', 'target_hours', 'escalation_action', 'escalate_to_department', 'is_active')
+    list_filter = ('escalation_action', 'is_active')
+    autocomplete_fields = ['escalate_to_department']
+
+
+@admin.register(StoredFile)
+class StoredFileAdmin(admin.ModelAdmin):
+    list_display = ('sha256', 'size', 'created_at')
+    search_fields = ('sha256',)
+    readonly_fields = ('sha256', 'size', 'file', 'created_at')
+
+
+@admin.register(Attachment)
+class AttachmentAdmin(admin.ModelAdmin):
+    list_display = ('original_name', 'content_type', 'uploaded_by', 'uploaded_at', 'request_form', 'message')
+    search_fields = ('original_name', 'uploaded_by__username', 'stored_file__sha256')
+    raw_id_fields = ('stored_file', 'request_form', 'message')
+    autocomplete_fields = ['uploaded_by']
@@ -0,0 +1,57 @@
+import hashlib
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+
+from .models import Attachment, StoredFile
+
+
+def store_upload(uploaded_file, uploaded_by, request_form=None, message=None):
+    """
+    Lưu một tệp tải lên theo mã băm nội dung và tạo bản ghi Attachment.
+    Tệp được đọc và ghi theo từng khối (chunk) nên không nằm trọn trong bộ nhớ;
+    nếu nội dung đã tồn tại thì chỉ tạo liên kết mới tới bản lưu cũ.
+    """
+    hasher = hashlib.sha256()
+    with tempfile.TemporaryFile() as spool:
+        for chunk in uploaded_file.chunks():
+            hasher.update(chunk)
+            spool.write(chunk)
+        digest = hasher.hexdigest()
+        size = spool.tell()
+
+        stored_file = StoredFile.objects.filter(sha256=digest).first()
+        if stored_file is None:
+            spool.seek(0)
+            saved_name = default_storage.save(f"attachments/{digest[:2]}/{digest}", File(spool))
+            try:
+                with transaction.atomic():
+                    stored_file = StoredFile.objects.create(sha256=digest, size=size, file=saved_name)
+            except IntegrityError:
+                # Một yêu cầu khác vừa lưu cùng nội dung: dùng bản đó, bỏ bản trùng
+                default_storage.delete(saved_name)
+                stored_file = StoredFile.objects.get(sha256=digest)
+
+    return Attachment.objects.create(
+        stored_file=stored_file,
+        original_name=uploaded_file.name[:255],
+        content_type=getattr(uploaded_file, 'content_type', '') or '',
+        uploaded_by=uploaded_by,
+        request_form=request_form,
+        message=message,
+    )
+
+
+def user_can_access_attachment(user, attachment):
+    if attachment.request_form_id:
+        request_form = attachment.request_form
+        if request_form.submitted_by_id == user.pk:
+            return True
+        if user.is_staff and user.department_id and user.department_id == request_form.assigned_department_id:
+            return True
+        return request_form.assigned_teachers.filter(pk=user.pk).exists()
+    if attachment.message_id:
+        return attachment.message.conversation.participants.filter(pk=user.pk).exists()
+    return False
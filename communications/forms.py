@@ -1,9 +1,12 @@
 from django import forms
 from .models import RequestForm, Message, Conversation # Thêm Conversation
 from accounts.models import StudentProfile, User # StudentProfile, User từ accounts.models
-from school_data.models import Department # Department từ school_data.models
+from school_data.models import Department, Class as SchoolClass # Department từ school_data.models
 from django.core.exceptions import PermissionDenied
 from django.db import models
+from django.conf import settings
+from django.utils import timezone
+from datetime import datetime, time, timedelta
 
 class RequestFormSubmissionForm(forms.ModelForm):
     related_student = forms.ModelChoiceField(
@@ -126,6 +129,93 @@ from django import forms
 from .models import RequestForm, Message # Thêm Message vào import
 from accounts.models import StudentProfile, User 
 from school_data.models import Department
+from academic_records.models import Score
+
+class RequestFilterForm(forms.Form):
+    """
+    Bộ lọc (GET) cho danh sách đơn của Phòng Ban và Giáo viên.
+    """
+    OPEN_STATUSES = ['SUBMITTED', 'PROCESSING']
+
+    status = forms.ChoiceField(
+        choices=[('', '--- Tất cả trạng thái ---'), ('OPEN', 'Đang mở (Mới gửi/Đang xử lý)')] + RequestForm.STATUS_CHOICES,
+        required=False,
+        label="Trạng thái",
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    form_type = forms.ChoiceField(
+        choices=[('', '--- Tất cả loại đơn ---')] + RequestForm.FORM_TYPE_CHOICES,
+        required=False,
+        label="Loại đơn",
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    date_from = forms.DateField(
+        required=False,
+        label="Từ ngày",
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'})
+    )
+    date_to = forms.DateField(
+        required=False,
+        label="Đến ngày",
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'})
+    )
+    school_class = forms.ModelChoiceField(
+        queryset=SchoolClass.objects.all().order_by('name'),
+        required=False,
+        label="Lớp",
+        empty_label="--- Tất cả lớp ---",
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    student_name = forms.CharField(
+        required=False,
+        max_length=150,
+        label="Tên học sinh",
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Tên học sinh...'})
+    )
+    q = forms.CharField(
+        required=False,
+        max_length=200,
+        label="Tìm kiếm",
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Tìm trong tiêu đề, nội dung...'})
+    )
+
+    def filter_queryset(self, queryset):
+        if not self.is_valid():
+            return queryset
+        data = self.cleaned_data
+        if data.get('status') == 'OPEN':
+            queryset = queryset.filter(status__in=self.OPEN_STATUSES)
+        elif data.get('status'):
+            queryset = queryset.filter(status=data['status'])
+        if data.get('form_type'):
+            queryset = queryset.filter(form_type=data['form_type'])
+        # So sánh trực tiếp với cột submission_date (không dùng __date) để vẫn dùng được index
+        if data.get('date_from'):
+            queryset = queryset.filter(submission_date__gte=timezone.make_aware(datetime.combine(data['date_from'], time.min)))
+        if data.get('date_to'):
+            queryset = queryset.filter(submission_date__lt=timezone.make_aware(datetime.combine(data['date_to'] + timedelta(days=1), time.min)))
+        if data.get('school_class'):
+            queryset = queryset.filter(related_student__current_class=data['school_class'])
+        if data.get('student_name'):
+            name = data['student_name'].strip()
+            queryset = queryset.filter(
+                models.Q(related_student__user__first_name__icontains=name) |
+                models.Q(related_student__user__last_name__icontains=name) |
+                models.Q(related_student__user__username__icontains=name)
+            )
+        if data.get('q'):
+            keyword = data['q'].strip()
+            queryset = queryset.filter(models.Q(title__icontains=keyword) | models.Q(content__icontains=keyword))
+        return queryset
+
+
+def validate_attachment_size(uploaded_file):
+    if uploaded_file and uploaded_file.size > settings.ATTACHMENT_MAX_UPLOAD_SIZE:
+        raise forms.ValidationError(
+            f"Tệp đính kèm vượt quá dung lượng cho phép ({settings.ATTACHMENT_MAX_UPLOAD_SIZE // (1024 * 1024)} MB).",
+            code='attachment_too_large'
+        )
+
 
 class RequestFormSubmissionForm(forms.ModelForm):
 
@@ -149,18 +239,35 @@ class RequestFormSubmissionForm(forms.ModelForm):
         label="Hoặc/Và Gửi đến Giáo viên (chọn một hoặc nhiều)",
         help_text="Bạn có thể chọn gửi đơn này cho Phòng Ban và/hoặc một hoặc nhiều Giáo viên."
     )
+    attachment = forms.FileField(
+        required=False,
+        label="Tệp đính kèm (nếu có)",
+        help_text="Ví dụ: giấy khám bệnh, ảnh chụp minh chứng.",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control'}),
+        validators=[validate_attachment_size]
+    )
     class Meta:
         model = RequestForm
-        fields = ['form_type', 'title', 'content', 'related_student_for_parent', 'assigned_department', 'assigned_teachers']
+        fields = ['form_type', 'title', 'content', 'leave_start_date', 'leave_end_date', 'disputed_score', 'related_student_for_parent', 'assigned_department', 'assigned_teachers']
         widgets = {
             'form_type': forms.Select(attrs={'class': 'form-control'}),
             'title': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Nhập tiêu đề đơn...'}),
             'content': forms.Textarea(attrs={'class': 'form-control', 'rows': 5, 'placeholder': 'Nhập nội dung chi tiết...'}),
+            'leave_start_date': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+            'leave_end_date': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+            'disputed_score': forms.Select(attrs={'class': 'form-control'}),
         }
         labels = {
             'form_type': 'Loại đơn/kiến nghị',
             'title': 'Tiêu đề',
             'content': 'Nội dung chi tiết',
+            'leave_start_date': 'Nghỉ từ ngày',
+            'leave_end_date': 'Nghỉ đến hết ngày',
+            'disputed_score': 'Điểm cần phúc khảo',
+        }
+        help_texts = {
+            'leave_start_date': 'Bắt buộc với Đơn xin nghỉ học.',
+            'disputed_score': 'Bắt buộc với Đơn phúc khảo điểm.',
         }
     def __init__(self, *args, **kwargs):
         user = kwargs.pop('user', None)
@@ -169,6 +276,13 @@ class RequestFormSubmissionForm(forms.ModelForm):
             if hasattr(user, 'parent_profile') and user.parent_profile:
                 self.fields['related_student_for_parent'].queryset = user.parent_profile.children.select_related('user').order_by('user__first_name', 'user__last_name')
                 self.fields['related_student_for_parent'].label = "Chọn học sinh liên quan (con của bạn)"
+                self.fields['disputed_score'].queryset = Score.objects.filter(
+                    student__parent=user.parent_profile, is_published=True
+                ).select_related('student__user', 'subject').order_by('student__user__first_name', '-exam_date')
+                self.fields['disputed_score'].label_from_instance = lambda obj: (
+                    f"{obj.student.user.get_full_name() or obj.student.user.username} - {obj.subject.name}: "
+                    f"{obj.score_value} ({obj.get_exam_type_display()}, {obj.exam_date:%d/%m/%Y})"
+                )
             else:
                 self.fields['related_student_for_parent'].queryset = StudentProfile.objects.none()
                 self.fields['related_student_for_parent'].widget.attrs['disabled'] = True
@@ -176,6 +290,8 @@ class RequestFormSubmissionForm(forms.ModelForm):
         else:
             if 'related_student_for_parent' in self.fields:
                  del self.fields['related_student_for_parent']
+        if 'disputed_score' in self.fields and not (user and hasattr(user, 'parent_profile')):
+            self.fields['disputed_score'].queryset = Score.objects.none()
     def clean(self):
         cleaned_data = super().clean()
         form_type = cleaned_data.get('form_type')
@@ -187,6 +303,38 @@ class RequestFormSubmissionForm(forms.ModelForm):
                 code='no_student'
             )
 
+        if form_type == 'LEAVE_APPLICATION':
+            leave_start_date = cleaned_data.get('leave_start_date')
+            leave_end_date = cleaned_data.get('leave_end_date')
+            if not leave_start_date or not leave_end_date:
+                raise forms.ValidationError(
+                    "Đơn xin nghỉ học cần có ngày bắt đầu và ngày kết thúc nghỉ.",
+                    code='no_leave_dates'
+                )
+            if leave_end_date < leave_start_date:
+                raise forms.ValidationError(
+                    "Ngày kết thúc nghỉ phải sau hoặc bằng ngày bắt đầu.",
+                    code='invalid_leave_dates'
+                )
+        else:
+            cleaned_data['leave_start_date'] = None
+            cleaned_data['leave_end_date'] = None
+
+        if form_type == 'GRADE_APPEAL':
+            disputed_score = cleaned_data.get('disputed_score')
+            if not disputed_score:
+                raise forms.ValidationError(
+                    "Đơn phúc khảo điểm cần chọn điểm số cần phúc khảo.",
+                    code='no_disputed_score'
+                )
+            if disputed_score.student_id != related_student.pk:
+                raise forms.ValidationError(
+                    "Điểm cần phúc khảo phải là điểm của học sinh đã chọn.",
+                    code='disputed_score_mismatch'
+                )
+        else:
+            cleaned_data['disputed_score'] = None
+
         # Luôn gửi cho giáo viên chủ nhiệm
         if related_student.current_class and related_student.current_class.homeroom_teacher:
             cleaned_data['assigned_teachers'] = [related_student.current_class.homeroom_teacher]
@@ -241,8 +389,13 @@ class RequestFormResponseForm(forms.ModelForm):
              self.fields['status'].initial = 'PROCESSING'
 
 
-
 class MessageForm(forms.ModelForm):
+    attachment = forms.FileField(
+        required=False,
+        label="Đính kèm tệp/ảnh",
+        validators=[validate_attachment_size],
+    )
+
     class Meta:
         model = Message
         fields = ['content'] # Chỉ cần trường nội dung từ người dùng
@@ -0,0 +1,134 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from communications.models import Notification, RequestForm, RequestSLAPolicy
+from communications.timeline import record_events
+
+
+class Command(BaseCommand):
+    help = (
+        "Tìm các đơn ở trạng thái 'Mới gửi' đã quá thời hạn xử lý (SLA) theo từng loại đơn "
+        "và chuyển cấp theo lô: thêm Trưởng phòng vào người xử lý hoặc chuyển sang Phòng Ban khác. "
+        "Chạy định kỳ (ví dụ: cron mỗi giờ)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help="Số đơn xử lý trong một transaction.")
+        parser.add_argument('--dry-run', action='store_true', help="Chỉ liệt kê các đơn quá hạn, không thay đổi dữ liệu.")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        dry_run = options['dry_run']
+        now = timezone.now()
+
+        escalated_lines = {}  # {request_id: dòng mô tả đơn trong thông báo}
+        recipients_by_request = defaultdict(set)
+
+        for policy in RequestSLAPolicy.objects.filter(is_active=True).select_related('escalate_to_department__head'):
+            if policy.escalation_action == 'REASSIGN_DEPARTMENT' and not policy.escalate_to_department:
+                self.stderr.write(self.style.WARNING(
+                    f"Bỏ qua SLA '{policy.get_form_type_display()}': chưa chọn Phòng Ban nhận đơn chuyển cấp."
+                ))
+                continue
+
+            cutoff = now - timedelta(hours=policy.target_hours)
+            # Dùng index (status, submission_date); đơn đã chuyển cấp chỉ được chuyển tiếp sau một chu kỳ SLA nữa
+            overdue_ids = list(
+                RequestForm.objects.filter(
+                    status='SUBMITTED',
+                    submission_date__lt=cutoff,
+                    form_type=policy.form_type,
+                ).filter(
+                    Q(last_escalated_at__isnull=True) | Q(last_escalated_at__lt=cutoff)
+                ).order_by('submission_date').values_list('pk', flat=True)
+            )
+            if not overdue_ids:
+                continue
+
+            self.stdout.write(f"{policy.get_form_type_display()}: {len(overdue_ids)} đơn quá hạn {policy.target_hours} giờ.")
+            if dry_run:
+                continue
+
+            for start in range(0, len(overdue_ids), batch_size):
+                batch_ids = overdue_ids[start:start + batch_size]
+                with transaction.atomic():
+                    if policy.escalation_action == 'REASSIGN_DEPARTMENT':
+                        done_ids, batch_recipients = self._reassign_department(batch_ids, policy.escalate_to_department)
+                    else:
+                        done_ids, batch_recipients = self._add_department_heads(batch_ids)
+                    RequestForm.objects.filter(pk__in=done_ids).update(
+                        escalation_level=F('escalation_level') + 1,
+                        last_escalated_at=now,
+                    )
+                    record_events(done_ids, 'ESCALATED', data={
+                        'action': policy.escalation_action,
+                        'target_hours': policy.target_hours,
+                    })
+                for pk, user_ids in batch_recipients.items():
+                    recipients_by_request[pk].update(user_ids)
+                skipped = len(batch_ids) - len(done_ids)
+                if skipped:
+                    self.stderr.write(self.style.WARNING(
+                        f"{skipped} đơn không thể chuyển cấp do Phòng Ban xử lý chưa có Trưởng phòng."
+                    ))
+                for pk, title, submission_date in RequestForm.objects.filter(pk__in=done_ids).values_list('pk', 'title', 'submission_date'):
+                    escalated_lines[pk] = (
+                        f"- #{pk} {title} ({policy.get_form_type_display()}, gửi ngày {timezone.localtime(submission_date):%d/%m/%Y %H:%M})"
+                    )
+
+        if dry_run or not escalated_lines:
+            self.stdout.write("Không có đơn nào được chuyển cấp.")
+            return
+        # Mỗi người nhận chỉ thấy các đơn được chuyển cấp cho chính họ; những người có cùng
+        # danh sách đơn dùng chung một thông báo, liên kết người nhận ghi bằng một lệnh bulk_create
+        requests_by_user = defaultdict(set)
+        for pk, user_ids in recipients_by_request.items():
+            for user_id in user_ids:
+                requests_by_user[user_id].add(pk)
+        if not requests_by_user:
+            self.stdout.write(self.style.WARNING(
+                f"Đã chuyển cấp {len(escalated_lines)} đơn nhưng không tìm thấy người nhận thông báo."
+            ))
+            return
+        users_by_requests = defaultdict(list)
+        for user_id, request_ids in requests_by_user.items():
+            users_by_requests[frozenset(request_ids)].append(user_id)
+
+        through_model = Notification.target_users.through
+        links = []
+        for request_ids, user_ids in users_by_requests.items():
+            notification = Notification.objects.create(
+                title=f"Chuyển cấp {len(request_ids)} đơn quá hạn xử lý",
+                content="Các đơn sau đã quá thời hạn xử lý và được chuyển cấp cho bạn:\n"
+                        + "\n".join(escalated_lines[pk] for pk in sorted(request_ids)),
+                status='SENT',
+                is_published=True,
+                publish_time=now,
+            )
+            links.extend(through_model(notification_id=notification.pk, user_id=user_id) for user_id in user_ids)
+        through_model.objects.bulk_create(links, batch_size=1000)
+        self.stdout.write(self.style.SUCCESS(
+            f"Đã chuyển cấp {len(escalated_lines)} đơn và gửi {len(users_by_requests)} thông báo tới {len(requests_by_user)} người."
+        ))
+
+    def _add_department_heads(self, batch_ids):
+        rows = RequestForm.objects.filter(
+            pk__in=batch_ids, assigned_department__head__isnull=False
+        ).values_list('pk', 'assigned_department__head_id')
+        through_model = RequestForm.assigned_teachers.through
+        links = [through_model(requestform_id=pk, user_id=head_id) for pk, head_id in rows]
+        through_model.objects.bulk_create(links, ignore_conflicts=True)
+        return [link.requestform_id for link in links], {link.requestform_id: {link.user_id} for link in links}
+
+    def _reassign_department(self, batch_ids, department):
+        RequestForm.objects.filter(pk__in=batch_ids).update(assigned_department=department)
+        if department.head_id:
+            recipients = {department.head_id}
+        else:
+            recipients = set(department.staff_members.filter(is_active=True).values_list('pk', flat=True))
+        return batch_ids, {pk: recipients for pk in batch_ids}
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_user_department'),
+        ('communications', '0004_requestform_assigned_teachers'),
+        ('school_data', '0002_department_head'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestSLAPolicy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('form_type', models.CharField(choices=[('LEAVE_APPLICATION', 'Đơn xin nghỉ học'), ('GRADE_APPEAL', 'Đơn phúc khảo điểm'), ('GENERAL_REQUEST', 'Kiến nghị/Đề xuất chung'), ('FEEDBACK', 'Góp ý')], max_length=50, unique=True, verbose_name='Loại đơn')),
+                ('target_hours', models.PositiveIntegerField(verbose_name='Thời hạn xử lý (giờ)')),
+                ('escalation_action', models.CharField(choices=[('ADD_DEPARTMENT_HEAD', 'Thêm Trưởng phòng vào người xử lý'), ('REASSIGN_DEPARTMENT', 'Chuyển đơn sang Phòng Ban khác')], default='ADD_DEPARTMENT_HEAD', max_length=30, verbose_name='Hành động khi quá hạn')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Đang áp dụng')),
+            ],
+            options={
+                'verbose_name': 'Thời hạn xử lý Đơn (SLA)',
+                'verbose_name_plural': 'Các Thời hạn xử lý Đơn (SLA)',
+                'ordering': ['form_type'],
+            },
+        ),
+        migrations.AddField(
+            model_name='requestform',
+            name='escalation_level',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Số lần chuyển cấp'),
+        ),
+        migrations.AddField(
+            model_name='requestform',
+            name='last_escalated_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Lần chuyển cấp gần nhất'),
+        ),
+        migrations.AddIndex(
+            model_name='requestform',
+            index=models.Index(fields=['status', 'submission_date'], name='reqform_status_submitted_idx'),
+        ),
+        migrations.AddField(
+            model_name='requestslapolicy',
+            name='escalate_to_department',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='escalated_request_policies', to='school_data.department', verbose_name='Phòng Ban nhận đơn chuyển cấp'),
+        ),
+    ]
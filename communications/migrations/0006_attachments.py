@@ -0,0 +1,49 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communications', '0005_requestform_sla_escalation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='Mã băm SHA-256')),
+                ('size', models.PositiveBigIntegerField(verbose_name='Kích thước (byte)')),
+                ('file', models.FileField(max_length=255, upload_to='attachments/', verbose_name='Tệp lưu trữ')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Thời gian lưu')),
+            ],
+            options={
+                'verbose_name': 'Tệp lưu trữ',
+                'verbose_name_plural': 'Các Tệp lưu trữ',
+            },
+        ),
+        migrations.CreateModel(
+            name='Attachment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_name', models.CharField(max_length=255, verbose_name='Tên tệp gốc')),
+                ('content_type', models.CharField(blank=True, max_length=100, verbose_name='Kiểu nội dung')),
+                ('uploaded_at', models.DateTimeField(auto_now_add=True, verbose_name='Thời gian tải lên')),
+                ('message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attachments', to='communications.message', verbose_name='Thuộc tin nhắn')),
+                ('request_form', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attachments', to='communications.requestform', verbose_name='Thuộc đơn từ')),
+                ('uploaded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='uploaded_attachments', to=settings.AUTH_USER_MODEL, verbose_name='Người tải lên')),
+                ('stored_file', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='attachments', to='communications.storedfile', verbose_name='Nội dung tệp')),
+            ],
+            options={
+                'verbose_name': 'Tệp đính kèm',
+                'verbose_name_plural': 'Các Tệp đính kèm',
+                'ordering': ['uploaded_at'],
+                'constraints': [models.CheckConstraint(condition=models.Q(('request_form__isnull', False), ('message__isnull', False), _connector='OR'), name='attachment_has_owner')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communications', '0006_attachments'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requestform',
+            name='last_event_seq',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Số thứ tự sự kiện cuối'),
+        ),
+        migrations.CreateModel(
+            name='RequestEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.PositiveIntegerField(verbose_name='Số thứ tự')),
+                ('event_type', models.CharField(choices=[('SUBMITTED', 'Gửi đơn'), ('ASSIGNED', 'Phân công xử lý'), ('STATUS_CHANGED', 'Đổi trạng thái'), ('RESPONDED', 'Phản hồi'), ('ESCALATED', 'Chuyển cấp do quá hạn')], max_length=20, verbose_name='Loại sự kiện')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Thời gian')),
+                ('data', models.JSONField(blank=True, default=dict, verbose_name='Dữ liệu thay đổi')),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='request_events', to=settings.AUTH_USER_MODEL, verbose_name='Người thực hiện')),
+                ('request_form', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='communications.requestform', verbose_name='Đơn từ')),
+            ],
+            options={
+                'verbose_name': 'Sự kiện Đơn từ',
+                'verbose_name_plural': 'Lịch sử Đơn từ',
+                'ordering': ['request_form', 'seq'],
+                'constraints': [models.UniqueConstraint(fields=('request_form', 'seq'), name='reqevent_request_seq_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_user_department'),
+        ('communications', '0007_request_events'),
+        ('school_data', '0002_department_head'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='requestform',
+            index=models.Index(fields=['assigned_department', 'status', '-submission_date'], name='reqform_dept_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestform',
+            index=models.Index(fields=['assigned_department', '-submission_date'], name='reqform_dept_date_idx'),
+        ),
+    ]
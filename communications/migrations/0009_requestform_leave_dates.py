@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communications', '0008_requestform_queue_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requestform',
+            name='leave_end_date',
+            field=models.DateField(blank=True, null=True, verbose_name='Nghỉ đến hết ngày'),
+        ),
+        migrations.AddField(
+            model_name='requestform',
+            name='leave_start_date',
+            field=models.DateField(blank=True, null=True, verbose_name='Nghỉ từ ngày'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic_records', '0003_score_history'),
+        ('communications', '0009_requestform_leave_dates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requestform',
+            name='disputed_score',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='grade_appeals', to='academic_records.score', verbose_name='Điểm cần phúc khảo'),
+        ),
+    ]
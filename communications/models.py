@@ -168,6 +168,18 @@ class RequestForm(models.Model):
     title = models.CharField(max_length=255, verbose_name="Tiêu đề đơn/kiến nghị")
     content = models.TextField(verbose_name="Nội dung chi tiết")
     submission_date = models.DateTimeField(auto_now_add=True, verbose_name="Ngày gửi")
+    # Chỉ dùng cho đơn xin nghỉ học: khi đơn được duyệt, các ngày này được điểm danh là nghỉ có phép
+    leave_start_date = models.DateField(null=True, blank=True, verbose_name="Nghỉ từ ngày")
+    leave_end_date = models.DateField(null=True, blank=True, verbose_name="Nghỉ đến hết ngày")
+    # Chỉ dùng cho đơn phúc khảo điểm: điểm số bị khiếu nại
+    disputed_score = models.ForeignKey(
+        'academic_records.Score',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='grade_appeals',
+        verbose_name="Điểm cần phúc khảo"
+    )
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='SUBMITTED', verbose_name="Trạng thái")
 
     assigned_department = models.ForeignKey(
@@ -201,10 +213,170 @@ class RequestForm(models.Model):
         verbose_name="Người phản hồi"
     )
 
+    # Theo dõi việc tự động chuyển cấp khi đơn quá hạn xử lý (SLA)
+    escalation_level = models.PositiveSmallIntegerField(default=0, verbose_name="Số lần chuyển cấp")
+    last_escalated_at = models.DateTimeField(null=True, blank=True, verbose_name="Lần chuyển cấp gần nhất")
+    last_event_seq = models.PositiveIntegerField(default=0, editable=False, verbose_name="Số thứ tự sự kiện cuối")
+
     def __str__(self):
         return f"{self.get_form_type_display()} từ {self.submitted_by.username} - {self.title}"
 
     class Meta:
         verbose_name = "Đơn từ/Kiến nghị"
         verbose_name_plural = "Các Đơn từ/Kiến nghị"
-        ordering = ['-submission_date']
\ No newline at end of file
+        ordering = ['-submission_date']
+        indexes = [
+            # Tìm các đơn quá hạn: status = ... AND submission_date < mốc SLA
+            models.Index(fields=['status', 'submission_date'], name='reqform_status_submitted_idx'),
+            # Danh sách đơn của phòng ban: lọc theo phòng ban (+ trạng thái), mới nhất trước
+            models.Index(fields=['assigned_department', 'status', '-submission_date'], name='reqform_dept_status_date_idx'),
+            models.Index(fields=['assigned_department', '-submission_date'], name='reqform_dept_date_idx'),
+        ]
+
+class RequestEvent(models.Model):
+    # Nhật ký chỉ ghi thêm (append-only) các thay đổi của một đơn; không sửa/xóa sự kiện đã ghi
+    EVENT_TYPE_CHOICES = [
+        ('SUBMITTED', 'Gửi đơn'),
+        ('ASSIGNED', 'Phân công xử lý'),
+        ('STATUS_CHANGED', 'Đổi trạng thái'),
+        ('RESPONDED', 'Phản hồi'),
+        ('ESCALATED', 'Chuyển cấp do quá hạn'),
+    ]
+
+    request_form = models.ForeignKey(
+        RequestForm,
+        on_delete=models.CASCADE,
+        related_name='events',
+        verbose_name="Đơn từ"
+    )
+    seq = models.PositiveIntegerField(verbose_name="Số thứ tự")
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPE_CHOICES, verbose_name="Loại sự kiện")
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True, # Không có người thực hiện nếu là hệ thống (VD: chuyển cấp tự động)
+        related_name='request_events',
+        verbose_name="Người thực hiện"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Thời gian")
+    # Chỉ lưu phần thay đổi, VD: {"from": "SUBMITTED", "to": "PROCESSING"}
+    data = models.JSONField(default=dict, blank=True, verbose_name="Dữ liệu thay đổi")
+
+    def __str__(self):
+        return f"#{self.request_form_id}.{self.seq} {self.get_event_type_display()}"
+
+    def summary(self):
+        status_labels = dict(RequestForm.STATUS_CHOICES)
+        if self.event_type == 'STATUS_CHANGED':
+            return f"{status_labels.get(self.data.get('from'), self.data.get('from'))} → {status_labels.get(self.data.get('to'), self.data.get('to'))}"
+        if self.event_type == 'RESPONDED':
+            return self.data.get('content', '')
+        if self.event_type == 'ESCALATED':
+            return dict(RequestSLAPolicy.ESCALATION_ACTION_CHOICES).get(self.data.get('action'), '')
+        return ''
+
+    class Meta:
+        verbose_name = "Sự kiện Đơn từ"
+        verbose_name_plural = "Lịch sử Đơn từ"
+        ordering = ['request_form', 'seq']
+        constraints = [
+            # Ràng buộc unique đồng thời là index (request_form, seq) để đọc cả dòng thời gian bằng một truy vấn
+            models.UniqueConstraint(fields=['request_form', 'seq'], name='reqevent_request_seq_uniq'),
+        ]
+
+class RequestSLAPolicy(models.Model):
+    ESCALATION_ACTION_CHOICES = [
+        ('ADD_DEPARTMENT_HEAD', 'Thêm Trưởng phòng vào người xử lý'),
+        ('REASSIGN_DEPARTMENT', 'Chuyển đơn sang Phòng Ban khác'),
+    ]
+
+    form_type = models.CharField(max_length=50, choices=RequestForm.FORM_TYPE_CHOICES, unique=True, verbose_name="Loại đơn")
+    target_hours = models.PositiveIntegerField(verbose_name="Thời hạn xử lý (giờ)")
+    escalation_action = models.CharField(
+        max_length=30,
+        choices=ESCALATION_ACTION_CHOICES,
+        default='ADD_DEPARTMENT_HEAD',
+        verbose_name="Hành động khi quá hạn"
+    )
+    escalate_to_department = models.ForeignKey(
+        'school_data.Department',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True, # Chỉ cần khi hành động là chuyển phòng ban
+        related_name='escalated_request_policies',
+        verbose_name="Phòng Ban nhận đơn chuyển cấp"
+    )
+    is_active = models.BooleanField(default=True, verbose_name="Đang áp dụng")
+
+    def __str__(self):
+        return f"SLA {self.get_form_type_display()}: {self.target_hours} giờ"
+
+    class Meta:
+        verbose_name = "Thời hạn xử lý Đơn (SLA)"
+        verbose_name_plural = "Các Thời hạn xử lý Đơn (SLA)"
+        ordering = ['form_type']
+
+class StoredFile(models.Model):
+    # Nội dung tệp được lưu theo mã băm SHA-256: cùng một tệp tải lên nhiều lần chỉ lưu một bản
+    sha256 = models.CharField(max_length=64, unique=True, verbose_name="Mã băm SHA-256")
+    size = models.PositiveBigIntegerField(verbose_name="Kích thước (byte)")
+    file = models.FileField(upload_to='attachments/', max_length=255, verbose_name="Tệp lưu trữ")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Thời gian lưu")
+
+    def __str__(self):
+        return f"{self.sha256[:12]}… ({self.size} byte)"
+
+    class Meta:
+        verbose_name = "Tệp lưu trữ"
+        verbose_name_plural = "Các Tệp lưu trữ"
+
+class Attachment(models.Model):
+    stored_file = models.ForeignKey(
+        StoredFile,
+        on_delete=models.PROTECT, # Không xóa nội dung khi vẫn còn tệp đính kèm trỏ tới
+        related_name='attachments',
+        verbose_name="Nội dung tệp"
+    )
+    original_name = models.CharField(max_length=255, verbose_name="Tên tệp gốc")
+    content_type = models.CharField(max_length=100, blank=True, verbose_name="Kiểu nội dung")
+    uploaded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='uploaded_attachments',
+        verbose_name="Người tải lên"
+    )
+    uploaded_at = models.DateTimeField(auto_now_add=True, verbose_name="Thời gian tải lên")
+
+    request_form = models.ForeignKey(
+        RequestForm,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='attachments',
+        verbose_name="Thuộc đơn từ"
+    )
+    message = models.ForeignKey(
+        Message,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='attachments',
+        verbose_name="Thuộc tin nhắn"
+    )
+
+    def __str__(self):
+        return self.original_name
+
+    class Meta:
+        verbose_name = "Tệp đính kèm"
+        verbose_name_plural = "Các Tệp đính kèm"
+        ordering = ['uploaded_at']
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(request_form__isnull=False) | models.Q(message__isnull=False),
+                name='attachment_has_owner',
+            ),
+        ]
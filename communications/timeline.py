@@ -0,0 +1,38 @@
+from django.db.models import F
+
+from .models import RequestEvent, RequestForm
+
+
+def record_events(request_form_ids, event_type, actor=None, data=None):
+    """
+    Ghi thêm một sự kiện cùng loại cho mỗi đơn trong danh sách.
+    Phải được gọi bên trong transaction.atomic() cùng với thay đổi của đơn:
+    lệnh UPDATE tăng last_event_seq giữ khóa dòng tới hết transaction nên số thứ tự không bị trùng.
+    """
+    request_form_ids = list(request_form_ids)
+    if not request_form_ids:
+        return []
+    RequestForm.objects.filter(pk__in=request_form_ids).update(last_event_seq=F('last_event_seq') + 1)
+    seq_by_request = dict(RequestForm.objects.filter(pk__in=request_form_ids).values_list('pk', 'last_event_seq'))
+    events = [
+        RequestEvent(
+            request_form_id=pk,
+            seq=seq_by_request[pk],
+            event_type=event_type,
+            actor=actor,
+            data=data or {},
+        )
+        for pk in request_form_ids
+    ]
+    return RequestEvent.objects.bulk_create(events)
+
+
+def record_event(request_form, event_type, actor=None, **data):
+    return record_events([request_form.pk], event_type, actor=actor, data=data)[0]
+
+
+def record_response_events(request_form, previous_status, previous_response, actor):
+    if request_form.status != previous_status:
+        record_event(request_form, 'STATUS_CHANGED', actor=actor, **{'from': previous_status, 'to': request_form.status})
+    if request_form.response_content and request_form.response_content != previous_response:
+        record_event(request_form, 'RESPONDED', actor=actor, content=request_form.response_content)
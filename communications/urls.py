@@ -16,6 +16,7 @@ urlpatterns = [
     path('messages/<int:conversation_id>/', views.conversation_detail, name='conversation_detail'), 
     path('messages/new/', views.start_new_conversation, name='start_new_conversation'),
     path('notifications/create/', views.create_notification, name='create_notification'),
+    path('attachments/<int:pk>/download/', views.download_attachment, name='download_attachment'),
 
 
 ]
\ No newline at end of file
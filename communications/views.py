@@ -5,10 +5,56 @@ from django.core.exceptions import PermissionDenied
 from django.utils import timezone
 from django.db.models import Q, Max, Count
 from django.contrib.auth import get_user_model
+from django.http import FileResponse
+from django.db import transaction
+from django.core.paginator import Paginator
 
 from school_data.models import Class as SchoolClass # Import đúng model lớp học
-from .forms import RequestFormSubmissionForm, RequestFormResponseForm, MessageForm, StartConversationForm, TeacherNotificationForm, DepartmentNotificationForm # Các form từ app này
-from .models import Notification, RequestForm, Conversation, Message # Import lại các model cần thiết
+from .forms import RequestFormSubmissionForm, RequestFormResponseForm, RequestFilterForm, MessageForm, StartConversationForm, TeacherNotificationForm, DepartmentNotificationForm # Các form từ app này
+from .models import Notification, RequestForm, Conversation, Message, Attachment # Import lại các model cần thiết
+from .attachments import store_upload, user_can_access_attachment
+from .timeline import record_event, record_response_events
+from academic_records.attendance import mark_excused, unmark_excused
+
+REQUESTS_PER_PAGE = 25
+
+def apply_leave_approval(request_form, previous_status):
+    # Duyệt đơn xin nghỉ học => điểm danh nghỉ có phép cho các ngày đi học trong đơn;
+    # hủy duyệt (đổi khỏi trạng thái Đã giải quyết) => xóa lại các ngày đó
+    if not (request_form.form_type == 'LEAVE_APPLICATION' and request_form.related_student_id
+            and request_form.leave_start_date and request_form.leave_end_date):
+        return
+    if request_form.status == 'RESOLVED' and previous_status != 'RESOLVED':
+        mark_excused(request_form.related_student, request_form.leave_start_date, request_form.leave_end_date)
+    elif previous_status == 'RESOLVED' and request_form.status != 'RESOLVED':
+        other_leaves = RequestForm.objects.filter(
+            form_type='LEAVE_APPLICATION', status='RESOLVED', related_student_id=request_form.related_student_id,
+            leave_start_date__lte=request_form.leave_end_date, leave_end_date__gte=request_form.leave_start_date,
+        ).exclude(pk=request_form.pk).values_list('leave_start_date', 'leave_end_date')
+        unmark_excused(request_form.related_student, request_form.leave_start_date, request_form.leave_end_date,
+                       keep_ranges=list(other_leaves))
+
+RESPONSE_FIELDS = ['status', 'response_content', 'responded_by', 'response_date']
+
+def save_response(request_form_pk, response_form, user):
+    """
+    Lưu phản hồi (trạng thái, nội dung) của một đơn, ghi sự kiện và áp dụng đơn xin nghỉ đã duyệt.
+    Dòng đơn được đọc lại với select_for_update và chỉ các trường của form phản hồi được ghi:
+    lệnh escalate_overdue_requests và record_events có thể đã đổi last_event_seq, escalation_level,
+    last_escalated_at, assigned_department kể từ lúc trang được mở.
+    """
+    with transaction.atomic():
+        request_form = RequestForm.objects.select_for_update().get(pk=request_form_pk)
+        previous_status = request_form.status
+        previous_response = request_form.response_content
+        request_form.status = response_form.cleaned_data['status']
+        request_form.response_content = response_form.cleaned_data['response_content']
+        request_form.responded_by = user
+        request_form.response_date = timezone.now()
+        request_form.save(update_fields=RESPONSE_FIELDS)
+        record_response_events(request_form, previous_status, previous_response, user)
+        apply_leave_approval(request_form, previous_status)
+    return request_form
 
 @login_required
 def notification_list(request):
@@ -39,20 +85,34 @@ def notification_list(request):
 @login_required
 def submit_request_form(request):
     if request.method == 'POST':
-        form = RequestFormSubmissionForm(request.POST, user=request.user)
+        form = RequestFormSubmissionForm(request.POST, request.FILES, user=request.user)
         if form.is_valid():
             new_request = form.save(commit=False)
             new_request.submitted_by = request.user
             
-            # Xử lý related_student
-            if 'related_student' in form.cleaned_data and form.cleaned_data['related_student']:
-                new_request.related_student = form.cleaned_data['related_student']
+            # Xử lý related_student (form phụ huynh dùng trường related_student_for_parent)
+            related_student = form.cleaned_data.get('related_student') or form.cleaned_data.get('related_student_for_parent')
+            if related_student:
+                new_request.related_student = related_student
             
-            new_request.save()
-            form.save_m2m()
-
-            messages.success(request, 'Đơn của bạn đã được gửi thành công!')
-            return redirect('communications:my_submitted_requests')
+            # Tệp đính kèm được lưu trong cùng transaction: lưu tệp lỗi thì đơn cũng không được tạo
+            try:
+                with transaction.atomic():
+                    new_request.save()
+                    form.save_m2m()
+                    record_event(new_request, 'SUBMITTED', actor=request.user, form_type=new_request.form_type)
+                    record_event(
+                        new_request, 'ASSIGNED', actor=request.user,
+                        department=new_request.assigned_department_id,
+                        teachers=list(new_request.assigned_teachers.values_list('pk', flat=True)),
+                    )
+                    if form.cleaned_data.get('attachment'):
+                        store_upload(form.cleaned_data['attachment'], uploaded_by=request.user, request_form=new_request)
+            except OSError:
+                form.add_error('attachment', 'Không lưu được tệp đính kèm nên đơn chưa được gửi. Vui lòng thử lại.')
+            else:
+                messages.success(request, 'Đơn của bạn đã được gửi thành công!')
+                return redirect('communications:my_submitted_requests')
     else:
         form = RequestFormSubmissionForm(user=request.user)
     
@@ -64,7 +124,7 @@ def submit_request_form(request):
 
 @login_required
 def my_submitted_requests(request):
-    user_requests = RequestForm.objects.filter(submitted_by=request.user).order_by('-submission_date')
+    user_requests = RequestForm.objects.filter(submitted_by=request.user).prefetch_related('attachments').order_by('-submission_date')
     context = {
         'user_requests': user_requests,
         'page_title': 'Đơn từ/Kiến nghị đã gửi'
@@ -77,12 +137,18 @@ def department_request_list(request):
     if not (user.is_staff and hasattr(user, 'department') and user.department):
         raise PermissionDenied("Bạn không có quyền truy cập trang này hoặc chưa được gán vào phòng ban.")
 
-    department_requests = RequestForm.objects.filter(
-        assigned_department=user.department
-    ).order_by('submission_date')
+    filter_form = RequestFilterForm(request.GET or None)
+    department_requests = filter_form.filter_queryset(
+        RequestForm.objects.filter(assigned_department=user.department)
+    ).select_related(
+        'submitted_by', 'related_student__user', 'related_student__current_class'
+    ).order_by('-submission_date')
+    page_obj = Paginator(department_requests, REQUESTS_PER_PAGE).get_page(request.GET.get('page'))
 
     context = {
-        'department_requests': department_requests,
+        'department_requests': page_obj,
+        'page_obj': page_obj,
+        'filter_form': filter_form,
         'page_title': f'Đơn từ/Kiến nghị cho {user.department.name}',
         'department_name': user.department.name
     }
@@ -103,10 +169,7 @@ def department_request_detail_respond(request, pk):
     if request.method == 'POST':
         response_form = RequestFormResponseForm(request.POST, instance=request_form_instance)
         if response_form.is_valid():
-            updated_request_form = response_form.save(commit=False)
-            updated_request_form.responded_by = user
-            updated_request_form.response_date = timezone.now()
-            updated_request_form.save() # Lưu các thay đổi vào instance
+            updated_request_form = save_response(request_form_instance.pk, response_form, user)
 
             # GỬI THÔNG BÁO CHO PHỤ HUYNH
             parent_user = updated_request_form.submitted_by
@@ -138,6 +201,7 @@ def department_request_detail_respond(request, pk):
     context = {
         'request_form_instance': request_form_instance,
         'response_form': response_form,
+        'timeline': request_form_instance.events.select_related('actor').order_by('seq'),
         'page_title': f'Chi tiết và Phản hồi Đơn: {request_form_instance.title}'
     }
     return render(request, 'communications/department_request_detail_respond.html', context)
@@ -150,12 +214,18 @@ def teacher_request_list(request):
         messages.error(request, "Tài khoản của bạn không phải là giáo viên hoặc chưa được gán đúng vai trò. Vui lòng liên hệ quản trị viên.")
         return redirect('homepage')
 
-    teacher_requests = RequestForm.objects.filter(
-        assigned_teachers=user
-    ).order_by('submission_date')
+    filter_form = RequestFilterForm(request.GET or None)
+    teacher_requests = filter_form.filter_queryset(
+        RequestForm.objects.filter(assigned_teachers=user)
+    ).select_related(
+        'submitted_by', 'assigned_department', 'related_student__user', 'related_student__current_class'
+    ).order_by('-submission_date')
+    page_obj = Paginator(teacher_requests, REQUESTS_PER_PAGE).get_page(request.GET.get('page'))
 
     context = {
-        'teacher_requests': teacher_requests,
+        'teacher_requests': page_obj,
+        'page_obj': page_obj,
+        'filter_form': filter_form,
         'page_title': 'Đơn từ/Kiến nghị được gán cho bạn',
     }
     return render(request, 'communications/teacher_request_list.html', context)
@@ -177,6 +247,7 @@ def teacher_request_detail_respond(request, pk):
     if view_only:
         context = {
             'request_form_instance': request_form_instance,
+            'timeline': request_form_instance.events.select_related('actor').order_by('seq'),
             'page_title': f'Chi tiết Đơn (Xem): {request_form_instance.title}',
             'view_only': True,
         }
@@ -185,10 +256,7 @@ def teacher_request_detail_respond(request, pk):
     if request.method == 'POST':
         response_form = RequestFormResponseForm(request.POST, instance=request_form_instance)
         if response_form.is_valid():
-            updated_request_form = response_form.save(commit=False)
-            updated_request_form.responded_by = user
-            updated_request_form.response_date = timezone.now()
-            updated_request_form.save()
+            updated_request_form = save_response(request_form_instance.pk, response_form, user)
             messages.success(request, f"Đã cập nhật và phản hồi cho đơn '{request_form_instance.title}'.")
             return redirect('communications:teacher_request_list')
     else:
@@ -197,6 +265,7 @@ def teacher_request_detail_respond(request, pk):
     context = {
         'request_form_instance': request_form_instance,
         'response_form': response_form,
+        'timeline': request_form_instance.events.select_related('actor').order_by('seq'),
         'page_title': f'Chi tiết và Phản hồi Đơn (GV): {request_form_instance.title}',
         'view_only': False,
     }
@@ -221,22 +290,29 @@ def conversation_detail(request, conversation_id):
     # Đảm bảo người dùng là thành viên của cuộc hội thoại này
     conversation = get_object_or_404(Conversation, pk=conversation_id, participants=user)
     
-    messages_in_conversation = conversation.messages.all().order_by('sent_at')
+    messages_in_conversation = conversation.messages.all().prefetch_related('attachments').order_by('sent_at')
 
     if request.method == 'POST':
-        message_form = MessageForm(request.POST)
+        message_form = MessageForm(request.POST, request.FILES)
         if message_form.is_valid():
             new_message = message_form.save(commit=False)
             new_message.conversation = conversation
             new_message.sender = user
-            new_message.save()
-
-            # Cập nhật trường updated_at của cuộc hội thoại
-            conversation.updated_at = timezone.now() # Hoặc new_message.sent_at
-            conversation.save(update_fields=['updated_at'])
-            
-            # messages.success(request, "Đã gửi tin nhắn!") # Có thể không cần thông báo flash cho mỗi tin nhắn
-            return redirect('communications:conversation_detail', conversation_id=conversation.pk)
+            # Tin nhắn và tệp đính kèm được lưu cùng nhau: lưu tệp lỗi thì tin nhắn cũng không được gửi
+            try:
+                with transaction.atomic():
+                    new_message.save()
+                    if message_form.cleaned_data.get('attachment'):
+                        store_upload(message_form.cleaned_data['attachment'], uploaded_by=user, message=new_message)
+
+                    # Cập nhật trường updated_at của cuộc hội thoại
+                    conversation.updated_at = timezone.now() # Hoặc new_message.sent_at
+                    conversation.save(update_fields=['updated_at'])
+            except OSError:
+                message_form.add_error('attachment', "Không lưu được tệp đính kèm nên tin nhắn chưa được gửi. Vui lòng thử lại.")
+            else:
+                # messages.success(request, "Đã gửi tin nhắn!") # Có thể không cần thông báo flash cho mỗi tin nhắn
+                return redirect('communications:conversation_detail', conversation_id=conversation.pk)
 
     else:
         message_form = MessageForm() # Form trống cho GET request
@@ -360,6 +436,23 @@ def request_detail(request, pk):
     }
     return render(request, 'communications/my_submitted_requests.html', context)
 
+@login_required
+def download_attachment(request, pk):
+    attachment = get_object_or_404(
+        Attachment.objects.select_related('stored_file', 'request_form', 'message__conversation'),
+        pk=pk
+    )
+    if not user_can_access_attachment(request.user, attachment):
+        raise PermissionDenied("Bạn không có quyền tải tệp đính kèm này.")
+
+    # FileResponse đọc và gửi tệp theo từng khối, không nạp toàn bộ vào bộ nhớ
+    return FileResponse(
+        attachment.stored_file.file.open('rb'),
+        as_attachment=True,
+        filename=attachment.original_name,
+        content_type=attachment.content_type or None,
+    )
+
 def homepage(request):
     notifications = None
     if request.user.is_authenticated:
@@ -89,6 +89,22 @@ DATABASES = {
 }
 
 
+# Cache dùng chung cho MỌI tiến trình (các worker web và các lệnh chạy định kỳ như release_scores,
+# import_scores): snapshot bảng điểm, thống kê điểm, ngân hàng nhận xét... được xóa khi dữ liệu đổi,
+# nên một cache riêng từng tiến trình (LocMemCache, mặc định của Django) sẽ phục vụ dữ liệu cũ.
+# Tạo bảng cache một lần: python manage.py createcachetable
+# Có thể thay bằng Redis: {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379'}
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'school_cache',
+        # Mặc định DatabaseCache chỉ giữ 300 khóa rồi xóa bớt ngẫu nhiên, kể cả khóa phiên bản;
+        # mỗi giáo viên có một chỉ mục ngân hàng nhận xét nên cần nhiều khóa hơn
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -125,6 +141,15 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Tệp đính kèm (đơn từ, tin nhắn) được lưu theo mã băm nội dung trong MEDIA_ROOT
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+MEDIA_URL = 'media/'
+ATTACHMENT_MAX_UPLOAD_SIZE = 20 * 1024 * 1024 # 20 MB
+
+# Các ngày đi học trong tuần (0 = Thứ Hai ... 6 = Chủ Nhật); thêm 5 nếu trường học Thứ Bảy.
+# Điểm danh và đơn xin nghỉ chỉ tính các ngày này (trừ Ngày nghỉ lễ khai báo trong /admin/).
+SCHOOL_WEEKDAYS = [0, 1, 2, 3, 4]
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -1,11 +1,12 @@
 from django.contrib import admin
-from .models import Department, Class, Subject
+from .models import Department, Class, Subject, AcademicTerm, Holiday
 
 # Đăng ký model Department
 @admin.register(Department)
 class DepartmentAdmin(admin.ModelAdmin):
-    list_display = ('name', 'email', 'description') # Các trường hiển thị trong danh sách
+    list_display = ('name', 'email', 'head', 'description') # Các trường hiển thị trong danh sách
     search_fields = ('name', 'email') # Cho phép tìm kiếm theo tên và email
+    autocomplete_fields = ['head']
 
 # Đăng ký model Class
 @admin.register(Class)
@@ -19,4 +20,18 @@ class ClassAdmin(admin.ModelAdmin):
 @admin.register(Subject)
 class SubjectAdmin(admin.ModelAdmin):
     list_display = ('name', 'description') # Các trường hiển thị
-    search_fields = ('name',) 
\ No newline at end of file
+    search_fields = ('name',) 
+
+# Đăng ký model AcademicTerm
+@admin.register(AcademicTerm)
+class AcademicTermAdmin(admin.ModelAdmin):
+    list_display = ('name', 'start_date', 'end_date')
+    search_fields = ('name',)
+    date_hierarchy = 'start_date'
+
+# Đăng ký model Holiday
+@admin.register(Holiday)
+class HolidayAdmin(admin.ModelAdmin):
+    list_display = ('name', 'start_date', 'end_date')
+    search_fields = ('name',)
+    date_hierarchy = 'start_date'
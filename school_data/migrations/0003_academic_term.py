@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school_data', '0002_department_head'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AcademicTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Tên Học kỳ (VD: HK1 2024-2025)')),
+                ('start_date', models.DateField(verbose_name='Ngày bắt đầu')),
+                ('end_date', models.DateField(verbose_name='Ngày kết thúc')),
+            ],
+            options={
+                'verbose_name': 'Học kỳ',
+                'verbose_name_plural': 'Các Học kỳ',
+                'ordering': ['-start_date'],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school_data', '0003_academic_term'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Holiday',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Tên ngày nghỉ')),
+                ('start_date', models.DateField(verbose_name='Nghỉ từ ngày')),
+                ('end_date', models.DateField(verbose_name='Nghỉ đến hết ngày')),
+            ],
+            options={
+                'verbose_name': 'Ngày nghỉ lễ',
+                'verbose_name_plural': 'Các Ngày nghỉ lễ',
+                'ordering': ['-start_date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='academicterm',
+            constraint=models.CheckConstraint(condition=models.Q(('end_date__gte', models.F('start_date'))), name='academicterm_end_after_start'),
+        ),
+    ]
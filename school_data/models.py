@@ -1,9 +1,21 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db import models
 
 class Department(models.Model):
     name = models.CharField(max_length=255, unique=True, verbose_name="Tên Phòng Ban")
     email = models.EmailField(max_length=255, blank=True, null=True, verbose_name="Email Phòng Ban")
     description = models.TextField(blank=True, null=True, verbose_name="Mô tả")
+    head = models.ForeignKey(
+        'accounts.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='headed_departments', # Trưởng phòng nhận các đơn bị quá hạn xử lý
+        verbose_name="Trưởng Phòng Ban"
+    )
 
     def __str__(self):
         return self.name
@@ -43,4 +55,86 @@ class Subject(models.Model):
 
     class Meta:
         verbose_name = "Môn học"
-        verbose_name_plural = "Các Môn học"
\ No newline at end of file
+        verbose_name_plural = "Các Môn học"
+
+class AcademicTerm(models.Model):
+    name = models.CharField(max_length=50, unique=True, verbose_name="Tên Học kỳ (VD: HK1 2024-2025)")
+    start_date = models.DateField(verbose_name="Ngày bắt đầu")
+    end_date = models.DateField(verbose_name="Ngày kết thúc")
+
+    def __str__(self):
+        return self.name
+
+    def clean(self):
+        if self.start_date and self.end_date:
+            if self.end_date < self.start_date:
+                raise ValidationError({'end_date': "Ngày kết thúc phải sau hoặc trùng ngày bắt đầu."})
+            overlapping = AcademicTerm.objects.filter(start_date__lte=self.end_date, end_date__gte=self.start_date)
+            if self.pk:
+                overlapping = overlapping.exclude(pk=self.pk)
+            if overlapping.exists():
+                raise ValidationError(f"Khoảng ngày trùng với học kỳ {overlapping.first().name}.")
+        if self.pk and self.start_date:
+            # Bitmap điểm danh đánh số bit theo ngày bắt đầu: đổi ngày bắt đầu làm lệch mọi bitmap đã lưu
+            previous_start = AcademicTerm.objects.filter(pk=self.pk).values_list('start_date', flat=True).first()
+            if previous_start and previous_start != self.start_date and self.attendance_records.exists():
+                raise ValidationError({'start_date': "Không thể đổi ngày bắt đầu của học kỳ đã có dữ liệu điểm danh."})
+
+    def contains(self, day):
+        return self.start_date <= day <= self.end_date
+
+    def day_index(self, day):
+        # Vị trí bit của một ngày trong bitmap điểm danh của học kỳ
+        return (day - self.start_date).days
+
+    def is_school_day(self, day):
+        return self.contains(day) and bool(self.school_day_mask() >> self.day_index(day) & 1)
+
+    def school_day_mask(self):
+        """Bitmap (cùng cách đánh số với điểm danh) các ngày đi học: ngày trong SCHOOL_WEEKDAYS, trừ ngày nghỉ lễ."""
+        weekdays = set(settings.SCHOOL_WEEKDAYS)
+        mask = 0
+        for i in range((self.end_date - self.start_date).days + 1):
+            if (self.start_date + timedelta(days=i)).weekday() in weekdays:
+                mask |= 1 << i
+        holidays = Holiday.objects.filter(start_date__lte=self.end_date, end_date__gte=self.start_date)
+        for start_date, end_date in holidays.values_list('start_date', 'end_date'):
+            first_index = self.day_index(max(start_date, self.start_date))
+            last_index = self.day_index(min(end_date, self.end_date))
+            mask &= ~(((1 << (last_index - first_index + 1)) - 1) << first_index)
+        return mask
+
+    @classmethod
+    def for_date(cls, day):
+        return cls.objects.filter(start_date__lte=day, end_date__gte=day).first()
+
+    @staticmethod
+    def pick(terms, day):
+        # Như for_date nhưng tra trong danh sách học kỳ đã nạp sẵn, không truy vấn thêm
+        return next((term for term in terms if term.contains(day)), None)
+
+    class Meta:
+        verbose_name = "Học kỳ"
+        verbose_name_plural = "Các Học kỳ"
+        ordering = ['-start_date']
+        constraints = [
+            models.CheckConstraint(condition=models.Q(end_date__gte=models.F('start_date')), name='academicterm_end_after_start'),
+        ]
+
+class Holiday(models.Model):
+    # Ngày nghỉ lễ/nghỉ theo lịch của trường: không tính vào điểm danh (kể cả khi duyệt đơn xin nghỉ)
+    name = models.CharField(max_length=100, verbose_name="Tên ngày nghỉ")
+    start_date = models.DateField(verbose_name="Nghỉ từ ngày")
+    end_date = models.DateField(verbose_name="Nghỉ đến hết ngày")
+
+    def __str__(self):
+        return f"{self.name} ({self.start_date:%d/%m/%Y} - {self.end_date:%d/%m/%Y})"
+
+    def clean(self):
+        if self.start_date and self.end_date and self.end_date < self.start_date:
+            raise ValidationError({'end_date': "Ngày kết thúc phải sau hoặc trùng ngày bắt đầu."})
+
+    class Meta:
+        verbose_name = "Ngày nghỉ lễ"
+        verbose_name_plural = "Các Ngày nghỉ lễ"
+        ordering = ['-start_date']